@@ -0,0 +1,190 @@
+import math
+from urllib.parse import parse_qsl, urlparse
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+STEP_NS = 300_000_000_000
+
+
+def _make_series(
+    start: str = "2024-06-01",
+    periods: int = 14 * 288,
+    seed: int = 0,
+    drop: int = 0,
+    nan: int = 0,
+    version: str = None,
+) -> pd.DataFrame:
+    """A 5 minute carbon intensity series indexed by point_time, with `drop` rows removed and `nan` values missing."""
+    rng = np.random.default_rng(seed)
+    point_times = pd.date_range(start, periods=periods, freq="5min", tz="UTC", name="point_time")
+    values = 200 + 100 * np.sin(np.arange(periods) / 288 * 2 * np.pi) + rng.normal(0, 20, periods)
+    values[rng.choice(periods, nan, replace=False)] = np.nan
+    keep = np.ones(periods, dtype=bool)
+    # keep the first and last rows so the series spans the whole period
+    keep[rng.choice(np.arange(1, periods - 1), drop, replace=False)] = False
+    df = pd.DataFrame({"value": values[keep]}, index=point_times[keep])
+    if version is not None:
+        df["version"] = version
+    return df
+
+
+def _random_jobs(df: pd.DataFrame, jobs: int, seed: int = 0, max_hours: float = 6) -> tuple[np.ndarray, np.ndarray]:
+    """Job start times (an hour before the series up to its end) and durations, as epoch and duration nanoseconds."""
+    rng = np.random.default_rng(seed)
+    first, last = df.index[0].value, df.index[-1].value
+    start_ns = rng.integers(first - 3_600_000_000_000, last, jobs)
+    # some jobs start exactly on a point time
+    start_ns[::5] = df.index.as_unit("ns").asi8[rng.integers(0, len(df), start_ns[::5].size)]
+    duration_ns = rng.integers(1, int(max_hours * 3600), jobs) * 1_000_000_000
+    return start_ns, duration_ns
+
+
+def _make_job_log(df: pd.DataFrame, jobs: int, seed: int = 3) -> pd.DataFrame:
+    """A Snowflake-style job log (StartTime, ExecutionTimeSeconds) of jobs starting up to a day before the series ends."""
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(df.index[0].value, df.index[-1].value - 86_400_000_000_000, jobs)
+    return pd.DataFrame({
+        "StartTime": pd.to_datetime(starts, utc=True).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "ExecutionTimeSeconds": rng.uniform(0.5, 4 * 3600, jobs),
+    })
+
+
+def _slot_values(df: pd.DataFrame) -> dict[int, float]:
+    """The value of every point time (epoch nanoseconds), the last row winning on duplicates."""
+    return df["value"].groupby(df.index.as_unit("ns").asi8).last().to_dict()
+
+
+def _window_mean(values: dict[int, float], start_ns: int, duration_ns: int) -> float:
+    origin, last = min(values), max(values)
+    first_slot = (start_ns - origin) // STEP_NS
+    end_slot = math.ceil((start_ns + duration_ns - origin) / STEP_NS)
+    if first_slot < 0 or origin + (end_slot - 1) * STEP_NS > last:
+        return np.nan
+    window = [values.get(origin + slot * STEP_NS, np.nan) for slot in range(first_slot, end_slot)]
+    return np.nan if any(np.isnan(window)) else float(np.mean(window))
+
+
+def _reference_window_mean(df: pd.DataFrame, start_ns: int, duration_ns: int) -> float:
+    """Brute-force mean of the 5 minute slots a job touches, NaN unless every slot has a value."""
+    return _window_mean(_slot_values(df), start_ns, duration_ns)
+
+
+def _reference_candidates(df: pd.DataFrame, start_ns: int, duration_ns: int, flex_ns: int) -> tuple[list[int], list[float]]:
+    """Brute-force candidates of a job: its own start, then every slot start after it up to start + flex."""
+    values = _slot_values(df)
+    origin, last = min(values), max(values)
+    starts = [int(start_ns)]
+    slot = max((start_ns - origin) // STEP_NS + 1, 0)
+    while origin + slot * STEP_NS <= min(start_ns + flex_ns, last):
+        starts.append(int(origin + slot * STEP_NS))
+        slot += 1
+    return starts, [_window_mean(values, start, duration_ns) for start in starts]
+
+
+def _make_day(day: str, value: float, version: str = "1.0") -> pd.DataFrame:
+    """A backfill chunk of a constant day: its points plus the first of the next day, which the next chunk fetches again."""
+    point_times = pd.date_range(day, periods=289, freq="5min", tz="UTC", name="point_time")
+    return pd.DataFrame({"value": float(value), "version": version}, index=point_times)
+
+
+def _make_chunk(start: str, periods: int, value: float, version: str = None) -> pd.DataFrame:
+    """A chunk of constant 5 minute points indexed by point_time, with an optional version column."""
+    point_times = pd.date_range(start, periods=periods, freq="5min", tz="UTC", name="point_time")
+    df = pd.DataFrame({"value": float(value)}, index=point_times)
+    if version is not None:
+        df["version"] = version
+    return df
+
+
+@pytest.fixture
+def make_series():
+    return _make_series
+
+
+@pytest.fixture
+def make_day():
+    return _make_day
+
+
+@pytest.fixture
+def make_chunk():
+    return _make_chunk
+
+
+@pytest.fixture
+def make_job_log():
+    return _make_job_log
+
+
+@pytest.fixture
+def random_jobs():
+    return _random_jobs
+
+
+@pytest.fixture
+def slot_values():
+    return _slot_values
+
+
+@pytest.fixture
+def reference_window_mean():
+    return _reference_window_mean
+
+
+@pytest.fixture
+def reference_candidates():
+    return _reference_candidates
+
+
+@pytest.fixture
+def intensity_frame() -> pd.DataFrame:
+    """Two weeks of 5 minute carbon intensity points with a few gaps and NaN values."""
+    return _make_series(drop=60, nan=40)
+
+
+@pytest.fixture
+def archive_csv(tmp_path) -> str:
+    """A backfill CSV of 70 days of 5 minute points from 2024-06-01, as served by the stand-in."""
+    path = str(tmp_path / "carbon_intensity_TEST.csv")
+    _make_series(periods=70 * 288).to_csv(path)
+    return path
+
+
+@pytest.fixture
+def make_standin(archive_csv):
+    """Starts WattTime stand-ins serving archive_csv as region TEST, stopped after the test."""
+    from utils.watttime_standin import WattTimeStandIn
+
+    started = []
+
+    def make(**kwargs) -> WattTimeStandIn:
+        kwargs.setdefault("archives", {"TEST": archive_csv})
+        standin = WattTimeStandIn(**kwargs).start()
+        started.append(standin)
+        return standin
+
+    yield make
+    for standin in started:
+        standin.stop()
+
+
+def _fail_requests_after(standin, after: str):
+    """Fails the stand-in requests ending at or after `after` with a non-retryable 400; returns the original handler."""
+    handle = standin.handle
+
+    def failing(raw_path: str, headers: dict):
+        end = dict(parse_qsl(urlparse(raw_path).query)).get("end")
+        if end is not None and pd.to_datetime(end, utc=True) >= pd.Timestamp(after, tz="UTC"):
+            return 400, {"error": "Bad request"}, {}
+        return handle(raw_path, headers)
+
+    standin.handle = failing
+    return handle
+
+
+@pytest.fixture
+def fail_requests_after():
+    return _fail_requests_after
@@ -0,0 +1,144 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from utils.backfill import BackfillError, TokenBucket, backfill_carbon_intensity, plan_backfill_chunks
+from utils.resumable_backfill import resumable_backfill
+from utils.series_archive import load_carbon_intensity
+from utils.watttime_session import WattTimeSession
+
+
+def _assert_archive_period(df, archive_csv, start, end):
+    expected = load_carbon_intensity(archive_csv).loc[start:end]
+    assert df.index.equals(expected.index.as_unit(df.index.unit))
+    np.testing.assert_allclose(df["value"], expected["value"])
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=20, capacity=5)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.05
+    for _ in range(6):
+        bucket.acquire()
+    # 6 tokens past the burst refill at 20 per second
+    assert time.monotonic() - start == pytest.approx(0.3, abs=0.1)
+
+
+def test_token_bucket_paces_across_threads():
+    bucket = TokenBucket(rate=50, capacity=1)
+    taken = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(5):
+            bucket.acquire()
+            with lock:
+                taken.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 20 tokens with a burst of 1 take at least 19 refills
+    assert max(taken) - start >= 19 / 50 - 0.01
+    assert len(taken) == 20
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+@pytest.mark.parametrize("start, end", [
+    (datetime(2024, 1, 31), datetime(2024, 6, 15)),
+    (datetime(2024, 11, 15), datetime(2025, 2, 15)),
+    (datetime(2024, 3, 1), datetime(2024, 4, 1)),
+    (datetime(2024, 3, 1), datetime(2024, 3, 1)),
+])
+def test_plan_backfill_chunks_tiles_the_period(start, end):
+    chunks = plan_backfill_chunks(start, end)
+    if start == end:
+        assert chunks == []
+        return
+    # consecutive chunks share their boundary day and together span the period
+    assert chunks[0][0] == start and chunks[-1][1] == end
+    assert all(chunk_end == next_start for (_, chunk_end), (next_start, _) in zip(chunks, chunks[1:]))
+    assert all(0 < (chunk_end - chunk_start).days <= 31 for chunk_start, chunk_end in chunks)
+
+
+def test_plan_backfill_chunks_clamps_missing_days():
+    starts = [chunk_start for chunk_start, _ in plan_backfill_chunks(datetime(2024, 1, 31), datetime(2024, 5, 1))]
+    assert starts == [datetime(2024, 1, 31), datetime(2024, 2, 29), datetime(2024, 3, 31), datetime(2024, 4, 30)]
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_concurrent_backfill_matches_archive(make_standin, archive_csv, max_workers):
+    # jittered latency makes the chunks finish out of order
+    standin = make_standin(latency=0.01, jitter=0.05)
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        df = backfill_carbon_intensity(datetime(2024, 6, 1), datetime(2024, 8, 9), "TEST", max_workers=max_workers, client=session)
+    assert df.index.is_unique and df.index.is_monotonic_increasing
+    _assert_archive_period(df, archive_csv, "2024-06-01", "2024-08-09 23:59")
+
+
+def test_backfill_raises_listing_failed_chunks(make_standin, fail_requests_after, archive_csv):
+    standin = make_standin()
+    fail_requests_after(standin, "2024-07-02")
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        with pytest.raises(BackfillError) as failure:
+            backfill_carbon_intensity(datetime(2024, 6, 1), datetime(2024, 8, 1), "TEST", client=session)
+        assert [(start, end) for start, end, _ in failure.value.failed] == [(datetime(2024, 7, 1), datetime(2024, 8, 1))]
+
+        # skipping is an explicit opt-in and returns the other chunks only
+        df = backfill_carbon_intensity(datetime(2024, 6, 1), datetime(2024, 8, 1), "TEST", client=session, skip_failed=True)
+    _assert_archive_period(df, archive_csv, "2024-06-01", "2024-07-01 23:59")
+
+
+def test_resumable_backfill_retries_transient_errors(make_standin, archive_csv, tmp_path):
+    standin = make_standin(error_rate=0.3, seed=3)
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        data = resumable_backfill(
+            ["TEST"], datetime(2024, 6, 1), datetime(2024, 8, 1), str(tmp_path / "checkpoint"),
+            base_delay=0.01, max_delay=0.05, seed=0, client=session,
+        )
+    assert standin.stats["injected_errors"] > 0
+    _assert_archive_period(data["TEST"], archive_csv, "2024-06-01", "2024-08-01 23:59")
+
+
+def test_resumable_backfill_resumes_failed_chunks_only(make_standin, fail_requests_after, archive_csv, tmp_path):
+    standin = make_standin()
+    handle = fail_requests_after(standin, "2024-07-02")
+    checkpoint_dir = str(tmp_path / "checkpoint")
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        with pytest.raises(BackfillError) as failure:
+            resumable_backfill(["TEST"], datetime(2024, 6, 1), datetime(2024, 8, 1), checkpoint_dir, client=session)
+        assert [(start, end) for start, end, _ in failure.value.failed] == [(datetime(2024, 7, 1), datetime(2024, 8, 1))]
+
+        requested = []
+
+        def recording(raw_path, headers):
+            requested.append(raw_path)
+            return handle(raw_path, headers)
+
+        standin.handle = recording
+        data = resumable_backfill(["TEST"], datetime(2024, 6, 1), datetime(2024, 8, 1), checkpoint_dir, client=session)
+    # the checkpointed June chunk is read back rather than fetched again
+    historical = [path for path in requested if path.startswith("/v3/historical")]
+    assert historical and all("start=2024-07-01" in path or "start=2024-07-31" in path for path in historical)
+    _assert_archive_period(data["TEST"], archive_csv, "2024-06-01", "2024-08-01 23:59")
+
+
+def test_backfill_retries_rate_limited_requests(make_standin, archive_csv):
+    # the client bucket allows bursts far beyond the stand-in's limit, 429s are retried after Retry-After
+    standin = make_standin(rate_limit=3)
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        df = backfill_carbon_intensity(datetime(2024, 6, 1), datetime(2024, 8, 1), "TEST", client=session, rate=100)
+    assert standin.stats["rate_limited"] > 0
+    _assert_archive_period(df, archive_csv, "2024-06-01", "2024-08-01 23:59")
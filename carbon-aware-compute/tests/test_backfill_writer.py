@@ -0,0 +1,113 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.backfill import BackfillError
+from utils.backfill_writer import (
+    BackfillWriter,
+    backfill_to_store,
+    iter_store_ranges,
+    read_written_ranges,
+    write_store_archive,
+)
+from utils.series_archive import load_carbon_intensity, read_intensity_archive, write_intensity_archive
+from utils.watttime_session import WattTimeSession
+
+
+def test_resume_truncates_after_the_failed_chunk(make_day, tmp_path):
+    path = str(tmp_path / "store.csv")
+    writer = BackfillWriter(path)
+    writer.append(make_day("2024-01-01", 1), "2024-01-02")
+    writer.append(pd.DataFrame(), "2024-01-03", failed=True)
+    writer.append(make_day("2024-01-03", 3), "2024-01-04")
+    # the store stays complete only up to the failed chunk, the rows after it are on disk
+    index = read_written_ranges(path)
+    assert index["complete_before"] == pd.Timestamp("2024-01-02", tz="UTC").isoformat()
+    assert [r[2] for r in index["ranges"]] == [288, 1, 288]
+
+    with BackfillWriter(path, resume=True) as resumed:
+        assert resumed.complete_before == pd.Timestamp("2024-01-02", tz="UTC")
+        assert [r[2] for r in resumed.index["ranges"]] == [288]
+        store = load_carbon_intensity(path)
+        assert len(store) == 288
+        assert (store["value"] == 1).all()
+
+        resumed.append(make_day("2024-01-02", 2), "2024-01-03")
+        resumed.append(make_day("2024-01-03", 3), None)
+
+    store = load_carbon_intensity(path)
+    assert store.index.is_unique and store.index.is_monotonic_increasing
+    assert len(store) == 3 * 288 + 1
+    assert list(store["value"].iloc[[0, 288, 576]]) == [1, 2, 3]
+    assert read_written_ranges(path)["bytes"] == (tmp_path / "store.csv").stat().st_size
+
+
+def test_resume_drops_rows_written_after_the_last_index_update(make_day, tmp_path):
+    path = str(tmp_path / "store.csv")
+    BackfillWriter(path).append(make_day("2024-01-01", 1), "2024-01-02")
+    size = (tmp_path / "store.csv").stat().st_size
+    with open(path, "a") as f:
+        f.write("2024-01-02 00:05:00+00:00,9.0,1.0\n")
+
+    resumed = BackfillWriter(path, resume=True)
+    assert (tmp_path / "store.csv").stat().st_size == size
+    assert len(load_carbon_intensity(path)) == 288
+    resumed.append(make_day("2024-01-02", 2), None)
+    assert len(load_carbon_intensity(path)) == 2 * 288 + 1
+
+
+def test_backfill_to_store_raises_then_resumes_the_failed_chunk(make_standin, fail_requests_after, archive_csv, tmp_path):
+    standin = make_standin()
+    handle = fail_requests_after(standin, "2024-07-02")
+    path = str(tmp_path / "store.csv")
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        with pytest.raises(BackfillError) as failure:
+            backfill_to_store(datetime(2024, 6, 1), datetime(2024, 8, 1), "TEST", path, client=session)
+        assert [(start, end) for start, end, _ in failure.value.failed] == [(datetime(2024, 7, 1), datetime(2024, 8, 1))]
+        assert read_written_ranges(path)["complete_before"] == pd.Timestamp("2024-07-01", tz="UTC").isoformat()
+
+        standin.handle = handle
+        summary = backfill_to_store(datetime(2024, 6, 1), datetime(2024, 8, 1), "TEST", path, resume=True, client=session)
+    assert summary["failed"] == []
+    store = load_carbon_intensity(path)
+    expected = load_carbon_intensity(archive_csv).loc["2024-06-01":"2024-08-01 23:59"]
+    assert store.index.equals(expected.index)
+    np.testing.assert_allclose(store["value"], expected["value"])
+
+
+def test_store_archive_matches_in_memory_archive(make_day, tmp_path):
+    path = str(tmp_path / "store.csv")
+    with BackfillWriter(path) as writer:
+        writer.append(make_day("2024-01-01", 1, version="3.10"), "2024-01-02")
+        writer.append(make_day("2024-01-02", 2, version="2023-03-01"), "2024-01-03")
+        writer.append(make_day("2024-01-03", 3, version="3.10"), None)
+    ranges = read_written_ranges(path)["ranges"]
+    assert len(ranges) == 3
+
+    parts = list(iter_store_ranges(path))
+    assert [len(part) for part in parts] == [r[2] for r in ranges]
+    assert pd.concat(parts).index.equals(load_carbon_intensity(path).index)
+    assert parts[0]["version"].iloc[0] == "3.10"
+
+    rows = write_store_archive(path, str(tmp_path / "store.npz"), "TEST")
+    # the reference reads the whole store at once
+    store = pd.read_csv(path, index_col="point_time", dtype={"version": str})
+    store.index = pd.to_datetime(store.index, utc=True)
+    write_intensity_archive(str(tmp_path / "reference.npz"), store, "TEST")
+    archived = read_intensity_archive(str(tmp_path / "store.npz"))
+    expected = read_intensity_archive(str(tmp_path / "reference.npz"))
+    assert rows == len(expected)
+    pd.testing.assert_frame_equal(archived, expected)
+    assert archived.attrs == expected.attrs
+
+
+def test_store_archive_of_an_empty_store(make_day, tmp_path):
+    path = str(tmp_path / "store.csv")
+    BackfillWriter(path).append(make_day("2024-01-01", 1), None)
+    # overwriting the store resets its index
+    BackfillWriter(path).close()
+    assert read_written_ranges(path)["ranges"] == []
+    assert write_store_archive(path, str(tmp_path / "store.npz"), "TEST") == 0
+    assert read_intensity_archive(str(tmp_path / "store.npz")).empty
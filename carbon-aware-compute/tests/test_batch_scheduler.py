@@ -0,0 +1,142 @@
+import itertools
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import STEP_NS
+from utils.batch_scheduler import schedule_batch, schedule_batch_exact
+from utils.intensity_index import CarbonIntensityIndex
+
+
+def _covered_slots(origin: int, start_ns: int, duration_ns: int) -> list[int]:
+    """Brute-force grid slots [origin + k * step, origin + (k + 1) * step) overlapping a run."""
+    k = (start_ns - origin) // STEP_NS - 1
+    slots = []
+    while origin + k * STEP_NS < start_ns + duration_ns:
+        if origin + (k + 1) * STEP_NS > start_ns:
+            slots.append(k)
+        k += 1
+    return slots
+
+
+def _slot_loads(origin: int, runs) -> Counter:
+    loads = Counter()
+    for start_ns, duration_ns in runs:
+        loads.update(_covered_slots(origin, start_ns, duration_ns))
+    return loads
+
+
+def test_schedule_batch_capacity_on_slot_grid(intensity_frame, random_jobs, reference_candidates):
+    start_ns, duration_ns = random_jobs(intensity_frame, 300, seed=3, max_hours=2)
+    flex = timedelta(hours=3)
+    result, summary = schedule_batch(start_ns, duration_ns, flex, intensity_frame, capacity=3)
+
+    origin = intensity_frame.index[0].value
+    scheduled = result["scheduled_start"].notna().to_numpy()
+    starts = result["scheduled_start"].dt.as_unit("ns").astype("int64").to_numpy()
+    fitting = scheduled & ~result["over_capacity"].to_numpy()
+    assert max(_slot_loads(origin, zip(starts[fitting], duration_ns[fitting])).values()) <= 3
+
+    loads = _slot_loads(origin, zip(starts[scheduled], duration_ns[scheduled]))
+    assert summary["peak_load"] == max(loads.values())
+    assert summary["overloaded_slots"] == sum(load > 3 for load in loads.values())
+    assert summary["scheduled"] == scheduled.sum()
+
+    for job in np.flatnonzero(scheduled):
+        candidates, means = reference_candidates(intensity_frame, start_ns[job], duration_ns[job], pd.Timedelta(flex).value)
+        assert starts[job] in candidates
+        np.testing.assert_allclose(result["intensity"][job], means[candidates.index(starts[job])], rtol=1e-6)
+        np.testing.assert_allclose(result["naive_intensity"][job], means[0], rtol=1e-6)
+        np.testing.assert_allclose(result["unconstrained_intensity"][job], np.nanmin(means), rtol=1e-6)
+
+
+def test_schedule_batch_unlimited_capacity_is_unconstrained(intensity_frame, random_jobs):
+    start_ns, duration_ns = random_jobs(intensity_frame, 200, seed=4)
+    result, summary = schedule_batch(start_ns, duration_ns, timedelta(hours=2), intensity_frame, capacity=np.inf)
+    pd.testing.assert_series_equal(result["scheduled_start"], result["unconstrained_start"], check_names=False)
+    assert summary["over_capacity"] == 0
+    assert summary["carbon"] == pytest.approx(summary["unconstrained_carbon"])
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_schedule_batch_exact_matches_brute_force(make_series, reference_candidates, seed):
+    pytest.importorskip("scipy")
+    df = make_series(periods=288, seed=seed, drop=10)
+    rng = np.random.default_rng(seed)
+    origin = df.index[0].value
+    start_ns = origin + 3_600_000_000_000 + rng.integers(0, 1_800_000_000_000, 5)
+    duration_ns = rng.integers(5, 20, 5) * 60_000_000_000
+    flex_ns = 1_800_000_000_000
+
+    options = []
+    for start, duration in zip(start_ns, duration_ns):
+        starts, means = reference_candidates(df, start, duration, flex_ns)
+        options.append([(s, m * duration / 3.6e12) for s, m in zip(starts, means) if not np.isnan(m)])
+
+    best = np.inf
+    for choice in itertools.product(*options):
+        loads = _slot_loads(origin, zip([s for s, _ in choice], duration_ns))
+        if max(loads.values()) <= 1:
+            best = min(best, sum(carbon for _, carbon in choice))
+
+    _, summary = schedule_batch_exact(start_ns, duration_ns, timedelta(microseconds=flex_ns // 1000), df, capacity=1)
+    _, greedy = schedule_batch(start_ns, duration_ns, timedelta(microseconds=flex_ns // 1000), df, capacity=1)
+    if np.isfinite(best):
+        assert summary["over_capacity"] == 0
+        assert summary["carbon"] == pytest.approx(best)
+        if greedy["over_capacity"] == 0:
+            assert greedy["carbon"] >= best - 1e-9
+    else:
+        assert summary["over_capacity"] > 0
+
+
+def test_schedule_batch_empty_inputs(intensity_frame):
+    empty_index = CarbonIntensityIndex(np.empty(0, dtype=np.int64), np.empty(0))
+    for schedule in (schedule_batch, schedule_batch_exact):
+        if schedule is schedule_batch_exact:
+            pytest.importorskip("scipy")
+        for dataset in (intensity_frame, empty_index):
+            result, summary = schedule(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), timedelta(hours=1), dataset, 2)
+            assert len(result) == 0 and summary["jobs"] == 0
+
+        result, summary = schedule(["2024-06-02"], timedelta(hours=1), timedelta(hours=1), empty_index, 2)
+        assert summary["jobs"] == 1 and summary["scheduled"] == 0
+        assert result["scheduled_start"].isna().all()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_schedule_batch_exact_weighted_loads_match_brute_force(make_series, reference_candidates, seed):
+    pytest.importorskip("scipy")
+    df = make_series(periods=288, seed=10 + seed)
+    rng = np.random.default_rng(seed)
+    origin = df.index[0].value
+    start_ns = origin + 3_600_000_000_000 + rng.integers(0, 3_600_000_000_000, 5)
+    duration_ns = rng.integers(10, 25, 5) * 60_000_000_000
+    loads = rng.choice([1.0, 2.0], 5)
+    flex_ns = 2_400_000_000_000
+
+    options = []
+    for start, duration, load in zip(start_ns, duration_ns, loads):
+        starts, means = reference_candidates(df, start, duration, flex_ns)
+        options.append([(s, m * duration / 3.6e12 * load) for s, m in zip(starts, means) if not np.isnan(m)])
+
+    best = np.inf
+    for choice in itertools.product(*options):
+        slot_loads = Counter()
+        for (s, _), duration, load in zip(choice, duration_ns, loads):
+            for slot in _covered_slots(origin, s, duration):
+                slot_loads[slot] += load
+        if max(slot_loads.values()) <= 3:
+            best = min(best, sum(carbon for _, carbon in choice))
+
+    flex = timedelta(microseconds=flex_ns // 1000)
+    _, summary = schedule_batch_exact(start_ns, duration_ns, flex, df, capacity=3, loads=loads)
+    assert np.isfinite(best)
+    assert summary["over_capacity"] == 0 and summary["proven_optimal"]
+    assert summary["carbon"] == pytest.approx(best)
+    # the bounds bracket the optimum and the greedy placement is never better
+    assert summary["lp_bound"] <= summary["objective"] + 1e-9 <= summary["upper_bound"] + 2e-9
+    assert summary["greedy_gap"] >= -1e-9
@@ -0,0 +1,68 @@
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.best_start_table import BestStartTable, _sliding_argmin
+from utils.intensity_index import CarbonIntensityIndex
+from utils.job_scheduler import schedule_job
+
+
+@pytest.mark.parametrize("width", [1, 2, 7, 36, 500])
+def test_sliding_argmin_matches_brute_force(width):
+    rng = np.random.default_rng(width)
+    # few distinct values so ties are common, and some positions that must never be picked
+    values = rng.integers(0, 5, 400).astype(np.float64)
+    values[rng.random(400) < 0.1] = np.inf
+    best = _sliding_argmin(values, width)
+    for i in range(values.size):
+        assert best[i] == i + int(np.argmin(values[i:i + width])), i
+
+
+def test_lookup_matches_schedule_job_at_slot_starts(intensity_frame, tmp_path):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    flex = timedelta(hours=3)
+    buckets = [timedelta(minutes=15), timedelta(hours=1), timedelta(hours=4)]
+    table = BestStartTable.build(index, flex, buckets)
+    table.save(os.path.join(tmp_path, "table.npz"))
+    loaded = BestStartTable.load(os.path.join(tmp_path, "table.npz"))
+
+    rng = np.random.default_rng(5)
+    origins = index.times[rng.integers(0, len(index), 300)]
+    for origin, bucket in zip(origins, rng.choice(len(buckets), origins.size)):
+        # a job shorter than its bucket is scheduled with the bucket's duration
+        duration = buckets[bucket] - timedelta(minutes=int(rng.integers(0, 5)))
+        try:
+            expected = schedule_job(int(origin), buckets[bucket], flex, index)["optimal"]
+        except ValueError:
+            with pytest.raises(ValueError):
+                loaded.lookup(int(origin), duration)
+            continue
+        best_start, best_mean = loaded.lookup(int(origin), duration)
+        assert best_start == expected[0]
+        assert best_mean == pytest.approx(expected[1], rel=1e-6)
+
+    np.testing.assert_array_equal(loaded.best_offsets, table.best_offsets)
+    assert loaded.flex_window == table.flex_window
+
+
+def test_lookup_within_a_slot_never_starts_early(intensity_frame):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    table = BestStartTable.build(index, timedelta(hours=1), [timedelta(minutes=30)])
+    starts = index.times[100:200] + 90_000_000_000
+    best_starts, _ = table.lookup_many(starts, timedelta(minutes=30))
+    found = best_starts >= 0
+    assert found.any()
+    assert np.all(best_starts[found] >= starts[found])
+    assert np.all(best_starts[found] <= starts[found] + pd.Timedelta(hours=1).value)
+
+
+def test_lookup_rejects_jobs_outside_the_table(intensity_frame):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    table = BestStartTable.build(index, timedelta(hours=1), [timedelta(minutes=30)])
+    with pytest.raises(ValueError):
+        table.lookup(int(index.times[10]), timedelta(minutes=31))
+    with pytest.raises(ValueError):
+        table.lookup(int(index.times[0]) - 1, timedelta(minutes=30))
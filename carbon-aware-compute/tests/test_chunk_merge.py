@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.chunk_merge import _version_key, merge_chunks
+
+
+def _reference_merge(chunks: list[pd.DataFrame]) -> pd.DataFrame:
+    """Brute-force merge: per point time the row with the latest version, then the latest chunk, then the latest row."""
+    best = {}
+    for position, chunk in enumerate(chunks):
+        versions = chunk["version"] if "version" in chunk.columns else [None] * len(chunk)
+        for (point_time, row), version in zip(chunk.iterrows(), versions):
+            key = ((0, _version_key(version)) if version is not None else (-1,), position)
+            if point_time not in best or key >= best[point_time][0]:
+                best[point_time] = (key, row)
+    return pd.DataFrame([best[point_time][1] for point_time in sorted(best)], index=pd.DatetimeIndex(sorted(best), name="point_time"))
+
+
+def test_latest_version_wins_in_any_chunk_order(make_chunk):
+    old = make_chunk("2024-01-01 00:00", 10, 1, "2023-03-01")
+    new = make_chunk("2024-01-01 00:25", 10, 2, "2024-01-15")
+    for chunks in ([old, new], [new, old]):
+        merged = merge_chunks(chunks)
+        assert merged.index.is_monotonic_increasing and merged.index.is_unique
+        assert len(merged) == 15
+        assert (merged["value"].iloc[:5] == 1).all()
+        assert (merged["value"].iloc[5:] == 2).all()
+
+
+def test_versions_compare_by_number(make_chunk):
+    older = make_chunk("2024-01-01", 4, 1, "3.9")
+    newer = make_chunk("2024-01-01", 4, 2, "3.10")
+    assert (merge_chunks([newer, older])["version"] == "3.10").all()
+
+
+def test_version_tie_takes_the_later_chunk(make_chunk):
+    first = make_chunk("2024-01-01", 4, 1, "1.0")
+    second = make_chunk("2024-01-01 00:10", 4, 2, "1.0")
+    merged = merge_chunks([first, second])
+    assert list(merged["value"]) == [1, 1, 2, 2, 2, 2]
+    merged = merge_chunks([second, first])
+    assert list(merged["value"]) == [1, 1, 1, 1, 2, 2]
+
+
+def test_unsorted_chunk_is_rejected(make_chunk):
+    with pytest.raises(ValueError):
+        merge_chunks([make_chunk("2024-01-01", 4, 1).iloc[::-1]])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_merge_matches_brute_force(make_chunk, seed):
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for position in range(12):
+        start = pd.Timestamp("2024-01-01", tz="UTC") + pd.Timedelta(minutes=5 * int(rng.integers(0, 200)))
+        version = None if seed == 0 else str(rng.choice(["2023-03-01", "2024-01-15", "3.9", "3.10"]))
+        chunk = make_chunk(start, int(rng.integers(1, 60)), 0, version)
+        # some chunks repeat point times, still sorted
+        chunk = chunk.iloc[np.sort(rng.integers(0, len(chunk), len(chunk)))] if position % 4 == 3 else chunk
+        chunk["value"] = position * 1000 + np.arange(len(chunk))
+        if seed == 4 and position % 3 == 0:
+            # chunks without a version lose to any versioned row
+            chunk = chunk.drop(columns="version")
+        chunks.append(chunk)
+
+    merged = merge_chunks(chunks)
+    expected = _reference_merge(chunks)
+    np.testing.assert_array_equal(merged.index.as_unit("ns").asi8, expected.index.as_unit("ns").asi8)
+    np.testing.assert_array_equal(merged["value"].to_numpy(), expected["value"].to_numpy())
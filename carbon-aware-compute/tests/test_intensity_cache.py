@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from utils.historical_data import fetch_carbon_intensity
+from utils.intensity_cache import CarbonIntensityCache, merge_intervals
+from utils.series_archive import load_carbon_intensity
+from utils.watttime_session import WattTimeSession
+
+
+ORIGIN = pd.Timestamp("2024-06-01", tz="UTC")
+
+
+def _minute(timestamp: pd.Timestamp) -> int:
+    return (timestamp - ORIGIN) // pd.Timedelta(minutes=1)
+
+
+def _minutes(intervals) -> set[int]:
+    """Brute-force set of the whole minutes (since ORIGIN) inside closed intervals."""
+    covered = set()
+    for start, end in intervals:
+        covered.update(range(_minute(start), _minute(end) + 1))
+    return covered
+
+
+def _random_intervals(rng, count: int) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    starts = rng.integers(0, 200, count)
+    return [
+        (ORIGIN + pd.Timedelta(minutes=int(start)), ORIGIN + pd.Timedelta(minutes=int(start + length)))
+        for start, length in zip(starts, rng.integers(0, 30, count))
+    ]
+
+
+def test_merge_intervals_matches_minute_sets():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        intervals = _random_intervals(rng, int(rng.integers(1, 10)))
+        merged = merge_intervals(intervals)
+        assert _minutes(merged) == _minutes(intervals)
+        # disjoint, sorted and not touching
+        assert all(end < next_start for (_, end), (next_start, _) in zip(merged, merged[1:]))
+
+
+def test_missing_intervals_complement_the_cache(tmp_path):
+    rng = np.random.default_rng(1)
+    for trial in range(30):
+        cache = CarbonIntensityCache(str(tmp_path / str(trial)))
+        for start, end in _random_intervals(rng, int(rng.integers(0, 6))):
+            cache.store("TEST", pd.DataFrame(), start, end)
+        (start, end), = _random_intervals(rng, 1)
+        missing = cache.missing_intervals("TEST", start, end)
+        requested = _minutes([(start, end)])
+        covered = _minutes(cache.covered_intervals("TEST"))
+        # every uncovered minute is requested, and a gap only overlaps the cache at its ends
+        assert requested - covered <= _minutes(missing)
+        assert all(not (_minutes([(s, e)]) - {_minute(s), _minute(e)}) & covered for s, e in missing)
+        assert all(start <= s <= e <= end for s, e in missing)
+
+
+def test_cached_fetch_only_requests_gaps(make_standin, archive_csv, tmp_path):
+    standin = make_standin()
+    handle = standin.handle
+    requested = []
+
+    def recording(raw_path, headers):
+        if raw_path.startswith("/v3/historical"):
+            requested.append(raw_path)
+        return handle(raw_path, headers)
+
+    standin.handle = recording
+    cache = CarbonIntensityCache(str(tmp_path / "cache"))
+    archive = load_carbon_intensity(archive_csv)
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        periods = [("2024-06-02", "2024-06-05"), ("2024-06-04", "2024-06-08"), ("2024-06-03", "2024-06-07")]
+        fetched = []
+        for start, end in periods:
+            fetched.append(fetch_carbon_intensity(f"{start}T00:00:00Z", f"{end}T00:00:00Z", "TEST", cache=cache, client=session))
+    # the overlapping period only downloads the part after the cached one, the covered one nothing
+    assert len(requested) == 2 and "start=2024-06-05" in requested[1]
+
+    for df, (start, end) in zip(fetched, periods):
+        expected = archive.loc[pd.Timestamp(start, tz="UTC"):pd.Timestamp(end, tz="UTC")]
+        assert df.index.equals(expected.index.as_unit(df.index.unit))
+        np.testing.assert_allclose(df["value"], expected["value"], rtol=1e-6)
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.intensity_index import CarbonIntensityIndex
+
+
+def _gapped_hour() -> pd.DataFrame:
+    """An hour of 5 minute points from 09:30, valued by their minute offset, with the 10:05 row missing."""
+    point_times = pd.date_range("2024-06-01 09:30", periods=12, freq="5min", tz="UTC", name="point_time")
+    df = pd.DataFrame({"value": np.arange(12, dtype=float) * 5}, index=point_times)
+    return df.drop(pd.Timestamp("2024-06-01 10:05", tz="UTC"))
+
+
+def test_missing_rows_become_missing_slots():
+    index = CarbonIntensityIndex.from_dataframe(_gapped_hour())
+    assert len(index) == 12
+    assert index.step == 300_000_000_000
+    assert np.isnan(index.values[7])
+    assert np.array_equal(np.diff(index.times), np.full(11, index.step))
+
+
+def test_job_in_a_missing_slot_has_no_value():
+    index = CarbonIntensityIndex.from_dataframe(_gapped_hour())
+    start = pd.Timestamp("2024-06-01 10:06", tz="UTC")
+    assert np.isnan(index.job_window_means(start, timedelta(minutes=1))[0])
+    # the slot before the gap is still measured on its own
+    assert index.job_window_means(start - timedelta(minutes=5), timedelta(minutes=1))[0] == 30
+
+
+def test_window_must_be_fully_covered():
+    index = CarbonIntensityIndex.from_dataframe(_gapped_hour())
+    start = pd.Timestamp("2024-06-01 09:45", tz="UTC")
+    assert index.job_window_means(start, timedelta(minutes=20))[0] == pytest.approx(22.5)
+    assert np.isnan(index.job_window_means(start, timedelta(minutes=25))[0])
+
+
+def test_start_before_the_series_has_no_naive_value():
+    index = CarbonIntensityIndex.from_dataframe(_gapped_hour())
+    start = pd.Timestamp("2024-06-01 09:28", tz="UTC")
+    starts, means = index.start_window_means(start, timedelta(minutes=10), timedelta(minutes=5))
+    assert starts[0] == start.value and np.isnan(means[0])
+    assert list(pd.to_datetime(starts[1:], utc=True).strftime("%H:%M")) == ["09:30", "09:35"]
+    assert list(means[1:]) == [0, 5]
+    assert np.isnan(index.job_window_means(start, timedelta(minutes=5))[0])
+
+
+def test_start_window_means_match_brute_force(intensity_frame, random_jobs, reference_candidates):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    flex = timedelta(hours=2)
+    for start_ns, duration_ns in zip(*random_jobs(intensity_frame, 150)):
+        starts, means = index.start_window_means(int(start_ns), flex, int(duration_ns))
+        expected_starts, expected_means = reference_candidates(intensity_frame, start_ns, duration_ns, pd.Timedelta(flex).value)
+        assert list(starts) == expected_starts
+        np.testing.assert_allclose(means, expected_means, rtol=1e-12, equal_nan=True)
+
+
+def test_candidate_matrix_matches_start_window_means(intensity_frame, random_jobs):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    start_ns, duration_ns = random_jobs(intensity_frame, 200)
+    matrix_starts, matrix_means = index.candidate_matrix(start_ns, duration_ns, timedelta(hours=2))
+    for row, (start, duration) in enumerate(zip(start_ns, duration_ns)):
+        starts, means = index.start_window_means(int(start), timedelta(hours=2), int(duration))
+        assert list(matrix_starts[row, :starts.size]) == list(starts)
+        assert np.all(matrix_starts[row, starts.size:] == -1)
+        np.testing.assert_array_equal(matrix_means[row, :starts.size], means)
+        assert np.all(np.isnan(matrix_means[row, starts.size:]))
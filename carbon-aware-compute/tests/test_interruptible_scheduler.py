@@ -0,0 +1,114 @@
+import itertools
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import STEP_NS
+from utils.intensity_index import CarbonIntensityIndex
+from utils.interruptible_scheduler import (
+    _cheapest_chunked_slots,
+    _cheapest_slots,
+    schedule_interruptible_job,
+    schedule_interruptible_jobs,
+)
+
+
+def _reference_pick(values: np.ndarray, k: int, chunk: int) -> float:
+    """Brute-force cheapest total of k positions whose consecutive runs are all at least chunk long."""
+    best = np.inf
+    for picked in itertools.combinations(range(values.size), k):
+        runs = np.split(np.asarray(picked), np.flatnonzero(np.diff(picked) != 1) + 1)
+        if all(run.size >= chunk for run in runs):
+            best = min(best, values[list(picked)].sum())
+    return best
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_cheapest_slots_matches_combinations(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(4, 12))
+    values = rng.integers(0, 50, n).astype(np.float64)
+    values[rng.random(n) < 0.2] = np.inf
+    k = int(rng.integers(1, n + 1))
+    chunk = int(rng.integers(1, k + 1))
+
+    expected = _reference_pick(values, k, chunk)
+    chosen = _cheapest_slots(values, k, chunk)
+    if np.isinf(expected):
+        assert chosen is None
+        return
+    assert chosen is not None and chosen.size == k and np.all(np.diff(chosen) > 0)
+    assert values[chosen].sum() == pytest.approx(expected)
+
+    picked, feasible = _cheapest_chunked_slots(values[None, :], k, chunk)
+    assert feasible[0]
+    assert values[picked[0]].sum() == pytest.approx(expected)
+
+
+def test_cheapest_chunked_slots_rows_are_independent():
+    rng = np.random.default_rng(7)
+    values = rng.integers(0, 50, (12, 9)).astype(np.float64)
+    values[rng.random(values.shape) < 0.25] = np.inf
+    picked, feasible = _cheapest_chunked_slots(values, 4, 2)
+    for row in range(values.shape[0]):
+        expected = _reference_pick(values[row], 4, 2)
+        assert feasible[row] == np.isfinite(expected)
+        if feasible[row]:
+            assert values[row, picked[row]].sum() == pytest.approx(expected)
+
+
+def test_interruptible_job_matches_brute_force(intensity_frame, random_jobs, reference_window_mean):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    origin = intensity_frame.index[0].value
+    values = intensity_frame["value"].groupby(intensity_frame.index.as_unit("ns").asi8).last()
+    flex = timedelta(minutes=40)
+    for start_ns, duration_ns in zip(*random_jobs(intensity_frame, 60, seed=5, max_hours=0.4)):
+        # whole slots from the first slot at or after the start until that slot + flex + duration
+        first = origin + max(-(-(start_ns - origin) // STEP_NS), 0) * STEP_NS
+        slot_times = np.arange(first, first + pd.Timedelta(flex).value + duration_ns, STEP_NS)
+        slot_values = values.reindex(slot_times).to_numpy()
+        k = max(-(-duration_ns // STEP_NS), 1)
+        expected = _reference_pick(np.where(np.isnan(slot_values), np.inf, slot_values), k, 1)
+        if np.isinf(expected):
+            with pytest.raises(ValueError):
+                schedule_interruptible_job(start_ns, pd.Timedelta(duration_ns), flex, index)
+            continue
+
+        cases = schedule_interruptible_job(pd.Timestamp(start_ns, tz="UTC"), pd.Timedelta(duration_ns), flex, index)
+        assert len(cases["optimal"][0]) == k
+        assert cases["optimal"][1] == pytest.approx(expected / k)
+        np.testing.assert_allclose(cases["naive"][1], reference_window_mean(intensity_frame, start_ns, duration_ns), rtol=1e-6)
+
+
+def test_interruptible_jobs_match_single(intensity_frame, random_jobs):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    start_ns, duration_ns = random_jobs(intensity_frame, 120, seed=6, max_hours=3)
+    flex, min_chunk = timedelta(hours=4), timedelta(minutes=20)
+    batch = schedule_interruptible_jobs(start_ns, duration_ns, flex, index, min_chunk=min_chunk)
+    for row, (start, duration) in enumerate(zip(start_ns, duration_ns)):
+        try:
+            cases = schedule_interruptible_job(pd.Timestamp(start, tz="UTC"), pd.Timedelta(duration), flex, index, min_chunk)
+        except ValueError:
+            assert len(batch["slots"][row]) == 0 and np.isnan(batch["optimal"][row])
+            np.testing.assert_equal(batch["naive"][row], index.job_window_means(start, duration)[0])
+            continue
+        assert batch["optimal"][row] == pytest.approx(cases["optimal"][1])
+        np.testing.assert_allclose(batch["naive"][row], cases["naive"][1], rtol=1e-12, equal_nan=True)
+
+
+def test_interruptible_naive_is_nan_unless_covered(make_series):
+    df = make_series(periods=96)
+    df.iloc[2, 0] = np.nan
+    index = CarbonIntensityIndex.from_dataframe(df)
+    # an off-grid start covers five slots, one of them missing, and is not averaged over the rest
+    start = df.index[0] + pd.Timedelta(minutes=1)
+    cases = schedule_interruptible_job(start, timedelta(minutes=20), timedelta(hours=2), index)
+    assert np.isnan(cases["naive"][1])
+    assert list(cases["naive"][0]) == list(df.index[:5])
+    assert np.isfinite(cases["optimal"][1])
+
+    starts = [start, df.index[0] - pd.Timedelta(minutes=1), df.index[-3]]
+    batch = schedule_interruptible_jobs(starts, timedelta(minutes=20), timedelta(hours=2), index)
+    assert batch["naive"].isna().all()
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.intensity_index import CarbonIntensityIndex
+from utils.job_intensity import compute_job_carbon_intensities, compute_job_carbon_intensity, job_log_windows
+
+
+def _mask_mean(df: pd.DataFrame, start_time, end_time) -> float:
+    """The original boolean-mask implementation: the mean over start_time <= point_time <= end_time."""
+    window = df[(df.index >= start_time) & (df.index <= end_time)]
+    if window.empty:
+        raise ValueError("No data points found within the specified time window")
+    return window["value"].mean()
+
+
+def _random_windows(df: pd.DataFrame, random_jobs) -> tuple[pd.DatetimeIndex, pd.DatetimeIndex]:
+    start_ns, duration_ns = random_jobs(df, 500, seed=4)
+    return pd.to_datetime(start_ns, utc=True), pd.to_datetime(start_ns + duration_ns, utc=True)
+
+
+def test_index_matches_mask(intensity_frame, random_jobs):
+    starts, ends = _random_windows(intensity_frame, random_jobs)
+    for start_time, end_time in zip(starts, ends):
+        try:
+            expected = _mask_mean(intensity_frame, start_time, end_time)
+        except ValueError:
+            with pytest.raises(ValueError):
+                compute_job_carbon_intensity(start_time, end_time, intensity_frame)
+            continue
+        got = compute_job_carbon_intensity(start_time, end_time, intensity_frame)
+        np.testing.assert_allclose(got, expected, rtol=1e-9, equal_nan=True)
+
+
+def test_vectorized_matches_mask(intensity_frame, random_jobs):
+    starts, ends = _random_windows(intensity_frame, random_jobs)
+    expected = []
+    for start_time, end_time in zip(starts, ends):
+        window = intensity_frame[(intensity_frame.index >= start_time) & (intensity_frame.index <= end_time)]
+        expected.append(window["value"].mean() if not window.empty else np.nan)
+    got = compute_job_carbon_intensities(starts, ends, intensity_frame)
+    np.testing.assert_allclose(got, expected, rtol=1e-9, equal_nan=True)
+
+
+def test_point_time_column_matches_index(intensity_frame):
+    start_time = intensity_frame.index[100]
+    end_time = start_time + timedelta(hours=3)
+    by_column = intensity_frame.reset_index()
+    assert compute_job_carbon_intensity(start_time, end_time, by_column) == pytest.approx(
+        compute_job_carbon_intensity(start_time, end_time, intensity_frame)
+    )
+
+
+def test_in_place_edits_are_seen(intensity_frame):
+    df = intensity_frame.dropna()
+    start_time, end_time = df.index[10], df.index[20]
+    before = compute_job_carbon_intensity(start_time, end_time, df)
+    df.loc[df.index[10:21], "value"] += 100
+    assert compute_job_carbon_intensity(start_time, end_time, df) == pytest.approx(before + 100)
+    assert compute_job_carbon_intensities([start_time], [end_time], df)[0] == pytest.approx(before + 100)
+
+
+def test_job_log_windows_parse_the_log(intensity_frame, make_job_log):
+    jobs = make_job_log(intensity_frame, 50)
+    starts, ends = job_log_windows(jobs)
+    for start, end, (_, job) in zip(starts, ends, jobs.iterrows()):
+        expected_start = pd.Timestamp(job["StartTime"])
+        assert start == expected_start
+        # float seconds are converted to nanoseconds, rounding may differ by one
+        assert abs(end - expected_start - pd.Timedelta(seconds=job["ExecutionTimeSeconds"])) <= pd.Timedelta(1)
+
+
+def test_job_log_intensities_match_per_job(intensity_frame, make_job_log):
+    starts, ends = job_log_windows(make_job_log(intensity_frame, 400))
+    expected = []
+    for start_time, end_time in zip(starts, ends):
+        try:
+            expected.append(_mask_mean(intensity_frame, start_time, end_time))
+        except ValueError:
+            expected.append(np.nan)
+    from_frame = compute_job_carbon_intensities(starts, ends, intensity_frame)
+    from_index = compute_job_carbon_intensities(starts, ends, CarbonIntensityIndex.from_dataframe(intensity_frame))
+    np.testing.assert_allclose(from_frame, expected, rtol=1e-9, equal_nan=True)
+    np.testing.assert_array_equal(from_index, from_frame)
+
+
+def test_job_log_intensities_of_an_empty_log(intensity_frame):
+    starts, ends = job_log_windows(pd.DataFrame({"StartTime": [], "ExecutionTimeSeconds": []}))
+    assert compute_job_carbon_intensities(starts, ends, intensity_frame).size == 0
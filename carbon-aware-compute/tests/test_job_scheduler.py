@@ -0,0 +1,173 @@
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.intensity_index import CarbonIntensityIndex
+from utils.job_scheduler import CarbonAwareScheduler, candidate_percentiles, schedule_job, schedule_jobs
+from utils.series_store import FixedStrideSeries
+
+
+def _reference_cases(candidate_starts: list[int], candidate_means: list[float]) -> dict[str, tuple[int, float]]:
+    """The optimal, median, naive and worst cases of a brute-force candidate list."""
+    means = np.asarray(candidate_means)
+    valid = sorted(means[~np.isnan(means)])
+    return {
+        "optimal": (candidate_starts[int(np.nanargmin(means))], valid[0]),
+        "median": (None, valid[(len(valid) - 1) // 2]),
+        "naive": (candidate_starts[0], means[0]),
+        "worst": (candidate_starts[int(np.nanargmax(means))], valid[-1]),
+    }
+
+
+def _assert_cases_equal(cases: dict, expected: dict) -> None:
+    for case, (start, value) in expected.items():
+        if start is not None:
+            assert cases[case][0].value == start, case
+        np.testing.assert_allclose(cases[case][1], value, rtol=1e-6, equal_nan=True, err_msg=case)
+
+
+def test_schedule_job_matches_brute_force(intensity_frame, random_jobs, reference_candidates):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    flex = timedelta(hours=3)
+    for start_ns, duration_ns in zip(*random_jobs(intensity_frame, 150, seed=1)):
+        starts, means = reference_candidates(intensity_frame, start_ns, duration_ns, pd.Timedelta(flex).value)
+        if np.all(np.isnan(means)):
+            with pytest.raises(ValueError):
+                schedule_job(int(start_ns), int(duration_ns), flex, index)
+            continue
+        cases = schedule_job(int(start_ns), int(duration_ns), flex, index)
+        _assert_cases_equal(cases, _reference_cases(starts, means))
+        assert all(start >= pd.Timestamp(int(start_ns), tz="UTC") for start, _ in cases.values())
+
+
+def test_dataframe_and_series_store_agree_on_gapped_data(intensity_frame, random_jobs, tmp_path):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    store = FixedStrideSeries.create(os.path.join(tmp_path, "series"), intensity_frame, "CAISO_NORTH")
+    for start_ns, duration_ns in zip(*random_jobs(intensity_frame, 150, seed=2)):
+        try:
+            expected = schedule_job(int(start_ns), int(duration_ns), timedelta(hours=3), index)
+        except ValueError:
+            with pytest.raises(ValueError):
+                schedule_job(int(start_ns), int(duration_ns), timedelta(hours=3), store)
+            continue
+        cases = schedule_job(int(start_ns), int(duration_ns), timedelta(hours=3), store)
+        # the store keeps float32 values
+        _assert_cases_equal(cases, {case: (start.value, value) for case, (start, value) in expected.items()})
+
+
+def test_zero_flex_is_the_naive_case(intensity_frame):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    start = intensity_frame.index[100] + timedelta(minutes=2)
+    cases = schedule_job(start, timedelta(minutes=30), timedelta(0), index)
+    assert {start for start, _ in cases.values()} == {start}
+    assert len({value for _, value in cases.values()}) == 1
+
+
+def test_no_complete_window_raises(intensity_frame):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    with pytest.raises(ValueError):
+        schedule_job(intensity_frame.index[-1] + timedelta(hours=1), timedelta(hours=1), timedelta(hours=2), index)
+    with pytest.raises(ValueError):
+        schedule_job(intensity_frame.index[-1], timedelta(hours=1), timedelta(hours=2), index)
+
+
+def test_start_before_the_series_has_nan_naive(intensity_frame):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame.dropna())
+    start = intensity_frame.index[0] - timedelta(minutes=3)
+    cases = schedule_job(start, timedelta(minutes=30), timedelta(hours=1), index)
+    assert cases["naive"][0] == start and np.isnan(cases["naive"][1])
+    assert cases["optimal"][0] >= intensity_frame.index[0]
+
+
+def test_schedule_jobs_matches_schedule_job(intensity_frame, random_jobs):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    start_ns, duration_ns = random_jobs(intensity_frame, 200, seed=3)
+    result = schedule_jobs(start_ns, duration_ns, timedelta(hours=3), index)
+    for row, (start, duration) in enumerate(zip(start_ns, duration_ns)):
+        try:
+            cases = schedule_job(int(start), int(duration), timedelta(hours=3), index)
+        except ValueError:
+            assert np.isnan(result["optimal"][row]) and np.isnan(result["naive"][row])
+            continue
+        assert result["optimal_start"][row] == cases["optimal"][0]
+        for case in ("optimal", "median", "naive", "worst"):
+            np.testing.assert_equal(result[case][row], cases[case][1])
+
+
+def test_carbon_aware_scheduler_matches_schedule_job(intensity_frame, random_jobs):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    scheduler = CarbonAwareScheduler(intensity_frame, max_cached_durations=4)
+    start_ns, duration_ns = random_jobs(intensity_frame, 200, seed=7)
+    for start, duration in zip(start_ns, duration_ns):
+        try:
+            expected = schedule_job(int(start), int(duration), timedelta(hours=2), index)
+        except ValueError:
+            with pytest.raises(ValueError):
+                scheduler.schedule(int(start), pd.Timedelta(int(duration)), timedelta(hours=2))
+            continue
+        cases = scheduler.schedule(int(start), pd.Timedelta(int(duration)), timedelta(hours=2))
+        _assert_cases_equal(cases, {case: (start.value, value) for case, (start, value) in expected.items()})
+    assert scheduler.cache_info().currsize <= 4
+
+
+def test_carbon_aware_scheduler_caches_per_slot_count(intensity_frame):
+    scheduler = CarbonAwareScheduler(intensity_frame, max_cached_durations=2)
+    # 21 and 25 minutes both round up to 5 slots and share an aggregate
+    first = scheduler.rolling_means(timedelta(minutes=21))
+    assert scheduler.rolling_means(timedelta(minutes=25)) is first
+    assert scheduler.cache_info() == (1, 1, 2, 1)
+
+    # the brute-force mean over the 5 slots from each start, NaN unless all are present
+    values = intensity_frame["value"].reindex(pd.DatetimeIndex(scheduler.index.times, tz="UTC"))
+    expected = values[::-1].rolling(5, min_periods=5).mean()[::-1].to_numpy()
+    np.testing.assert_allclose(first, expected, rtol=1e-9, equal_nan=True)
+
+    scheduler.rolling_means(timedelta(minutes=60))
+    scheduler.rolling_means(timedelta(minutes=90))
+    # the least recently used aggregate was evicted
+    assert scheduler.cache_info().currsize == 2
+    assert scheduler.rolling_means(timedelta(minutes=25)) is not first
+    assert scheduler.cache_info().misses == 4
+
+
+@pytest.mark.parametrize("method", ["linear", "lower"])
+def test_candidate_percentiles_match_np_percentile(method):
+    rng = np.random.default_rng(9)
+    candidate_means = rng.normal(300, 50, (300, 25))
+    # ragged rows: a random number of missing candidates, some rows without any
+    candidate_means[rng.random(candidate_means.shape) < rng.random((300, 1))] = np.nan
+    candidate_means[:5] = np.nan
+    percentiles = [0, 5, 33.3, 50, 90, 100]
+    result = candidate_percentiles(candidate_means, percentiles, method=method)
+    for row, means in zip(result, candidate_means):
+        valid = means[~np.isnan(means)]
+        if not valid.size:
+            assert np.all(np.isnan(row))
+            continue
+        np.testing.assert_allclose(row, np.percentile(valid, percentiles, method=method), rtol=1e-12)
+
+
+def test_candidate_percentiles_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        candidate_percentiles(np.ones((2, 3)), [101])
+    with pytest.raises(ValueError):
+        candidate_percentiles(np.ones((2, 3)), [50], method="nearest")
+
+
+def test_schedule_jobs_reports_percentiles(intensity_frame, random_jobs, reference_candidates):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    start_ns, duration_ns = random_jobs(intensity_frame, 60, seed=4)
+    flex = timedelta(hours=3)
+    result = schedule_jobs(start_ns, duration_ns, flex, index, percentiles=(10, 90))
+    for row, (start, duration) in enumerate(zip(start_ns, duration_ns)):
+        _, means = reference_candidates(intensity_frame, start, duration, pd.Timedelta(flex).value)
+        valid = np.asarray(means)[~np.isnan(means)]
+        if not valid.size:
+            assert np.isnan(result["p10"][row]) and np.isnan(result["p90"][row])
+            continue
+        np.testing.assert_allclose([result["p10"][row], result["p90"][row]], np.percentile(valid, [10, 90]), rtol=1e-6)
+        # the median is the lower-rank candidate
+        assert result["median"][row] == pytest.approx(sorted(valid)[(valid.size - 1) // 2], rel=1e-6)
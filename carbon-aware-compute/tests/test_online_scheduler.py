@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.intensity_index import CarbonIntensityIndex
+from utils.job_scheduler import schedule_job
+from utils.online_scheduler import OnlineScheduler, _MinSegmentTree
+
+
+def _assert_matches_schedule_job(scheduler: OnlineScheduler, index: CarbonIntensityIndex, start_ns, duration_ns, flex) -> None:
+    try:
+        expected = schedule_job(int(start_ns), int(duration_ns), flex, index)
+    except ValueError:
+        with pytest.raises(ValueError):
+            scheduler.schedule(int(start_ns), int(duration_ns), flex)
+        return
+    cases = scheduler.schedule(int(start_ns), int(duration_ns), flex)
+    for case in ("optimal", "naive"):
+        np.testing.assert_allclose(cases[case][1], expected[case][1], rtol=1e-9, equal_nan=True, err_msg=case)
+    assert cases["naive"][0] == expected["naive"][0]
+    # ties between equal means may resolve to different starts, the value is what must match
+    assert index.job_window_means(cases["optimal"][0], int(duration_ns))[0] == pytest.approx(expected["optimal"][1])
+
+
+def test_matches_schedule_job_on_gapped_data(intensity_frame, random_jobs):
+    scheduler = OnlineScheduler.from_dataframe(intensity_frame)
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    for start_ns, duration_ns in zip(*random_jobs(intensity_frame, 200)):
+        _assert_matches_schedule_job(scheduler, index, start_ns, duration_ns, timedelta(hours=3))
+
+
+def test_appends_match_a_scheduler_built_at_once(intensity_frame, random_jobs):
+    split = len(intensity_frame) // 2
+    scheduler = OnlineScheduler.from_dataframe(intensity_frame.iloc[:split])
+    start_ns, duration_ns = random_jobs(intensity_frame, 100, seed=1)
+    # build the per-duration trees before the appends, so appends update them in place
+    for start, duration in zip(start_ns, duration_ns):
+        try:
+            scheduler.schedule(int(start), int(duration), timedelta(hours=3))
+        except ValueError:
+            pass
+    for point_time, value in intensity_frame.iloc[split:]["value"].items():
+        scheduler.append(point_time, value)
+
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    for start, duration in zip(start_ns, duration_ns):
+        _assert_matches_schedule_job(scheduler, index, start, duration, timedelta(hours=3))
+
+
+def test_start_before_the_series_has_nan_naive(intensity_frame):
+    scheduler = OnlineScheduler.from_dataframe(intensity_frame.dropna())
+    start = intensity_frame.index[0] - timedelta(minutes=3)
+    cases = scheduler.schedule(start, timedelta(minutes=30), timedelta(hours=1))
+    assert cases["naive"][0] == start and np.isnan(cases["naive"][1])
+    assert cases["optimal"][0] == intensity_frame.index[0] or cases["optimal"][0] > intensity_frame.index[0]
+
+
+def test_rejects_points_out_of_order(intensity_frame):
+    scheduler = OnlineScheduler.from_dataframe(intensity_frame)
+    with pytest.raises(ValueError):
+        scheduler.append(intensity_frame.index[-1], 1.0)
+
+
+def test_segment_tree_argmin_matches_brute_force():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 20, 100).astype(float)
+    values[rng.choice(100, 10, replace=False)] = np.inf
+    tree = _MinSegmentTree(values)
+    for lo, hi in rng.integers(0, 101, (300, 2)):
+        lo, hi = min(lo, hi), max(lo, hi)
+        position, value = tree.argmin(lo, hi)
+        window = values[lo:hi]
+        if not np.isfinite(window).any():
+            assert position == -1
+        else:
+            assert position == lo + int(np.argmin(window)) and value == window.min()
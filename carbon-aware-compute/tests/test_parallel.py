@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.intensity_index import CarbonIntensityIndex
+from utils.job_scheduler import schedule_jobs
+from utils.parallel import MIN_CHUNK_JOBS, map_job_chunks
+
+
+def test_map_job_chunks_keeps_job_order():
+    values = np.arange(3 * MIN_CHUNK_JOBS + 7)
+    chunks = map_job_chunks(lambda chunk: chunk.copy(), [values], max_workers=3)
+    assert len(chunks) == 3
+    np.testing.assert_array_equal(np.concatenate(chunks), values)
+    # too few jobs per chunk, or one worker, run the kernel once in the calling thread
+    assert len(map_job_chunks(lambda chunk: chunk, [values[:MIN_CHUNK_JOBS]], max_workers=3)) == 1
+    assert len(map_job_chunks(lambda chunk: chunk, [values], max_workers=1)) == 1
+
+
+def test_map_job_chunks_matches_kernels(intensity_frame, random_jobs):
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    start_ns, duration_ns = random_jobs(intensity_frame, 3 * MIN_CHUNK_JOBS, seed=2, max_hours=4)
+
+    chunks = map_job_chunks(index.window_means, [start_ns, start_ns + duration_ns], max_workers=3)
+    np.testing.assert_array_equal(np.concatenate(chunks), index.window_means(start_ns, start_ns + duration_ns))
+
+    def schedule_chunk(starts, durations):
+        return schedule_jobs(starts, durations, timedelta(hours=4), index, percentiles=(10, 90))
+
+    chunks = map_job_chunks(schedule_chunk, [start_ns, duration_ns], max_workers=3)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), schedule_chunk(start_ns, duration_ns))
@@ -0,0 +1,75 @@
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import STEP_NS
+from utils.intensity_index import CarbonIntensityIndex
+from utils.recurring_scheduler import optimize_recurring_phase, recurring_jobs
+from utils.series_store import FixedStrideSeries
+
+
+def _reference_phase_scores(values: dict[int, float], start: pd.Timestamp, end: pd.Timestamp, cadence_slots: int, slots: int) -> tuple[np.ndarray, np.ndarray]:
+    """Brute-force mean intensity and run count of each phase: every run whose window lies in [start, end], averaged over its points with data."""
+    sums, runs = np.zeros(cadence_slots), np.zeros(cadence_slots, dtype=np.int64)
+    midnight = start.normalize().value
+    run_start = start.value
+    while run_start + (slots - 1) * STEP_NS <= end.value:
+        window = [values.get(run_start + slot * STEP_NS, np.nan) for slot in range(slots)]
+        if not np.all(np.isnan(window)):
+            phase = (run_start - midnight) // STEP_NS % cadence_slots
+            sums[phase] += np.nanmean(window)
+            runs[phase] += 1
+        run_start += STEP_NS
+    with np.errstate(invalid="ignore"):
+        return np.where(runs > 0, sums / runs, np.nan), runs
+
+
+@pytest.mark.parametrize("duration", [timedelta(minutes=5), timedelta(minutes=22), timedelta(hours=1)])
+def test_phase_scores_match_brute_force(make_series, slot_values, duration, tmp_path):
+    df = make_series(nan=300)
+    slots = -(-pd.Timedelta(duration).value // STEP_NS)
+    start = pd.Timestamp("2024-06-02 06:00", tz="UTC")
+    # three days of run starts from the top of an hour, so no cadence below has a partial period
+    end = start + (3 * 288 + slots - 2) * pd.Timedelta(minutes=5)
+    shifts = [timedelta(minutes=minutes) for minutes in (-5, 0, 5, 10, 50)]
+    store = FixedStrideSeries.create(os.path.join(tmp_path, "series"), df, "TEST")
+    for dataset in (df, CarbonIntensityIndex.from_dataframe(df), store):
+        scores = optimize_recurring_phase(timedelta(minutes=10), duration, start, end, dataset, cadence_shifts=shifts)
+        assert scores["mean_intensity"].is_monotonic_increasing
+        assert sorted(scores["cadence"].unique()) == [pd.Timedelta(minutes=minutes) for minutes in (5, 10, 15, 20, 60)]
+        for cadence, phases in scores.groupby("cadence"):
+            phases = phases.sort_values("phase_offset")
+            cadence_slots = cadence.value // STEP_NS
+            assert list(phases["phase_offset"]) == list(pd.to_timedelta(np.arange(cadence_slots) * STEP_NS))
+            means, runs = _reference_phase_scores(slot_values(df), start, end, cadence_slots, slots)
+            np.testing.assert_array_equal(phases["runs"], runs)
+            np.testing.assert_allclose(phases["mean_intensity"], means, rtol=1e-5)
+
+
+def test_cadence_must_be_a_multiple_of_the_step(make_series):
+    df = make_series(periods=288)
+    with pytest.raises(ValueError):
+        optimize_recurring_phase(timedelta(minutes=7), timedelta(minutes=5), df.index[0], df.index[-1], df)
+    with pytest.raises(ValueError):
+        optimize_recurring_phase(timedelta(minutes=5), timedelta(minutes=5), df.index[0], df.index[-1], df, cadence_shifts=[timedelta(minutes=-5)])
+
+
+def test_recurring_jobs_summarizes_each_job():
+    starts = pd.to_datetime(["2024-06-01T00:12:03Z", "2024-06-01T00:22:41Z", "2024-06-01T00:33:00Z", "2024-06-01T00:02:00Z", "2024-06-01T01:02:00Z"])
+    job_log = pd.DataFrame({
+        "JobName": ["a", "a", "a", "b", "b"],
+        "MinuteShift": [10, 10, 10, 60, 60],
+        "StartTime": starts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "ExecutionTimeSeconds": [30, 90, 60, 600, 1200],
+    })
+    jobs = recurring_jobs(job_log)
+    assert jobs.loc["a", "cadence"] == pd.Timedelta(minutes=10)
+    assert jobs.loc["a", "duration"] == pd.Timedelta(seconds=60)
+    # phases 00:02:03, 00:02:41 and 00:03:00 round down to the 5 minute grid
+    assert jobs.loc["a", "phase_offset"] == pd.Timedelta(0)
+    assert jobs.loc["b", "cadence"] == pd.Timedelta(hours=1)
+    assert jobs.loc["b", "duration"] == pd.Timedelta(seconds=900)
+    assert jobs.loc["b", "phase_offset"] == pd.Timedelta(0)
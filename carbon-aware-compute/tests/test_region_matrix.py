@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.intensity_index import CarbonIntensityIndex
+from utils.job_scheduler import schedule_job
+from utils.region_matrix import RegionIntensityMatrix
+
+
+@pytest.fixture
+def regions(make_series) -> dict[str, pd.DataFrame]:
+    return {
+        "CAISO_NORTH": make_series(seed=1, drop=60, nan=20),
+        "SPP_TX": make_series(seed=2, drop=30),
+        # a region whose data starts a day later
+        "ERCOT_EASTTX": make_series(start="2024-06-02", periods=13 * 288, seed=3, drop=10),
+    }
+
+
+def test_rows_match_each_region_index(regions, random_jobs):
+    matrix = RegionIntensityMatrix.from_datasets(regions)
+    indexes = {region: CarbonIntensityIndex.from_dataframe(df) for region, df in regions.items()}
+    for start_ns, duration_ns in zip(*random_jobs(regions["CAISO_NORTH"], 100)):
+        starts, means = matrix.start_window_means(int(start_ns), timedelta(hours=2), int(duration_ns))
+        for row, index in enumerate(indexes.values()):
+            # a single region's means at the shared candidate starts
+            expected = index.job_window_means(starts, int(duration_ns))
+            np.testing.assert_allclose(means[row], expected, rtol=1e-12, equal_nan=True)
+
+
+def test_one_region_matches_schedule_job(regions, random_jobs):
+    df = regions["CAISO_NORTH"]
+    matrix = RegionIntensityMatrix.from_datasets({"CAISO_NORTH": df})
+    index = CarbonIntensityIndex.from_dataframe(df)
+    for start_ns, duration_ns in zip(*random_jobs(df, 100, seed=1)):
+        try:
+            expected = schedule_job(int(start_ns), int(duration_ns), timedelta(hours=2), index)
+        except ValueError:
+            with pytest.raises(ValueError):
+                schedule_job(int(start_ns), int(duration_ns), timedelta(hours=2), matrix)
+            continue
+        cases = schedule_job(int(start_ns), int(duration_ns), timedelta(hours=2), matrix)
+        for case in ("optimal", "naive", "worst"):
+            assert cases[case][0] == "CAISO_NORTH"
+            assert cases[case][1] == expected[case][0]
+            np.testing.assert_equal(cases[case][2], expected[case][1])
+
+
+def test_optimal_is_the_brute_force_minimum_over_regions(regions, random_jobs, reference_candidates):
+    matrix = RegionIntensityMatrix.from_datasets(regions)
+    for start_ns, duration_ns in zip(*random_jobs(regions["CAISO_NORTH"], 30, seed=2)):
+        best = np.inf
+        for df in regions.values():
+            _, means = reference_candidates(df, start_ns, duration_ns, pd.Timedelta(hours=2).value)
+            best = min([best, *(mean for mean in means if not np.isnan(mean))])
+        if not np.isfinite(best):
+            continue
+        cases = schedule_job(int(start_ns), int(duration_ns), timedelta(hours=2), matrix)
+        assert cases["optimal"][2] == pytest.approx(best)
+        assert cases["naive"][0] == "CAISO_NORTH"
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.best_start_table import BestStartTable
+from utils.intensity_index import CarbonIntensityIndex
+from utils.replay import best_start_table_policy, flex_window_policy, read_replay, replay_job_log
+
+
+def test_zero_flex_saves_nothing(intensity_frame, make_job_log, tmp_path):
+    make_job_log(intensity_frame, 2000).to_csv(tmp_path / "jobs.csv", index=False)
+    summary = replay_job_log(str(tmp_path / "jobs.csv"), intensity_frame, flex_window_policy(timedelta(0)), str(tmp_path / "replay"), chunk_size=500)
+
+    assert summary["jobs"] == 2000
+    assert summary["compared"] > 0
+    assert summary["mean_savings"] == 0
+    result = read_replay(str(tmp_path / "replay"))
+    compared = result["savings"].notna()
+    assert (result.loc[compared, "savings"] == 0).all()
+    assert (result.loc[compared, "policy_start"] == result.loc[compared, "start_time"]).all()
+
+
+def test_flex_never_costs_more(intensity_frame, make_job_log, tmp_path):
+    make_job_log(intensity_frame, 500).to_csv(tmp_path / "jobs.csv", index=False)
+    replay_job_log(str(tmp_path / "jobs.csv"), intensity_frame, flex_window_policy(timedelta(hours=4)), str(tmp_path / "replay"))
+
+    savings = read_replay(str(tmp_path / "replay"))["savings"].dropna()
+    assert (savings >= -1e-9).all()
+    assert savings.mean() > 0
+
+
+def test_flex_window_replay_matches_brute_force(intensity_frame, make_job_log, reference_window_mean, reference_candidates, tmp_path):
+    job_log = make_job_log(intensity_frame, 150, seed=8)
+    job_log.to_csv(tmp_path / "jobs.csv", index=False)
+    flex = timedelta(hours=2)
+    summary = replay_job_log(str(tmp_path / "jobs.csv"), intensity_frame, flex_window_policy(flex), str(tmp_path / "replay"), chunk_size=40)
+    result = read_replay(str(tmp_path / "replay"))
+
+    assert len(result) == len(job_log)
+    expected_start = pd.to_datetime(job_log["StartTime"], utc=True, format="ISO8601")
+    np.testing.assert_array_equal(result["start_time"].to_numpy(), expected_start.to_numpy())
+    for row in result.itertuples():
+        start_ns, duration_ns = row.start_time.value, row.duration.value
+        np.testing.assert_allclose(row.actual, reference_window_mean(intensity_frame, start_ns, duration_ns), rtol=1e-9, equal_nan=True)
+        starts, means = reference_candidates(intensity_frame, start_ns, duration_ns, pd.Timedelta(flex).value)
+        if np.all(np.isnan(means)):
+            assert pd.isna(row.policy_start) and np.isnan(row.policy)
+            continue
+        best = int(np.nanargmin(means))
+        assert row.policy_start.value == starts[best]
+        assert row.policy == pytest.approx(means[best], rel=1e-9)
+
+    compared = result["savings"].notna()
+    assert summary["compared"] == compared.sum()
+    assert summary["mean_savings"] == pytest.approx(result.loc[compared, "savings"].mean(), rel=1e-9)
+    assert summary["mean_actual"] == pytest.approx(result.loc[compared, "actual"].mean(), rel=1e-9)
+
+
+def test_best_start_table_policy_measures_the_true_duration(intensity_frame, make_job_log, reference_window_mean, tmp_path):
+    job_log = make_job_log(intensity_frame, 150, seed=9)
+    job_log.to_csv(tmp_path / "jobs.csv", index=False)
+    index = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    # the largest bucket is shorter than some jobs, which then get no policy start
+    table = BestStartTable.build(index, timedelta(hours=2), [timedelta(minutes=30), timedelta(hours=1), timedelta(hours=3)])
+    replay_job_log(str(tmp_path / "jobs.csv"), index, best_start_table_policy(table), str(tmp_path / "replay"))
+    result = read_replay(str(tmp_path / "replay"))
+
+    long_jobs = result["duration"] > pd.Timedelta(hours=3)
+    assert long_jobs.any() and result.loc[long_jobs, "policy_start"].isna().all()
+    for row in result[~long_jobs].itertuples():
+        try:
+            best_start, _ = table.lookup(row.start_time, row.duration)
+        except ValueError:
+            assert pd.isna(row.policy_start)
+            continue
+        assert row.policy_start == best_start
+        np.testing.assert_allclose(row.policy, reference_window_mean(intensity_frame, best_start.value, row.duration.value), rtol=1e-9, equal_nan=True)
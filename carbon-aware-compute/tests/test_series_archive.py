@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from utils.intensity_index import CarbonIntensityIndex
+from utils.series_archive import (
+    archive_path_for,
+    load_carbon_intensity,
+    load_intensity_index,
+    read_intensity_archive,
+    read_intensity_arrays,
+    write_intensity_archive,
+)
+
+
+def test_archive_round_trip_matches_csv(make_series, tmp_path):
+    df = make_series(periods=500, drop=30, nan=10, version="3.10")
+    csv_path = str(tmp_path / "carbon_intensity_TEST.csv")
+    df.to_csv(csv_path)
+    archive_path = archive_path_for(csv_path)
+    assert archive_path == str(tmp_path / "carbon_intensity_TEST.npz")
+
+    from_csv = load_carbon_intensity(csv_path)
+    write_intensity_archive(archive_path, from_csv, "TEST")
+    archived = load_carbon_intensity(archive_path)
+    assert archived.attrs == {"region": "TEST", "signal_type": "co2_moer"}
+    assert archived.index.equals(from_csv.index.as_unit("ns"))
+    # values are stored as float32
+    np.testing.assert_array_equal(archived["value"], from_csv["value"].to_numpy(dtype=np.float32))
+    # versions are kept as strings, 3.10 is not read back as 3.1
+    assert (from_csv["version"] == "3.10").all()
+    assert (archived["version"] == "3.10").all()
+
+
+def test_archive_sorts_rows_stably(make_series, tmp_path):
+    df = make_series(periods=50, version="1.0")
+    duplicate = df.iloc[[10]].assign(value=-1.0, version="2.0")
+    shuffled = pd.concat([df, duplicate]).sample(frac=1, random_state=0)
+    path = str(tmp_path / "archive.npz")
+    write_intensity_archive(path, shuffled.reset_index(), "TEST")
+
+    times, values, meta = read_intensity_arrays(path)
+    order = np.argsort(shuffled.index.as_unit("ns").asi8, kind="stable")
+    np.testing.assert_array_equal(times, shuffled.index.as_unit("ns").asi8[order])
+    np.testing.assert_array_equal(values, shuffled["value"].to_numpy(dtype=np.float32)[order])
+    assert meta["region"] == "TEST"
+    assert list(read_intensity_archive(path)["version"]) == list(shuffled["version"].to_numpy()[order])
+
+
+def test_archive_index_matches_dataframe_index(intensity_frame, tmp_path):
+    path = str(tmp_path / "archive.npz")
+    write_intensity_archive(path, intensity_frame, "TEST")
+    from_archive = load_intensity_index(path)
+    reference = CarbonIntensityIndex.from_dataframe(intensity_frame)
+    np.testing.assert_array_equal(from_archive.times, reference.times)
+    np.testing.assert_allclose(from_archive.values, reference.values, rtol=1e-6)
+    assert from_archive.step == reference.step
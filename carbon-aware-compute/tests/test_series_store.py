@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.series_store import FixedStrideSeries, open_region_series, region_series_path
+
+
+def _random_windows(df: pd.DataFrame, count: int, seed: int) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """Windows starting up to an hour outside the series, some on point times and some between them."""
+    rng = np.random.default_rng(seed)
+    first, last = df.index[0].value, df.index[-1].value
+    starts = rng.integers(first - 3_600_000_000_000, last + 3_600_000_000_000, count)
+    starts[::3] = df.index.as_unit("ns").asi8[rng.integers(0, len(df), starts[::3].size)]
+    lengths = rng.integers(0, 6 * 3600, count) * 1_000_000_000
+    lengths[::4] = rng.integers(0, 72, lengths[::4].size) * 300_000_000_000
+    return [
+        (pd.Timestamp(start, tz="UTC"), pd.Timestamp(start + length, tz="UTC"))
+        for start, length in zip(starts, lengths)
+    ]
+
+
+def test_window_mean_matches_mask(intensity_frame, tmp_path):
+    store = FixedStrideSeries.create(str(tmp_path / "store"), intensity_frame, "TEST")
+    for start, end in _random_windows(intensity_frame, 400, seed=0):
+        for inclusive_end in (True, False):
+            upper = intensity_frame.index <= end if inclusive_end else intensity_frame.index < end
+            window = intensity_frame.loc[(intensity_frame.index >= start) & upper, "value"].dropna()
+            if window.empty:
+                with pytest.raises(ValueError):
+                    store.window_mean(start, end, inclusive_end)
+                continue
+            assert store.window_mean(start, end, inclusive_end) == pytest.approx(window.mean(), rel=1e-6)
+
+
+def test_slots_hold_each_point_and_nan_gaps(intensity_frame, tmp_path):
+    store = FixedStrideSeries.create(str(tmp_path / "store"), intensity_frame, "TEST")
+    assert len(store) == (intensity_frame.index[-1] - intensity_frame.index[0]) // pd.Timedelta(minutes=5) + 1
+    grid = pd.date_range(intensity_frame.index[0], intensity_frame.index[-1], freq="5min")
+    expected = intensity_frame["value"].reindex(grid)
+    np.testing.assert_allclose(store.values, expected.to_numpy(dtype=np.float32), equal_nan=True)
+    for position in (0, 17, len(store) - 1):
+        assert store.position(store.time_at(position)) == position
+        assert store.position(store.time_at(position) + pd.Timedelta(minutes=4)) == position
+
+    # slices are views into the memory map
+    view = store.slice(intensity_frame.index[10], intensity_frame.index[40])
+    assert np.shares_memory(view, store.values)
+
+
+def test_index_between_matches_dataframe(intensity_frame, tmp_path):
+    FixedStrideSeries.create(region_series_path(str(tmp_path), "TEST"), intensity_frame, "TEST")
+    store = open_region_series(str(tmp_path), "TEST")
+    assert store.region == "TEST"
+    start, end = intensity_frame.index[100], intensity_frame.index[400]
+    index = store.index_between(start, end)
+    grid = pd.date_range(start, end, freq="5min")
+    np.testing.assert_array_equal(index.times, grid.as_unit("ns").asi8)
+    expected = intensity_frame["value"].reindex(grid).to_numpy(dtype=np.float32)
+    np.testing.assert_allclose(index.values, expected, equal_nan=True)
+
+
+def test_empty_dataset_is_rejected(intensity_frame, tmp_path):
+    with pytest.raises(ValueError):
+        FixedStrideSeries.create(str(tmp_path / "store"), intensity_frame.iloc[:0], "TEST")
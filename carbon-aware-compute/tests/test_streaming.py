@@ -0,0 +1,59 @@
+import asyncio
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.backfill_writer import read_written_ranges
+from utils.intensity_index import CarbonIntensityIndex
+from utils.series_archive import load_carbon_intensity
+from utils.streaming import build_index_from_stream, stream_carbon_intensity, write_stream_to_csv
+from utils.watttime_session import WattTimeSession
+
+
+def _stream(session, start="2024-06-01T00:00:00Z", end="2024-06-20T00:00:00Z", **kwargs):
+    return stream_carbon_intensity(start, end, "TEST", chunk_size=timedelta(days=3), client=session, **kwargs)
+
+
+def test_write_stream_matches_archive(make_standin, archive_csv, tmp_path):
+    standin = make_standin()
+    path = str(tmp_path / "stream.csv")
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        rows = asyncio.run(write_stream_to_csv(_stream(session), path))
+
+    expected = load_carbon_intensity(archive_csv).loc["2024-06-01":"2024-06-20 00:00"]
+    written = load_carbon_intensity(path)
+    assert rows == len(expected) == len(written)
+    assert written.index.equals(expected.index)
+    np.testing.assert_allclose(written["value"], expected["value"])
+    ranges = read_written_ranges(path)["ranges"]
+    assert sum(r[2] for r in ranges) == rows and len(ranges) == 7
+
+
+def test_write_stream_truncates_without_chunks(make_standin, tmp_path):
+    standin = make_standin()
+    path = str(tmp_path / "stream.csv")
+    with open(path, "w") as f:
+        f.write("point_time,value\n2020-01-01 00:00:00+00:00,1.0\n")
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        rows = asyncio.run(write_stream_to_csv(_stream(session, "2030-01-01T00:00:00Z", "2030-01-05T00:00:00Z"), path))
+    assert rows == 0
+    with open(path) as f:
+        assert f.read() == ""
+
+
+def test_stream_index_matches_archive(make_standin, archive_csv):
+    standin = make_standin()
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        index = asyncio.run(build_index_from_stream(_stream(session)))
+
+        async def collect_unordered():
+            return [df async for df in _stream(session, ordered=False, max_concurrency=3)]
+
+        unordered = pd.concat(asyncio.run(collect_unordered())).sort_index()
+
+    expected = load_carbon_intensity(archive_csv).loc["2024-06-01":"2024-06-20 00:00"]
+    reference = CarbonIntensityIndex.from_dataframe(expected)
+    np.testing.assert_array_equal(index.times, reference.times)
+    np.testing.assert_allclose(index.values, reference.values)
+    assert unordered.index.equals(expected.index.as_unit("ns"))
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.sweep import POLICIES, job_classes, savings_curve, sweep_flex_windows
+
+
+def _reference_policy_means(df: pd.DataFrame, start_ns: np.ndarray, duration_ns: np.ndarray, flex_ns: int, reference_candidates) -> dict[str, float]:
+    """Brute-force mean naive and policy intensity over the jobs with a complete naive window."""
+    totals, jobs = dict.fromkeys(["naive", *POLICIES], 0.0), 0
+    for start, duration in zip(start_ns, duration_ns):
+        _, means = reference_candidates(df, start, duration, flex_ns)
+        if np.isnan(means[0]):
+            continue
+        valid = sorted(np.asarray(means)[~np.isnan(means)])
+        jobs += 1
+        totals["naive"] += means[0]
+        totals["optimal"] += valid[0]
+        totals["median"] += valid[(len(valid) - 1) // 2]
+        totals["worst"] += valid[-1]
+    return {case: total / jobs for case, total in totals.items()} | {"jobs": jobs}
+
+
+def test_job_classes_split_the_log(intensity_frame, make_job_log):
+    job_log = make_job_log(intensity_frame, 50)
+    job_log["WarehouseSize"] = np.random.default_rng(1).choice(["Small", "Large", "X-Large"], len(job_log))
+    classes = job_classes(job_log)
+
+    assert sorted(classes) == ["Large", "Small", "X-Large"]
+    for label, (start_ns, duration_ns) in classes.items():
+        rows = job_log[job_log["WarehouseSize"] == label]
+        expected_start = pd.to_datetime(rows["StartTime"], utc=True, format="ISO8601").dt.as_unit("ns").astype("int64")
+        np.testing.assert_array_equal(start_ns, expected_start.to_numpy())
+        np.testing.assert_allclose(duration_ns, rows["ExecutionTimeSeconds"].to_numpy() * 1e9, atol=1e3)
+
+
+def test_sweep_matches_brute_force(intensity_frame, random_jobs, reference_candidates):
+    classes = {
+        "short": random_jobs(intensity_frame, 25, seed=11, max_hours=1),
+        "long": random_jobs(intensity_frame, 20, seed=12, max_hours=6),
+    }
+    flex_windows = [timedelta(0), timedelta(hours=1), timedelta(hours=3)]
+    # a task size that does not divide the classes, so batches are summed across tasks
+    sweep = sweep_flex_windows(classes, intensity_frame, flex_windows, max_workers=2, task_size=7)
+
+    assert len(sweep) == len(classes) * len(flex_windows) * len(POLICIES)
+    for (job_class, flex_window), rows in sweep.groupby(["job_class", "flex_window"]):
+        expected = _reference_policy_means(intensity_frame, *classes[job_class], flex_window.value, reference_candidates)
+        rows = rows.set_index("policy")
+        assert (rows["jobs"] == expected["jobs"]).all()
+        assert rows["naive"].to_numpy() == pytest.approx(expected["naive"], rel=1e-9)
+        for policy in POLICIES:
+            assert rows.loc[policy, "intensity"] == pytest.approx(expected[policy], rel=1e-9)
+            assert rows.loc[policy, "savings"] == pytest.approx(expected["naive"] - expected[policy], rel=1e-6, abs=1e-9)
+        if flex_window == timedelta(0):
+            assert rows["savings"].abs().max() < 1e-9
+
+    curve = savings_curve(sweep, metric="savings")
+    assert list(curve.index) == [pd.Timedelta(flex_window) for flex_window in flex_windows]
+    assert curve[("optimal", "long")].is_monotonic_increasing
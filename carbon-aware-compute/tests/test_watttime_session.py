@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.series_archive import load_carbon_intensity
+from utils.watttime_session import WattTimeSession
+
+
+def test_session_matches_archive(make_standin, archive_csv):
+    standin = make_standin()
+    expected = load_carbon_intensity(archive_csv)
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        # more than one month-long request, answered out of order by the SDK's threads
+        df = session.get_historical_pandas("2024-06-01T00:00:00Z", "2024-08-09T23:55:00Z", "TEST")
+    assert df["point_time"].is_monotonic_increasing and df["point_time"].is_unique
+    pd.testing.assert_series_equal(
+        df.set_index("point_time")["value"],
+        expected["value"],
+        check_names=False,
+        check_index_type=False,
+    )
+
+
+def test_session_logs_in_once_across_threads(make_standin):
+    standin = make_standin(latency=0.01)
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            sizes = list(executor.map(
+                lambda day: len(session.get_historical_pandas(f"2024-06-{day:02d}T00:00:00Z", f"2024-06-{day:02d}T23:55:00Z", "TEST")),
+                range(1, 25),
+            ))
+        stats = session.latency_stats()
+    assert sizes == [288] * 24
+    assert stats["logins"] == 1 and stats["requests"] == 24
+    assert standin.stats["requests"] == 25
+    assert stats["p50"] >= 0.01
+
+
+def test_session_logs_in_again_after_401(make_standin):
+    standin = make_standin()
+    handle = standin.handle
+    rejected = []
+
+    def reject_first_token(raw_path, headers):
+        # the first token is revoked by the time of the first data request
+        if raw_path.startswith("/v3/") and not rejected:
+            rejected.append(raw_path)
+            return 401, {"error": "Token expired"}, {}
+        return handle(raw_path, headers)
+
+    standin.handle = reject_first_token
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        df = session.get_historical_pandas("2024-06-01T00:00:00Z", "2024-06-01T01:00:00Z", "TEST")
+        assert len(df) == 13 and session.logins == 2 and len(rejected) == 1
+
+
+def test_session_passes_imputed_marker_and_empty_periods(make_standin):
+    standin = make_standin()
+    seen = []
+    handle = standin.handle
+    standin.handle = lambda raw_path, headers: seen.append(raw_path) or handle(raw_path, headers)
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        session.get_historical_pandas("2024-06-01T00:00:00Z", "2024-06-01T01:00:00Z", "TEST", include_imputed_marker=True)
+        assert session.get_historical_pandas("2030-01-01T00:00:00Z", "2030-01-01T01:00:00Z", "TEST").empty
+    assert "include_imputed_marker=true" in seen[1]
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import requests
+
+from utils.series_archive import write_intensity_archive
+from utils.watttime_session import WattTimeSession
+
+
+def test_archive_mode_serves_archived_rows(make_standin, make_series, tmp_path):
+    df = make_series(periods=288, drop=20, nan=5, version="2023-03-01")
+    # a duplicated point time is served once, with its last row
+    duplicate = df.iloc[[10]].assign(value=1.0, version="2024-01-01")
+    path = str(tmp_path / "archive.npz")
+    write_intensity_archive(path, pd.concat([df, duplicate]), "GAPPY")
+    standin = make_standin(archives={"GAPPY": path})
+
+    with WattTimeSession("user", "password", base_url=standin.url) as session:
+        served = session.get_historical_pandas(df.index[0], df.index[-1], "GAPPY").set_index("point_time")
+
+    expected = df[df["value"].notna()].copy()
+    expected.loc[df.index[10], ["value", "version"]] = [1.0, "2024-01-01"]
+    assert served.index.equals(expected.index.as_unit("ns"))
+    np.testing.assert_allclose(served["value"], expected["value"], rtol=1e-6)
+    assert served["version"].tolist() == expected["version"].tolist()
+
+
+def test_record_mode_relays_upstream_responses(make_standin, tmp_path):
+    upstream = make_standin()
+    handle = upstream.handle
+
+    def plain_text_errors(raw_path, headers):
+        if "region=BROKEN" in raw_path:
+            return 502, b"<html>Bad Gateway</html>", {"Content-Type": "text/html"}
+        return handle(raw_path, headers)
+
+    upstream.handle = plain_text_errors
+    recorder = make_standin(mode="record", recordings_dir=str(tmp_path / "recordings"), upstream_url=upstream.url)
+    auth = {"Authorization": "Bearer token"}
+    params = {"region": "TEST", "start": "2024-06-01T00:00:00Z", "end": "2024-06-01T01:00:00Z"}
+
+    rsp = requests.get(f"{recorder.url}/v3/historical", params={**params, "region": "BROKEN"}, headers=auth, timeout=10)
+    assert rsp.status_code == 502
+    assert rsp.content == b"<html>Bad Gateway</html>"
+    assert rsp.headers["Content-Type"] == "text/html"
+
+    recorded = requests.get(f"{recorder.url}/v3/historical", params=params, headers=auth, timeout=10)
+    direct = requests.get(f"{upstream.url}/v3/historical", params=params, headers=auth, timeout=10)
+    assert recorded.status_code == 200 and recorded.content == direct.content
+
+    replayer = make_standin(mode="replay", recordings_dir=str(tmp_path / "recordings"))
+    replayed = requests.get(f"{replayer.url}/v3/historical", params=params, headers=auth, timeout=10)
+    assert replayed.status_code == 200 and replayed.content == direct.content
+    assert replayed.headers["Content-Type"] == direct.headers["Content-Type"]
+    missing = requests.get(f"{replayer.url}/v3/historical", params={**params, "region": "BROKEN"}, headers=auth, timeout=10)
+    assert missing.status_code == 404 and replayer.stats["replay_misses"] == 1
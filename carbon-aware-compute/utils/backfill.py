@@ -0,0 +1,265 @@
+"""Concurrent chunked backfill of historical carbon intensity data
+
+Every backfill in the package (this one, backfill_to_store, resumable_backfill and
+stream_carbon_intensity) fetches through _fetch_with_retries: every HTTP request first takes a
+token from a bucket refilled at the API's rate limit, and requests failing with a transient error
+(429, 5xx, connection errors, timeouts) are retried with jittered exponential backoff.
+"""
+
+
+import random
+import threading
+import time
+from typing import Optional, Union
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import requests
+from watttime import WattTimeHistorical
+
+from .chunk_merge import merge_chunks
+from .historical_data import _fetch_from_api
+from .watttime_session import HISTORICAL_CHUNK, default_session
+
+
+# WattTime allows 10 requests per second per account
+DEFAULT_RATE = 10.0
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Attempts per request before a chunk is given up on
+DEFAULT_MAX_ATTEMPTS = 6
+
+
+class BackfillError(RuntimeError):
+    """Raised when backfill chunks still fail after all attempts; failed lists (chunk start, chunk end, error)."""
+
+    def __init__(self, failed: list[tuple[datetime, datetime, str]]):
+        self.failed = failed
+        super().__init__(f"{len(failed)} chunks failed:\n" + "\n".join(
+            f"{chunk_start.strftime('%Y-%m-%d')} to {chunk_end.strftime('%Y-%m-%d')}: {error}"
+            for chunk_start, chunk_end, error in failed
+        ))
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire blocks until a token is available."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate (float): Tokens added per second
+            capacity (Optional[float]): The largest burst (defaults to one second worth of tokens)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Takes one token, sleeping until it has been refilled if the bucket is empty."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # reserve the token now and wait for it outside the lock, so waiters queue up in order
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, rng: random.Random) -> float:
+    """Returns the full-jitter exponential backoff before retry number attempt (0-based)."""
+    return rng.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """Returns the delay requested by a transient failure, or None if it should not be retried."""
+    while exc is not None:
+        if isinstance(exc, requests.HTTPError) and exc.response is not None:
+            if exc.response.status_code not in RETRYABLE_STATUS:
+                return None
+            try:
+                return float(exc.response.headers.get("Retry-After", 0))
+            except ValueError:
+                return 0.0
+        if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+            return 0.0
+        # _fetch_from_api re-raises API errors as ValueError, the original is the context
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+def _request_ranges(start: pd.Timestamp, end: pd.Timestamp) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """Splits [start, end] into ranges of at most HISTORICAL_CHUNK, each served by a single request."""
+    ranges = []
+    while True:
+        ranges.append((start, min(start + HISTORICAL_CHUNK, end)))
+        if ranges[-1][1] == end:
+            return ranges
+        # neighbouring requests share their boundary point, merge_chunks keeps it once
+        start = ranges[-1][1]
+
+
+def _fetch_with_retries(
+    start_time: Union[str, datetime],
+    end_time: Union[str, datetime],
+    region: str,
+    client: WattTimeHistorical,
+    bucket: TokenBucket,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    rng: Optional[random.Random] = None,
+) -> pd.DataFrame:
+    """
+    Fetches [start_time, end_time] one request at a time, taking a token per request and retrying
+    transient failures; raises the last error once a request runs out of attempts.
+
+    This is the single fetch path of every backfill (backfill_carbon_intensity, backfill_to_store,
+    resumable_backfill and stream_carbon_intensity).
+
+    Returns:
+        pd.DataFrame: The data indexed by point_time, sorted, one row per point_time
+    """
+    rng = rng or random.Random()
+    parts = []
+    request_ranges = _request_ranges(pd.to_datetime(start_time, utc=True), pd.to_datetime(end_time, utc=True))
+    for request_start, request_end in request_ranges:
+        request_bounds = request_start.strftime("%Y-%m-%dT%H:%M:%SZ"), request_end.strftime("%Y-%m-%dT%H:%M:%SZ")
+        for attempt in range(max_attempts):
+            bucket.acquire()
+            try:
+                part = _fetch_from_api(client, *request_bounds, region)
+                break
+            except Exception as e:
+                retry_after = _retry_after(e)
+                if retry_after is None or attempt == max_attempts - 1:
+                    raise
+                delay = max(retry_after, backoff_delay(attempt, base_delay, max_delay, rng))
+                cause = e.__cause__ or e.__context__ or e
+                print(
+                    f"Retrying {region} {request_start.strftime('%Y-%m-%d')} to {request_end.strftime('%Y-%m-%d')} "
+                    f"in {delay:.1f}s: {str(cause)}"
+                )
+                time.sleep(delay)
+        part.index = pd.to_datetime(part.index, utc=True)
+        parts.append(part if part.index.is_monotonic_increasing else part.sort_index())
+    return merge_chunks(parts)
+
+
+def _chunk_bounds(chunk_start: datetime, chunk_end: datetime) -> tuple[str, str]:
+    """Returns the request bounds of a backfill chunk: its first day through the end of its last day."""
+    return chunk_start.strftime("%Y-%m-%dT00:00:00Z"), chunk_end.strftime("%Y-%m-%dT23:59:59Z")
+
+
+def _fetch_chunk(
+    chunk_start: datetime,
+    chunk_end: datetime,
+    region: str,
+    client: WattTimeHistorical,
+    bucket: TokenBucket,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    rng: Optional[random.Random] = None,
+) -> pd.DataFrame:
+    """Fetches one backfill chunk with _fetch_with_retries, raising its last error if it still fails."""
+    print(f"Fetching data from {chunk_start.strftime('%Y-%m-%d')} to {chunk_end.strftime('%Y-%m-%d')}...")
+    chunk_df = _fetch_with_retries(*_chunk_bounds(chunk_start, chunk_end), region, client, bucket, max_attempts, rng=rng)
+    print(f"Successfully fetched data for period ending {chunk_end.strftime('%Y-%m-%d')}")
+    return chunk_df
+
+
+def _check_failures(failed: list[tuple[datetime, datetime, str]], skip_failed: bool) -> None:
+    """Raises a BackfillError listing the failed chunks, or only reports them if skip_failed."""
+    if not failed:
+        return
+    if not skip_failed:
+        raise BackfillError(failed)
+    for chunk_start, chunk_end, error in failed:
+        print(f"Skipping period {chunk_start.strftime('%Y-%m-%d')} to {chunk_end.strftime('%Y-%m-%d')}: {error}")
+
+
+def plan_backfill_chunks(start_date: datetime, end_date: datetime) -> list[tuple[datetime, datetime]]:
+    """
+    Split a backfill period into the month-long chunks the WattTime API can serve.
+    
+    Args:
+        start_date (datetime): The first day of the backfill
+        end_date (datetime): The last day of the backfill
+    
+    Returns:
+        list[tuple[datetime, datetime]]: The (chunk start, chunk end) days, in chronological order
+    """
+    chunks = []
+    current_start = start_date
+    months = 1
+    while current_start < end_date:
+        # Add months to start_date, so a day missing from a month (e.g. the 31st) is clamped to
+        # that month's last day without shifting the later chunks
+        next_month = (pd.Timestamp(start_date) + pd.DateOffset(months=months)).to_pydatetime()
+        
+        # If next_month is beyond our end_date, use end_date instead
+        chunks.append((current_start, min(next_month, end_date)))
+        current_start = next_month
+        months += 1
+    return chunks
+
+
+def backfill_carbon_intensity(
+    start_date: datetime,
+    end_date: datetime,
+    region: str,
+    max_workers: int = 4,
+    client: Optional[WattTimeHistorical] = None,
+    rate: float = DEFAULT_RATE,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    skip_failed: bool = False,
+) -> pd.DataFrame:
+    """
+    Fetches carbon intensity data for a long period by fetching month-long chunks concurrently.
+    
+    All chunks are planned up front and submitted to a bounded thread pool sharing one client,
+    then merged in chronological order, keeping one row per point_time where neighbouring chunks
+    overlap (the latest version wins). Requests are rate limited and transient failures retried;
+    if chunks still fail, the backfill raises rather than returning data with holes, unless
+    skip_failed is set.
+    
+    Args:
+        start_date (datetime): The first day of the backfill
+        end_date (datetime): The last day of the backfill
+        region (str): The power region to fetch data for (e.g., 'CAISO_NORTH')
+        max_workers (int): The maximum number of chunks fetched at the same time
+        client (Optional[WattTimeHistorical]): WattTime client (or compatible stub) shared by all
+            chunk fetches. Defaults to the shared pooled WattTimeSession
+        rate (float): The maximum number of requests per second, across all workers
+        max_attempts (int): The number of attempts per request before its chunk fails
+        skip_failed (bool): Report failed chunks and return the data of the others instead of raising
+    
+    Returns:
+        pd.DataFrame: The combined data of all successful chunks indexed by point_time
+
+    Raises:
+        BackfillError: If some chunks still failed after all attempts and skip_failed is not set
+    """
+    client = client or default_session()
+    bucket = TokenBucket(rate)
+    chunks = plan_backfill_chunks(start_date, end_date)
+    
+    chunk_dfs = []
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_fetch_chunk, *chunk, region, client, bucket, max_attempts) for chunk in chunks]
+        # collect in submission order, whatever order the requests finish in
+        for (chunk_start, chunk_end), future in zip(chunks, futures):
+            try:
+                chunk_dfs.append(future.result())
+            except Exception as e:
+                failed.append((chunk_start, chunk_end, str(e)))
+    _check_failures(failed, skip_failed)
+    
+    # each chunk ends on the next chunk's first day, so the boundary days come back twice
+    return merge_chunks(chunk_dfs)
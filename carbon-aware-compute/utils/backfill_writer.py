@@ -0,0 +1,343 @@
+"""Constant-memory backfill straight into a CSV store, with an index of the written ranges
+
+backfill_to_store fetches the monthly chunks with a bounded number in flight and hands each one,
+in chronological order, to a BackfillWriter as soon as it arrives. The writer appends the rows
+no later chunk can overlap to the CSV and holds back the rest (the boundary day the next chunk
+fetches again) to merge them with that chunk. After every append a sidecar index records the
+written ranges and byte offsets, so peak memory is bounded by a few chunks however long the
+backfill, and an interrupted backfill can resume after the last complete chunk. The same index
+lets iter_store_ranges and write_store_archive read the store back one range at a time.
+"""
+
+
+import io
+import json
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Iterator, Optional, Union
+import numpy as np
+import pandas as pd
+from watttime import WattTimeHistorical
+
+from .backfill import (
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_RATE,
+    TokenBucket,
+    _check_failures,
+    _fetch_chunk,
+    plan_backfill_chunks,
+)
+from .chunk_merge import merge_chunks
+from .intensity_index import to_epoch_ns
+from .watttime_session import default_session
+
+
+RANGES_SUFFIX = ".ranges.json"
+
+
+def read_written_ranges(path: str) -> dict:
+    """
+    Read the index of a CSV store written by BackfillWriter.
+
+    Args:
+        path (str): The CSV path
+
+    Returns:
+        dict: The columns, the number of valid bytes, the time before which the store is complete
+            and the written ranges as [first point_time, last point_time, rows, start byte, end byte]
+    """
+    with open(path + RANGES_SUFFIX) as f:
+        return json.load(f)
+
+
+class BackfillWriter:
+    """
+    Appends chronological chunks to a CSV store, keeping one row per point_time.
+
+    Chunks are passed in chronological order together with the time the next chunk starts.
+    Rows before that time are final and appended right away; the rest is held back and merged
+    with the next chunk, so only one chunk and its overlap are ever held in memory.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        resume: bool = False,
+        on_write: Optional[Callable[[pd.DataFrame], None]] = None,
+    ):
+        """
+        Args:
+            path (str): The CSV path
+            resume (bool): Continue a store written earlier instead of overwriting it; it is
+                truncated to the ranges before complete_before
+            on_write (Optional[Callable[[pd.DataFrame], None]]): Called with the rows of every
+                append right after they are written, e.g. to build an archive alongside the CSV
+        """
+        self.path = path
+        self.on_write = on_write
+        self.index = {"columns": None, "bytes": 0, "complete_before": None, "ranges": []}
+        if resume and os.path.exists(path) and os.path.exists(path + RANGES_SUFFIX):
+            self.index = read_written_ranges(path)
+            # rows written after a failed chunk (or after the last index update) are dropped,
+            # a resumed backfill fetches them again
+            before = self.complete_before
+            self.index["ranges"] = [
+                r for r in self.index["ranges"] if before is not None and pd.Timestamp(r[1]) < before
+            ]
+            self.index["bytes"] = self.index["ranges"][-1][4] if self.index["ranges"] else 0
+            with open(path, "r+b") as f:
+                f.truncate(self.index["bytes"])
+        else:
+            open(path, "w").close()
+            # replace the index of an earlier store right away, it no longer matches the file
+            self._save_index()
+        self._tail: Optional[pd.DataFrame] = None
+        self._failed = False
+
+    @property
+    def complete_before(self) -> Optional[pd.Timestamp]:
+        """The time before which the store is complete: up to the first failed chunk (None before any append)."""
+        before = self.index["complete_before"]
+        return pd.Timestamp(before) if before is not None else None
+
+    def append(
+        self,
+        chunk: pd.DataFrame,
+        next_start: Optional[Union[str, datetime]] = None,
+        failed: bool = False,
+    ) -> int:
+        """
+        Append a chunk, holding back the rows at or after next_start.
+
+        Args:
+            chunk (pd.DataFrame): The chunk data indexed by point_time
+            next_start (Optional[Union[str, datetime]]): The first time the next chunk may hold;
+                None flushes everything
+            failed (bool): The chunk could not be fetched (pass it empty); complete_before stops
+                advancing so a resume fetches it again
+
+        Returns:
+            int: The number of rows written to the store
+        """
+        if not chunk.empty:
+            chunk = chunk.copy()
+            chunk.index = pd.to_datetime(chunk.index, utc=True)
+            if not chunk.index.is_monotonic_increasing:
+                chunk = chunk.sort_index()
+        merged = merge_chunks([df for df in (self._tail, chunk) if df is not None])
+        if next_start is None:
+            ready, self._tail = merged, None
+        else:
+            next_start = pd.to_datetime(next_start, utc=True)
+            split = merged.index.searchsorted(next_start, side="left")
+            ready, self._tail = merged.iloc[:split], merged.iloc[split:]
+        written = self._write(ready)
+        self._failed = self._failed or failed
+        if next_start is not None and not self._failed:
+            self.index["complete_before"] = next_start.isoformat()
+        self._save_index()
+        return written
+
+    def close(self) -> int:
+        """Write the held-back rows; returns the number of rows written."""
+        return self.append(pd.DataFrame(), None) if self._tail is not None else 0
+
+    def _write(self, df: pd.DataFrame) -> int:
+        if df.empty:
+            return 0
+        if self.index["columns"] is None:
+            self.index["columns"] = list(df.columns)
+        df = df.reindex(columns=self.index["columns"])
+        with open(self.path, "a", newline="") as f:
+            start = f.tell()
+            df.to_csv(f, header=start == 0, index_label='point_time')
+            end = f.tell()
+        self.index["bytes"] = end
+        self.index["ranges"].append([df.index[0].isoformat(), df.index[-1].isoformat(), len(df), start, end])
+        if self.on_write is not None:
+            self.on_write(df)
+        return len(df)
+
+    def _save_index(self) -> None:
+        with open(self.path + RANGES_SUFFIX + ".tmp", "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(self.path + RANGES_SUFFIX + ".tmp", self.path + RANGES_SUFFIX)
+
+    def __enter__(self) -> "BackfillWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        # keep the held-back rows out of the store if the backfill failed, a resume fetches them again
+        if exc_type is None:
+            self.close()
+
+
+def backfill_to_store(
+    start_date: datetime,
+    end_date: datetime,
+    region: str,
+    path: str,
+    max_workers: int = 4,
+    resume: bool = False,
+    client: Optional[WattTimeHistorical] = None,
+    rate: float = DEFAULT_RATE,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    on_write: Optional[Callable[[pd.DataFrame], None]] = None,
+    skip_failed: bool = False,
+) -> dict:
+    """
+    Backfill a region straight into a CSV store, one chunk at a time.
+
+    Chunks are fetched concurrently, at most max_workers in flight, and written in chronological
+    order as soon as they arrive, so memory is bounded by the in-flight chunks rather than the
+    backfill length. Requests are rate limited and transient failures retried. Chunks that still
+    fail stop complete_before from advancing, so a resumed backfill fetches them again, and raise
+    once the other chunks are written unless skip_failed is set, like backfill_carbon_intensity.
+
+    Args:
+        start_date (datetime): The first day of the backfill
+        end_date (datetime): The last day of the backfill
+        region (str): The power region to fetch data for (e.g., 'CAISO_NORTH')
+        path (str): The CSV path (its written-ranges index sits next to it)
+        max_workers (int): The maximum number of chunks fetched at the same time
+        resume (bool): Skip the chunks a previous run of the same backfill has completely written
+        client (Optional[WattTimeHistorical]): WattTime client (or compatible stub) shared by all
+            chunk fetches. Defaults to the shared pooled WattTimeSession
+        rate (float): The maximum number of requests per second, across all workers
+        max_attempts (int): The number of attempts per request before its chunk fails
+        on_write (Optional[Callable[[pd.DataFrame], None]]): Called with the rows written to the
+            store, in chronological order, as each chunk is written
+        skip_failed (bool): Report failed chunks and return them instead of raising
+
+    Returns:
+        dict: The number of rows written, the written ranges and the chunks that failed as
+            (chunk start, chunk end, error)
+
+    Raises:
+        BackfillError: If some chunks still failed after all attempts and skip_failed is not set
+    """
+    client = client or default_session()
+    bucket = TokenBucket(rate)
+    chunks = plan_backfill_chunks(start_date, end_date)
+    # the last chunk is requested up to 23:59:59 of its end day
+    next_starts = [pd.to_datetime(chunk_start, utc=True) for chunk_start, _ in chunks[1:]]
+    next_starts += [pd.to_datetime(end_date, utc=True).normalize() + pd.Timedelta(days=1)] if chunks else []
+    rows = 0
+    failed = []
+
+    with (
+        BackfillWriter(path, resume=resume, on_write=on_write) as writer,
+        ThreadPoolExecutor(max_workers=max_workers) as executor,
+    ):
+        done_before = writer.complete_before
+        todo = [
+            (chunk, next_start)
+            for chunk, next_start in zip(chunks, next_starts)
+            if done_before is None or pd.to_datetime(chunk[0], utc=True) >= done_before
+        ]
+        pending = deque()
+        for position, (chunk, next_start) in enumerate(todo):
+            future = executor.submit(_fetch_chunk, *chunk, region, client, bucket, max_attempts)
+            pending.append((future, chunk, next_start))
+            # write the oldest chunk once max_workers are in flight, in submission order
+            while pending and (len(pending) >= max_workers or position == len(todo) - 1):
+                future, (chunk_start, chunk_end), chunk_next_start = pending.popleft()
+                try:
+                    rows += writer.append(future.result(), chunk_next_start)
+                except Exception as e:
+                    failed.append((chunk_start, chunk_end, str(e)))
+                    rows += writer.append(pd.DataFrame(), chunk_next_start, failed=True)
+    _check_failures(failed, skip_failed)
+
+    return {"rows": rows, "ranges": read_written_ranges(path)["ranges"], "failed": failed}
+
+
+def iter_store_ranges(path: str) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV store written by BackfillWriter one written range at a time.
+
+    Each range is read from its byte offsets, so memory is bounded by the largest range (one
+    chunk) however large the store.
+
+    Args:
+        path (str): The CSV path
+
+    Yields:
+        pd.DataFrame: The rows of one written range indexed by point_time, in chronological order
+    """
+    index = read_written_ranges(path)
+    names = ["point_time"] + (index["columns"] or [])
+    # versions such as 3.10 must not be parsed as numbers
+    dtype = {"version": str} if "version" in names else None
+    with open(path, "rb") as f:
+        for _, _, _, start, end in index["ranges"]:
+            f.seek(start)
+            data = io.BytesIO(f.read(end - start))
+            # the first range starts with the header line
+            df = pd.read_csv(data, header=None, names=names, dtype=dtype, skiprows=1 if start == 0 else 0)
+            df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("point_time"), utc=True), name="point_time")
+            yield df
+
+
+def write_store_archive(path: str, archive_path: str, region: str, signal_type: str = "co2_moer") -> int:
+    """
+    Convert a CSV store written by BackfillWriter to a columnar archive, one range at a time.
+
+    The store is already sorted with one row per point_time, and the written-ranges index gives
+    the number of rows up front, so every archive column is streamed into the .npz member by
+    member (one pass over the store per column) and never held in memory as a whole.
+
+    Args:
+        path (str): The CSV path
+        archive_path (str): The archive path (should end in .npz)
+        region (str): The power region of the series (e.g., 'CAISO_NORTH')
+        signal_type (str): The WattTime signal type of the series
+
+    Returns:
+        int: The number of rows archived
+    """
+    index = read_written_ranges(path)
+    rows = sum(r[2] for r in index["ranges"])
+    columns = {
+        "point_time": (np.dtype(np.int64), lambda df: to_epoch_ns(df.index)),
+        "value": (np.dtype(np.float32), lambda df: df["value"]),
+    }
+    if "version" in (index["columns"] or []):
+        # the string width has to be known before the first version is written
+        widths = (df["version"].astype(str).str.len().max() for df in iter_store_ranges(path))
+        version = np.dtype(f"<U{max(widths, default=1)}")
+        columns["version"] = (version, lambda df: df["version"].astype(str))
+    meta = np.array(json.dumps({"region": region, "signal_type": signal_type}))
+
+    # the layout np.savez writes: one .npy member per column, stored uncompressed
+    with zipfile.ZipFile(archive_path + ".tmp", "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for name, (dtype, column) in columns.items():
+            with archive.open(name + ".npy", "w", force_zip64=True) as member:
+                header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (rows,)}
+                np.lib.format.write_array_header_2_0(member, header)
+                for df in iter_store_ranges(path):
+                    member.write(np.asarray(column(df), dtype=dtype).tobytes())
+        with archive.open("meta.npy", "w") as member:
+            np.lib.format.write_array(member, meta)
+    os.replace(archive_path + ".tmp", archive_path)
+    return rows
+
+
+if __name__ == "__main__":
+    import sys
+    from .backfill import BackfillError
+
+    # Backfill a year of a region into a CSV, resuming if it was interrupted
+    # (run with `python -m utils.backfill_writer CAISO_NORTH`)
+    region = sys.argv[1] if len(sys.argv) > 1 else "CAISO_NORTH"
+    output_file = f"carbon_intensity_{region}_20240423_to_20250422.csv"
+    try:
+        summary = backfill_to_store(
+            datetime(2024, 4, 23), datetime(2025, 4, 22), region, output_file, resume=True
+        )
+    except BackfillError as e:
+        sys.exit(f"{e}\nRerun to fetch them")
+    print(f"Wrote {summary['rows']} rows, {output_file} holds {sum(r[2] for r in summary['ranges'])} records")
@@ -0,0 +1,505 @@
+"""Capacity-constrained scheduling of whole job batches on a shared warehouse"""
+
+
+import heapq
+from datetime import timedelta
+from typing import Optional, Union
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .intensity_index import CarbonIntensityIndex, to_duration_ns
+
+
+def _batch_candidates(
+    start_times,
+    durations,
+    flex_window: timedelta,
+    index: CarbonIntensityIndex,
+    loads,
+) -> dict[str, np.ndarray]:
+    """Builds the candidate matrix of a batch together with the slots every candidate covers."""
+    candidate_starts, candidate_means = index.candidate_matrix(start_times, durations, flex_window)
+    start_ns = candidate_starts[:, 0]
+    duration_ns = np.broadcast_to(to_duration_ns(durations), start_ns.shape)
+    loads = np.broadcast_to(np.asarray(1.0 if loads is None else loads, dtype=np.float64), duration_ns.shape)
+
+    # footprints are slot ranges on the index grid (origin + k * step); an index without a step
+    # has no complete window, so nothing is ever placed and one slot per job is enough
+    if index.step:
+        naive_first = (start_ns - index.origin) // index.step
+        naive_last = -(-(start_ns + duration_ns - index.origin) // index.step)
+        slots = -(-duration_ns // index.step)
+    else:
+        naive_first, naive_last = np.zeros_like(start_ns), np.ones_like(start_ns)
+        slots = np.ones_like(start_ns)
+
+    # carbon cost of each candidate: mean intensity (gCO2/kWh) x duration (h) x load (kW)
+    weights = loads * duration_ns / 3.6e12
+    return {
+        "starts": candidate_starts,
+        "means": candidate_means,
+        # the naive start covers the slot containing it up to its end; the other candidates are
+        # consecutive slots, column c covering positions + c to positions + c + slots
+        "naive_slots": np.clip(np.column_stack((naive_first, naive_last)), 0, len(index)),
+        "positions": np.clip(naive_first + 1, 0, len(index)) - 1,
+        "slots": slots,
+        "loads": loads,
+        "weights": weights,
+        "costs": candidate_means * weights[:, None],
+    }
+
+
+def _footprint(candidates: dict[str, np.ndarray], jobs, cols) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the slot range [first, last) on the index grid covered by each (job, candidate) pair."""
+    naive = np.asarray(cols) == 0
+    first = np.where(naive, candidates["naive_slots"][jobs, 0], candidates["positions"][jobs] + cols)
+    last = np.where(naive, candidates["naive_slots"][jobs, 1], first + candidates["slots"][jobs])
+    return first, last
+
+
+def _grid_size(candidates: dict[str, np.ndarray]) -> int:
+    """Returns a slot count covering the footprint of every candidate, valid or padded."""
+    width = candidates["costs"].shape[1]
+    padded_last = candidates["positions"].max(initial=0) + width + candidates["slots"].max(initial=1)
+    return int(max(candidates["naive_slots"].max(initial=0), padded_last)) + 1
+
+
+def _slot_load(candidates: dict[str, np.ndarray], chosen: np.ndarray) -> np.ndarray:
+    """Sums the load of every scheduled job (over capacity or not) on each slot it covers."""
+    jobs = np.flatnonzero(chosen >= 0)
+    first, last = _footprint(candidates, jobs, chosen[jobs])
+    delta = np.zeros(int(last.max(initial=0)) + 1)
+    np.add.at(delta, first, candidates["loads"][jobs])
+    np.add.at(delta, last, -candidates["loads"][jobs])
+    return np.cumsum(delta)[:-1]
+
+
+def _summarize_batch(
+    candidates: dict[str, np.ndarray],
+    chosen: np.ndarray,
+    over_capacity: np.ndarray,
+    capacity: float,
+) -> tuple[pd.DataFrame, dict]:
+    """Turns the chosen candidate of every job into the per-job result and the batch summary."""
+    rows = np.arange(chosen.size)
+    load = _slot_load(candidates, chosen)
+    scheduled = chosen >= 0
+    chosen = np.maximum(chosen, 0)
+    means, costs = candidates["means"], candidates["costs"]
+    filled = np.where(np.isnan(means), np.inf, means)
+    unconstrained = np.argmin(filled, axis=1) if means.shape[1] else np.zeros(chosen.size, dtype=np.int64)
+
+    def starts_at(cols: np.ndarray) -> pd.DatetimeIndex:
+        starts = candidates["starts"][rows, cols] if means.shape[1] else np.full(chosen.size, -1)
+        return pd.to_datetime(np.where(scheduled & (starts >= 0), starts, np.iinfo(np.int64).min), utc=True)
+
+    def values_at(matrix: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        if not means.shape[1]:
+            return np.full(chosen.size, np.nan)
+        return np.where(scheduled, matrix[rows, cols], np.nan)
+
+    result = pd.DataFrame({
+        "scheduled_start": starts_at(chosen),
+        "intensity": values_at(means, chosen),
+        "carbon": values_at(costs, chosen),
+        "unconstrained_start": starts_at(unconstrained),
+        "unconstrained_intensity": values_at(means, unconstrained),
+        "unconstrained_carbon": values_at(costs, unconstrained),
+        "naive_intensity": values_at(means, np.zeros_like(chosen)),
+        "naive_carbon": values_at(costs, np.zeros_like(chosen)),
+        "over_capacity": over_capacity,
+    })
+    summary = {
+        "jobs": int(chosen.size),
+        "scheduled": int(scheduled.sum()),
+        "over_capacity": int(over_capacity.sum()),
+        # the load actually run, over-capacity jobs included
+        "peak_load": float(load.max(initial=0.0)),
+        "overloaded_slots": int(np.count_nonzero(load > capacity + 1e-9)),
+        "carbon": float(np.nansum(result["carbon"])),
+        "unconstrained_carbon": float(np.nansum(result["unconstrained_carbon"])),
+        "naive_carbon": float(np.nansum(result["naive_carbon"])),
+    }
+    summary["carbon_delta_vs_unconstrained"] = summary["carbon"] - summary["unconstrained_carbon"]
+    return result, summary
+
+
+def _place_greedy(
+    candidates: dict[str, np.ndarray],
+    capacity: float,
+    scores: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Places a batch with the priority-queue greedy of schedule_batch, ranking candidates by scores.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The chosen candidate column of every job (-1 if it has no
+            candidate) and whether it runs over capacity at its naive start
+    """
+    costs, job_loads = candidates["costs"], candidates["loads"]
+    positions, slots, naive_slots = candidates["positions"], candidates["slots"], candidates["naive_slots"]
+    n_jobs = costs.shape[0]
+
+    # candidates of each job from the lowest to the highest score, missing candidates last
+    scores = np.where(np.isnan(costs), np.nan, scores)
+    ranked = np.argsort(np.where(np.isnan(scores), np.inf, scores), axis=1, kind="stable")
+    best_scores = scores[np.arange(n_jobs), ranked[:, 0]] if costs.shape[1] else np.full(n_jobs, np.nan)
+
+    occupancy = np.zeros(_grid_size(candidates), dtype=np.float64)
+    chosen = np.full(n_jobs, -1, dtype=np.int64)
+    over_capacity = np.zeros(n_jobs, dtype=bool)
+    # jobs with no fitting candidate, run at their naive start once every fitting job is placed
+    overflow = []
+
+    def next_fitting_rank(job: int, after: int) -> int:
+        """Finds the next-ranked candidate of a job that still fits, -1 if none does."""
+        # occupancy only ever grows, so a candidate that does not fit now never will
+        lo, width = positions[job] + 1, costs.shape[1]
+        window_max = np.empty(width)
+        window_max[0] = occupancy[naive_slots[job, 0]:naive_slots[job, 1]].max(initial=0.0)
+        if width > 1:
+            later = occupancy[lo:lo + width + slots[job] - 2]
+            window_max[1:] = sliding_window_view(later, slots[job]).max(axis=1)
+        remaining = ranked[job, after:]
+        fits = (window_max[remaining] + job_loads[job] <= capacity) & ~np.isnan(scores[job, remaining])
+        return after + int(np.argmax(fits)) if fits.any() else -1
+
+    heap = [
+        (0.0, -candidates["weights"][job], job, 0)
+        for job in range(n_jobs)
+        if not np.isnan(best_scores[job])
+    ]
+    heapq.heapify(heap)
+    while heap:
+        _, _, job, rank = heapq.heappop(heap)
+        column = ranked[job, rank]
+        first, last = _footprint(candidates, job, column)
+        window = occupancy[first:last]
+        if window.max(initial=0.0) + job_loads[job] <= capacity:
+            window += job_loads[job]
+            chosen[job] = column
+            continue
+
+        next_rank = next_fitting_rank(job, rank + 1)
+        if next_rank >= 0:
+            regret = scores[job, ranked[job, next_rank]] - best_scores[job]
+            heapq.heappush(heap, (regret, -candidates["weights"][job], job, next_rank))
+        elif not np.isnan(costs[job, 0]):
+            overflow.append(job)
+
+    # their load is counted in the summary's peak_load and overloaded_slots
+    chosen[overflow] = 0
+    over_capacity[overflow] = True
+
+    return chosen, over_capacity
+
+
+def schedule_batch(
+    start_times,
+    durations,
+    flex_window: timedelta,
+    carbon_intensity_dataset: Union[pd.DataFrame, CarbonIntensityIndex],
+    capacity: float,
+    loads=None,
+) -> tuple[pd.DataFrame, dict]:
+    """
+    Schedules a batch of jobs that share a warehouse with a per-slot capacity.
+
+    Placement is a priority-queue greedy. Every job starts out wanting its own optimal slot. The
+    heap always pops the (job, candidate) pair with the smallest carbon regret over that job's
+    optimum (heavier jobs first on ties). If the candidate's slots have room the job is placed,
+    otherwise its next-best candidate is pushed back. Jobs whose every candidate is full are
+    placed at their naive start and flagged as over capacity. They are placed after every job
+    that still fits, so they never push one of those over capacity, and their load is added to
+    the slots they run on.
+
+    Args:
+        start_times: Array-like of the earliest start time of each job
+        durations: Array-like of job durations (timedeltas), or a single duration for all jobs
+        flex_window (timedelta): The flex window for every job
+        carbon_intensity_dataset (Union[pd.DataFrame, CarbonIntensityIndex]): DataFrame containing carbon
+            intensity data, or a prebuilt CarbonIntensityIndex with a regular cadence
+        capacity (float): The total load the warehouse can run in any slot (e.g. concurrent jobs,
+            or credits per hour when loads are energy-like)
+        loads: Array-like load of each job, or a single load for all jobs (defaults to 1, i.e. the
+            capacity is a concurrency limit)
+
+    Returns:
+        tuple[pd.DataFrame, dict]: One row per job with the scheduled and unconstrained starts,
+            intensities (gCO2/kWh) and carbon costs (intensity x hours x load), plus a summary with
+            the batch totals, the carbon delta against unconstrained placement, the number of jobs
+            run over capacity, the peak load and the number of slots whose load exceeds capacity
+    """
+    if not isinstance(carbon_intensity_dataset, CarbonIntensityIndex):
+        carbon_intensity_dataset = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
+    index = carbon_intensity_dataset
+
+    candidates = _batch_candidates(start_times, durations, flex_window, index, loads)
+    chosen, over_capacity = _place_greedy(candidates, capacity, candidates["costs"])
+    return _summarize_batch(candidates, chosen, over_capacity, capacity)
+
+
+def schedule_batch_exact(
+    start_times,
+    durations,
+    flex_window: timedelta,
+    carbon_intensity_dataset: Union[pd.DataFrame, CarbonIntensityIndex],
+    capacity: float,
+    loads=None,
+    time_limit: Optional[float] = None,
+) -> tuple[pd.DataFrame, dict]:
+    """
+    Schedules a batch of jobs on a shared warehouse exactly, as a MILP solved with HiGHS.
+
+    There is one binary variable per (job, candidate start) and one capacity row per slot, plus
+    a per-job fallback that runs the job at its naive start over capacity (penalized so that it
+    is only used when nothing else fits, matching schedule_batch). The objective is the carbon
+    plus the fallback penalties. The LP relaxation, with a cut requiring at least as many
+    fallbacks as it needs itself (rounded up), gives a lower bound L and, through its duals, a
+    reduced cost for every variable: any solution using a variable costs at least L plus its
+    reduced cost. The better of the greedy placement of schedule_batch and a rounding of the
+    relaxation, scored with the same objective, gives an upper bound U, and variables whose
+    reduced cost exceeds U - L cannot be part of an optimal solution and are pruned. A job whose
+    optimum only covers slots that can never exceed capacity dominates all its other candidates
+    and is fixed there, repeatedly, and capacity rows that can never be exceeded are dropped.
+    Together this keeps a day of jobs down to a model that solves in seconds.
+
+    Requires scipy (install the 'exact' extra).
+
+    Args:
+        start_times: Array-like of the earliest start time of each job
+        durations: Array-like of job durations (timedeltas), or a single duration for all jobs
+        flex_window (timedelta): The flex window for every job
+        carbon_intensity_dataset (Union[pd.DataFrame, CarbonIntensityIndex]): DataFrame containing carbon
+            intensity data, or a prebuilt CarbonIntensityIndex with a regular cadence
+        capacity (float): The total load the warehouse can run in any slot
+        loads: Array-like load of each job, or a single load for all jobs (defaults to 1)
+        time_limit (Optional[float]): Solver time limit in seconds, the best solution found (or
+            the placement giving U, if the solver found nothing better) is returned
+
+    Returns:
+        tuple[pd.DataFrame, dict]: The per-job result and summary as in schedule_batch. The summary
+            also reports the objective (carbon plus fallback penalties) and its penalty part, the
+            same for the greedy placement, the gap of the greedy placement to this one in both
+            objective and carbon, the upper and LP bounds, the model size and whether the solver
+            proved optimality
+    """
+    try:
+        from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+        from scipy.sparse import coo_array, vstack as scipy_vstack
+    except ImportError as e:
+        raise ImportError("schedule_batch_exact requires scipy, install it with the 'exact' extra") from e
+
+    if not isinstance(carbon_intensity_dataset, CarbonIntensityIndex):
+        carbon_intensity_dataset = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
+    index = carbon_intensity_dataset
+
+    candidates = _batch_candidates(start_times, durations, flex_window, index, loads)
+    greedy_chosen, greedy_over = _place_greedy(candidates, capacity, candidates["costs"])
+    _, greedy_summary = _summarize_batch(candidates, greedy_chosen, greedy_over, capacity)
+    costs, job_loads = candidates["costs"], candidates["loads"]
+    n_jobs = costs.shape[0]
+
+    filled = np.where(np.isnan(costs), np.inf, costs)
+    best_costs = filled.min(axis=1, initial=np.inf)
+    schedulable = np.isfinite(best_costs)
+
+    occupancy_size = _grid_size(candidates)
+
+    # fallback runs are penalized above any possible saving so they are only used when needed
+    worst_costs = np.where(np.isnan(costs), -np.inf, costs).max(axis=1, initial=-np.inf)
+    penalty = float((worst_costs - best_costs)[schedulable].sum()) + 1.0
+    greedy_objective = greedy_summary["carbon"] + greedy_summary["over_capacity"] * penalty
+    tolerance = 1e-9 * max(abs(greedy_objective), 1.0)
+
+    # fallback runs are only needed if the greedy placement could not fit every job
+    if greedy_summary["over_capacity"]:
+        fallback_jobs = np.flatnonzero(schedulable & ~np.isnan(costs[:, 0]))
+    else:
+        fallback_jobs = np.empty(0, dtype=np.int64)
+
+    def coverage(jobs: np.ndarray, cols: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Expands (job, candidate) pairs into (pair id, covered slot) pairs."""
+        first, last = _footprint(candidates, jobs, cols)
+        pair_slots = last - first
+        pair_ids = np.repeat(np.arange(jobs.size), pair_slots)
+        offsets = np.arange(pair_slots.sum()) - np.repeat(np.cumsum(pair_slots) - pair_slots, pair_slots)
+        return pair_ids, np.repeat(first, pair_slots) + offsets
+
+    def build_model(keep_job: np.ndarray, keep_col: np.ndarray, fallback: np.ndarray):
+        """Builds the objective, assignment rows and binding capacity rows over the given variables."""
+        n_vars = keep_job.size + fallback.size
+        objective = np.concatenate([costs[keep_job, keep_col], costs[fallback, 0] + penalty])
+        # every schedulable job runs exactly once
+        job_rows = np.concatenate([keep_job, fallback])
+        assignment = coo_array((np.ones(n_vars), (job_rows, np.arange(n_vars))), shape=(n_jobs, n_vars))
+        assignment = assignment.tocsr()[schedulable]
+        # load of the kept candidates on every slot they cover
+        var_ids, covered = coverage(keep_job, keep_col)
+        slot_ids, slot_rows = np.unique(covered, return_inverse=True)
+        var_loads = job_loads[keep_job][var_ids]
+        slot_load = coo_array((var_loads, (slot_rows, var_ids)), shape=(slot_ids.size, n_vars)).tocsr()
+        binding = np.asarray(slot_load.sum(axis=1)).ravel() > capacity
+        return objective, assignment, slot_load[binding]
+
+    # prune candidates that are too expensive to appear in any solution better than the greedy
+    # one; every job costs at least its optimum, fallback penalties only add to that
+    # (unschedulable jobs have no finite candidate, so they get no variable either way)
+    floor_costs = np.where(schedulable, best_costs, 0.0)
+    alive = filled - floor_costs[:, None] <= greedy_objective - best_costs[schedulable].sum() + tolerance
+
+    # reduced-cost pruning: with the assignment rows implying x <= 1, the LP is solved over x >= 0
+    # so its duals y give reduced costs c - A^T y >= 0, and any integer solution using a variable
+    # costs at least the LP optimum plus that variable's reduced cost
+    alive_job, alive_col = np.nonzero(alive)
+    objective, assignment, capacity_rows = build_model(alive_job, alive_col, fallback_jobs)
+    fallback_vars = alive_job.size + np.arange(fallback_jobs.size)
+    fallback_row = coo_array(
+        (-np.ones(fallback_jobs.size), (np.zeros(fallback_jobs.size, dtype=np.int64), fallback_vars)),
+        shape=(1, objective.size),
+    ).tocsr()
+    relaxation, min_fallbacks = None, 0
+    # with no schedulable job there is nothing to relax (or solve)
+    while objective.size:
+        # every integer solution runs at least as many fallbacks as the relaxation, rounded up;
+        # adding that cut takes the penalty of those fallbacks out of the gap to the upper bound
+        rows = [capacity_rows] + ([fallback_row] if min_fallbacks else [])
+        bounds = np.full(capacity_rows.shape[0] + bool(min_fallbacks), float(capacity))
+        if min_fallbacks:
+            bounds[-1] = -min_fallbacks
+        solved = linprog(
+            objective,
+            A_ub=scipy_vstack(rows) if bounds.size else None,
+            b_ub=bounds if bounds.size else None,
+            A_eq=assignment,
+            b_eq=np.ones(assignment.shape[0]),
+            bounds=(0, None),
+            method="highs",
+        )
+        if solved.status != 0:
+            break
+        relaxation, relaxation_rows = solved, rows
+        needed = int(np.ceil(solved.x[alive_job.size:].sum() - 1e-6))
+        if needed <= min_fallbacks:
+            break
+        min_fallbacks = needed
+
+    lp_bound = np.nan
+    upper_bound, incumbent = greedy_objective, (greedy_chosen, greedy_over)
+    if relaxation is not None:
+        lp_bound = float(relaxation.fun)
+        reduced = objective - assignment.T @ relaxation.eqlin.marginals
+        if relaxation.ineqlin.marginals.size:
+            reduced -= scipy_vstack(relaxation_rows).T @ relaxation.ineqlin.marginals
+        # rounding the relaxation (placing each job's heaviest LP candidates first) usually fits
+        # more jobs than the carbon-ranked greedy, and so gives a tighter upper bound
+        lp_ranked = np.full(costs.shape, np.nan)
+        lp_ranked[alive_job, alive_col] = -relaxation.x[:alive_job.size]
+        rounded_chosen, rounded_over = _place_greedy(candidates, capacity, lp_ranked)
+        rounded_jobs = np.flatnonzero(rounded_chosen >= 0)
+        rounded_carbon = np.nansum(costs[rounded_jobs, rounded_chosen[rounded_jobs]])
+        rounded_objective = float(rounded_carbon + rounded_over.sum() * penalty)
+        if rounded_objective < upper_bound:
+            upper_bound, incumbent = rounded_objective, (rounded_chosen, rounded_over)
+        viable = lp_bound + reduced <= upper_bound + tolerance
+        alive[alive_job, alive_col] = viable[:alive_job.size]
+        fallback_jobs = fallback_jobs[viable[alive_job.size:]]
+    best_cols = np.argmin(np.where(alive, filled, np.inf), axis=1)
+
+    # a job whose optimum only covers slots that can never exceed capacity is fixed to it, which
+    # lowers the potential load elsewhere and may free more jobs, until nothing changes
+    fixed = ~schedulable
+    while True:
+        alive_job, alive_col = np.nonzero(alive)
+        pair_ids, covered = coverage(alive_job, alive_col)
+        potential = np.bincount(covered, weights=job_loads[alive_job][pair_ids], minlength=occupancy_size)
+        binding_prefix = np.concatenate([[0], np.cumsum(potential > capacity)])
+        best_first, best_last = _footprint(candidates, np.arange(n_jobs), best_cols)
+        free = ~fixed & (binding_prefix[best_last] == binding_prefix[best_first])
+        if not free.any():
+            break
+        alive[free] = False
+        alive[free, best_cols[free]] = True
+        fixed |= free
+    # a fixed job never needs its fallback
+    fallback_jobs = fallback_jobs[~fixed[fallback_jobs]]
+
+    keep_job, keep_col = np.nonzero(alive)
+    n_vars = keep_job.size + fallback_jobs.size
+    objective, assignment, capacity_rows = build_model(keep_job, keep_col, fallback_jobs)
+
+    if not n_vars:
+        # no job has a candidate with complete data, so every job stays unscheduled
+        chosen, over_capacity, proven_optimal = incumbent[0], incumbent[1], True
+    else:
+        constraints = [LinearConstraint(assignment, 1, 1)]
+        if capacity_rows.shape[0]:
+            constraints.append(LinearConstraint(capacity_rows, -np.inf, capacity))
+        solution = milp(
+            objective,
+            constraints=constraints,
+            integrality=np.ones(n_vars),
+            bounds=Bounds(0, 1),
+            options={"time_limit": time_limit} if time_limit is not None else {},
+        )
+        if solution.x is None and solution.status != 1:
+            raise RuntimeError(f"MILP solver failed: {solution.message}")
+        proven_optimal = bool(solution.status == 0)
+
+        if solution.x is not None and solution.fun <= upper_bound + tolerance:
+            picked = solution.x > 0.5
+            chosen = np.full(n_jobs, -1, dtype=np.int64)
+            chosen[keep_job[picked[:keep_job.size]]] = keep_col[picked[:keep_job.size]]
+            over_capacity = np.zeros(n_jobs, dtype=bool)
+            over_capacity[fallback_jobs[picked[keep_job.size:]]] = True
+            chosen[over_capacity] = 0
+        else:
+            # the time limit ran out before the solver beat the best placement used as the bound
+            chosen, over_capacity = incumbent
+
+    result, summary = _summarize_batch(candidates, chosen, over_capacity, capacity)
+    summary.update({
+        "penalty": summary["over_capacity"] * penalty,
+        "objective": summary["carbon"] + summary["over_capacity"] * penalty,
+        "greedy_carbon": greedy_summary["carbon"],
+        "greedy_penalty": greedy_summary["over_capacity"] * penalty,
+        "greedy_objective": greedy_objective,
+    })
+    summary.update({
+        "greedy_gap": summary["greedy_objective"] - summary["objective"],
+        "greedy_carbon_gap": summary["greedy_carbon"] - summary["carbon"],
+        "upper_bound": upper_bound,
+        "lp_bound": lp_bound,
+        "variables": int(n_vars),
+        "pruned_candidates": int(np.isfinite(filled).sum() - keep_job.size),
+        "fixed_jobs": int((fixed & schedulable).sum()),
+        "capacity_constraints": int(capacity_rows.shape[0]),
+        "proven_optimal": proven_optimal,
+    })
+    return result, summary
+
+
+if __name__ == "__main__":
+    from .job_intensity import job_log_windows
+    from .series_archive import load_carbon_intensity
+
+    # Schedule every Medium-warehouse job with a 4-job concurrency limit
+    # (run with `python -m utils.batch_scheduler`)
+    dataset = load_carbon_intensity("data/carbon_intensity_CAISO_NORTH_20240423_to_20250422.csv")
+    index = CarbonIntensityIndex.from_dataframe(dataset)
+    jobs = pd.read_csv("data/SnowflakeUsageDataset.csv")
+    jobs = jobs[jobs["WarehouseSize"] == "Medium"]
+    start_times, end_times = job_log_windows(jobs)
+    durations = end_times - start_times
+
+    result, summary = schedule_batch(start_times, durations, timedelta(hours=6), index, capacity=4)
+    print(result.head())
+    print(summary)
+
+    # Measure how far the greedy placement is from optimal on one day of jobs
+    one_day = start_times >= start_times.max() - pd.Timedelta(days=1)
+    _, exact_summary = schedule_batch_exact(
+        start_times[one_day], durations[one_day], timedelta(hours=6), index, capacity=1
+    )
+    print(exact_summary)
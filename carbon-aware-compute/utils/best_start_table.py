@@ -0,0 +1,217 @@
+"""Precomputed best-start table for every duration bucket and flex-window origin"""
+
+
+import os
+from datetime import timedelta
+from typing import Sequence
+import numpy as np
+import pandas as pd
+
+from .intensity_index import CarbonIntensityIndex, to_duration_ns, to_epoch_ns
+
+
+DEFAULT_DURATION_BUCKETS = tuple(
+    timedelta(minutes=minutes)
+    for minutes in (5, 10, 15, 30, 60, 120, 180, 240, 360, 480, 720, 1440)
+)
+
+
+def _sliding_argmin(values: np.ndarray, width: int) -> np.ndarray:
+    """
+    Find the position of the minimum of every window values[i:i + width] in O(n).
+
+    Uses the van Herk/Gil-Werman block decomposition: every window spans the suffix of one
+    width-sized block and the prefix of the next, so block-wise running minima of both
+    directions answer every window with one comparison. Ties resolve to the earliest position,
+    windows running past the end are truncated.
+
+    Args:
+        values (np.ndarray): The values, +inf for positions that must never be picked
+        width (int): The window width
+
+    Returns:
+        np.ndarray: The absolute position of the minimum of each window
+    """
+    n = values.size
+    blocks = -(-n // width) + 1
+    padded = np.full(blocks * width, np.inf)
+    padded[:n] = values
+    grid = padded.reshape(blocks, width)
+    local = np.arange(width)
+
+    # prefix running argmin within each block (strict improvement keeps the earliest tie)
+    prefix_min = np.minimum.accumulate(grid, axis=1)
+    previous = np.concatenate([np.full((blocks, 1), np.inf), prefix_min[:, :-1]], axis=1)
+    prefix_idx = np.maximum.accumulate(np.where(grid < previous, local, 0), axis=1)
+
+    # suffix running argmin within each block (non-strict improvement keeps the earliest tie)
+    reversed_grid = grid[:, ::-1]
+    suffix_min = np.minimum.accumulate(reversed_grid, axis=1)
+    previous = np.concatenate([np.full((blocks, 1), np.inf), suffix_min[:, :-1]], axis=1)
+    suffix_idx = np.maximum.accumulate(np.where(reversed_grid <= previous, local, 0), axis=1)
+    suffix_min, suffix_idx = suffix_min[:, ::-1].ravel(), (width - 1 - suffix_idx[:, ::-1]).ravel()
+    prefix_min, prefix_idx = prefix_min.ravel(), prefix_idx.ravel()
+
+    starts = np.arange(n)
+    ends = starts + width - 1
+    block_base = starts - starts % width
+    end_base = ends - ends % width
+    from_suffix = suffix_min[starts] <= prefix_min[ends]
+    return np.where(from_suffix, block_base + suffix_idx[starts], end_base + prefix_idx[ends])
+
+
+class BestStartTable:
+    """
+    Best start slot and mean carbon intensity for every duration bucket and flex-window origin.
+
+    Built from one cumulative-sum pass over the series, the table turns scheduling queries
+    into array lookups. The index keeps the series on a regular slot grid (missing slots are
+    NaN), so a flex window always spans a fixed number of slots.
+    """
+
+    def __init__(
+        self,
+        times: np.ndarray,
+        duration_buckets: np.ndarray,
+        flex_window: int,
+        best_offsets: np.ndarray,
+        best_means: np.ndarray,
+    ):
+        """
+        Args:
+            times (np.ndarray): The slot times (int64 epoch nanoseconds) used as flex-window origins
+            duration_buckets (np.ndarray): The duration buckets in nanoseconds, ascending
+            flex_window (int): The flex window in nanoseconds
+            best_offsets (np.ndarray): The (buckets x origins) offset in slots from the origin to the
+                best start, -1 where no start has complete data
+            best_means (np.ndarray): The (buckets x origins) mean carbon intensity at the best start
+        """
+        self.times = times
+        self.duration_buckets = duration_buckets
+        self.flex_window = flex_window
+        self.best_offsets = best_offsets
+        self.best_means = best_means
+
+    @classmethod
+    def build(
+        cls,
+        carbon_intensity_dataset: CarbonIntensityIndex,
+        flex_window: timedelta,
+        duration_buckets: Sequence[timedelta] = DEFAULT_DURATION_BUCKETS,
+    ) -> "BestStartTable":
+        """
+        Compute the table for one flex window.
+
+        Args:
+            carbon_intensity_dataset (CarbonIntensityIndex): The indexed series
+            flex_window (timedelta): How far a start may be shifted past its origin
+            duration_buckets (Sequence[timedelta]): The job durations to tabulate
+
+        Returns:
+            BestStartTable: The table
+        """
+        index = carbon_intensity_dataset
+        bucket_ns = np.sort(np.asarray([to_duration_ns(bucket) for bucket in duration_buckets], dtype=np.int64))
+        flex_ns = to_duration_ns(flex_window)
+        width = flex_ns // index.step + 1 if index.step else 1
+
+        best_offsets = np.full((bucket_ns.size, len(index)), -1, dtype=np.int32)
+        best_means = np.full((bucket_ns.size, len(index)), np.nan, dtype=np.float32)
+        for row, duration in enumerate(bucket_ns):
+            # rolling means of this duration come straight from the index's cumulative sums
+            means = index.slot_means(pd.Timedelta(duration))
+            best = _sliding_argmin(np.where(np.isnan(means), np.inf, means), width)
+            found = ~np.isnan(means[best])
+            best_offsets[row] = np.where(found, best - np.arange(len(index)), -1)
+            best_means[row] = means[best]
+        return cls(index.times, bucket_ns, flex_ns, best_offsets, best_means)
+
+    def save(self, path: str) -> None:
+        """Writes the table to an uncompressed .npz file."""
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                times=self.times,
+                duration_buckets=self.duration_buckets,
+                flex_window=np.int64(self.flex_window),
+                best_offsets=self.best_offsets,
+                best_means=self.best_means,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "BestStartTable":
+        """Reads a table written by save."""
+        with np.load(path, allow_pickle=False) as table:
+            return cls(
+                table["times"],
+                table["duration_buckets"],
+                int(table["flex_window"]),
+                table["best_offsets"],
+                table["best_means"],
+            )
+
+    def lookup_many(self, start_times, durations) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Look up the best start of many jobs.
+
+        Each job uses the smallest duration bucket that fits its duration, and the flex window
+        the table was built for.
+
+        Args:
+            start_times: Array-like of the earliest start time of each job
+            durations: Array-like of job durations (timedeltas), or a single duration for all jobs
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The best start times (int64 epoch nanoseconds, -1 where
+                there is no complete data) and the mean carbon intensity of the duration bucket there
+
+        Raises:
+            ValueError: If a duration is longer than the largest bucket or a start is outside the table
+        """
+        start_ns = np.atleast_1d(to_epoch_ns(start_times))
+        duration_ns = np.broadcast_to(to_duration_ns(durations), start_ns.shape)
+        rows = np.searchsorted(self.duration_buckets, duration_ns, side="left")
+        if np.any(rows >= self.duration_buckets.size):
+            raise ValueError("Job duration exceeds the largest duration bucket of the table")
+        origins = np.searchsorted(self.times, start_ns, side="right") - 1
+        if np.any(origins < 0):
+            raise ValueError("Job start time is before the first slot of the table")
+
+        offsets = self.best_offsets[rows, origins]
+        # a best start in the slot containing the job's start is the job's start itself
+        best_starts = np.where(offsets >= 0, np.maximum(self.times[origins + np.maximum(offsets, 0)], start_ns), -1)
+        return best_starts, self.best_means[rows, origins].astype(np.float64)
+
+    def lookup(self, start_time, duration) -> tuple[pd.Timestamp, float]:
+        """
+        Look up the best start of one job, see lookup_many.
+
+        Returns:
+            tuple[pd.Timestamp, float]: The best start time and the mean carbon intensity there
+
+        Raises:
+            ValueError: If there is no complete data in the job's flex window
+        """
+        best_starts, best_means = self.lookup_many([to_epoch_ns(start_time)], duration)
+        if best_starts[0] < 0:
+            raise ValueError("No complete carbon intensity data found within the flex window")
+        return pd.Timestamp(best_starts[0], tz="UTC"), float(best_means[0])
+
+
+def table_path_for(data_path: str, flex_window: timedelta) -> str:
+    """Returns the path of the best-start table stored next to a data file."""
+    flex_minutes = to_duration_ns(flex_window) // 60_000_000_000
+    return f"{os.path.splitext(data_path)[0]}.best_start_flex{flex_minutes}m.npz"
+
+
+if __name__ == "__main__":
+    import sys
+    from .series_archive import load_carbon_intensity
+
+    # Build and persist a table next to a data file
+    # (run with `python -m utils.best_start_table <data file> <flex hours>`)
+    data_path, flex_hours = sys.argv[1], float(sys.argv[2])
+    flex_window = timedelta(hours=flex_hours)
+    table = BestStartTable.build(CarbonIntensityIndex.from_dataframe(load_carbon_intensity(data_path)), flex_window)
+    table.save(table_path_for(data_path, flex_window))
+    print(f"Saved {table.best_offsets.shape} table to {table_path_for(data_path, flex_window)}")
@@ -0,0 +1,153 @@
+"""Sort-free, version-aware merge of overlapping carbon intensity chunks
+
+The monthly backfill requests each chunk up to 23:59:59 of the next chunk's first day, so
+neighbouring chunks share almost a day of points, and a cache refresh can re-fetch points that
+are already stored. merge_chunks walks chunks that are each sorted by point_time once, merging
+only the overlapping stretch of a chunk into the tail of the data before it, and keeps a single
+row per point_time: the one with the latest version, or from the latest chunk on a version tie.
+"""
+
+
+import re
+from typing import Sequence
+import numpy as np
+import pandas as pd
+
+from .intensity_index import to_epoch_ns
+
+
+def _version_key(version: str) -> tuple:
+    """Orders versions by their numbers (dates like '2023-03-01' or releases like '3.10'), then as text."""
+    return tuple(int(number) for number in re.findall(r"\d+", version)), version
+
+
+def _version_ranks(chunks: Sequence[pd.DataFrame]) -> list[np.ndarray]:
+    """Ranks every row's version among all the versions seen (-1 where it is missing)."""
+    if not any('version' in chunk.columns for chunk in chunks):
+        return [np.zeros(len(chunk), dtype=np.int64) for chunk in chunks]
+    # only the few distinct versions get sorted, the rows are mapped through a hash lookup
+    versions = set()
+    for chunk in chunks:
+        if 'version' in chunk.columns:
+            versions.update(str(version) for version in pd.unique(chunk['version'].dropna()))
+    ordered = sorted(versions, key=_version_key)
+    return [
+        pd.Categorical(chunk['version'].astype("string"), categories=ordered).codes.astype(np.int64)
+        if 'version' in chunk.columns else np.full(len(chunk), -1, dtype=np.int64)
+        for chunk in chunks
+    ]
+
+
+def _keep_best_per_time(times: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """
+    Pick one row per point time from sorted times: the highest key, the last one on a tie.
+
+    Returns:
+        np.ndarray: The positions of the kept rows, in time order
+    """
+    if times.size == 0:
+        return np.empty(0, dtype=np.int64)
+    run_starts = np.flatnonzero(np.r_[True, times[1:] != times[:-1]])
+    if run_starts.size == times.size:
+        return np.arange(times.size)
+    run_ids = np.repeat(np.arange(run_starts.size), np.diff(np.r_[run_starts, times.size]))
+    best = keys == np.maximum.reduceat(keys, run_starts)[run_ids]
+    candidates = np.flatnonzero(best)
+    # the last best row of each run is the one followed by a row of another run
+    last = np.r_[run_ids[candidates[1:]] != run_ids[candidates[:-1]], True]
+    return candidates[last]
+
+
+def _merge_sorted(a_times: np.ndarray, b_times: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Returns where the rows of two sorted arrays land in their merge (b after equal a), without sorting."""
+    a_positions = np.searchsorted(b_times, a_times, side="left") + np.arange(a_times.size)
+    b_positions = np.searchsorted(a_times, b_times, side="right") + np.arange(b_times.size)
+    return a_positions, b_positions
+
+
+def merge_chunks(chunks: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Merge chunks of carbon intensity data into one series without duplicated point times.
+
+    Each chunk must be sorted by point_time; the chunks themselves can come in any order. Where
+    chunks overlap, the row with the latest version wins (versions are compared by their numbers),
+    and on a version tie the row of the chunk passed later wins.
+
+    Args:
+        chunks (Sequence[pd.DataFrame]): Chunks indexed by point_time (a 'version' column is optional)
+
+    Returns:
+        pd.DataFrame: The merged series indexed by point_time, sorted, one row per point time
+
+    Raises:
+        ValueError: If a chunk is not sorted by point_time
+    """
+    chunks = [chunk for chunk in chunks if not chunk.empty]
+    if not chunks:
+        return pd.DataFrame(columns=['value'], index=pd.DatetimeIndex([], tz="UTC", name='point_time'))
+
+    ranks = _version_ranks(chunks)
+    # walk the chunks by start time (only the chunks get ordered, not their rows)
+    order = sorted(range(len(chunks)), key=lambda position: chunks[position].index[0])
+    offset = 0
+    emitted: list[np.ndarray] = []
+    # the merged rows from the start of the last chunk on, which the next chunk may still overlap
+    tail_times = np.empty(0, dtype=np.int64)
+    tail_keys = np.empty(0, dtype=np.int64)
+    tail_rows = np.empty(0, dtype=np.int64)
+    for position in order:
+        times = to_epoch_ns(chunks[position].index)
+        if np.any(times[1:] < times[:-1]):
+            raise ValueError(f"Chunk {position} is not sorted by point_time")
+        keys = ranks[position] * len(chunks) + position
+        rows = offset + np.arange(times.size)
+        offset += times.size
+
+        # rows of the tail before this chunk starts are final
+        split = int(np.searchsorted(tail_times, times[0], side="left"))
+        emitted.append(tail_rows[:split])
+        overlap_times, overlap_keys, overlap_rows = tail_times[split:], tail_keys[split:], tail_rows[split:]
+        # only the head of the chunk up to the end of the tail can collide with it
+        head = int(np.searchsorted(times, overlap_times[-1], side="right")) if overlap_times.size else 0
+
+        merged = head + overlap_times.size
+        a_positions, b_positions = _merge_sorted(overlap_times, times[:head])
+        merged_times = np.empty(merged, dtype=np.int64)
+        merged_keys = np.empty(merged, dtype=np.int64)
+        merged_rows = np.empty(merged, dtype=np.int64)
+        for positions, source_times, source_keys, source_rows in (
+            (a_positions, overlap_times, overlap_keys, overlap_rows),
+            (b_positions, times[:head], keys[:head], rows[:head]),
+        ):
+            merged_times[positions] = source_times
+            merged_keys[positions] = source_keys
+            merged_rows[positions] = source_rows
+
+        tail_times = np.concatenate([merged_times, times[head:]])
+        tail_keys = np.concatenate([merged_keys, keys[head:]])
+        tail_rows = np.concatenate([merged_rows, rows[head:]])
+        kept = _keep_best_per_time(tail_times, tail_keys)
+        tail_times, tail_keys, tail_rows = tail_times[kept], tail_keys[kept], tail_rows[kept]
+    emitted.append(tail_rows)
+
+    merged = pd.concat([chunks[position] for position in order]).iloc[np.concatenate(emitted)]
+    merged.index = pd.to_datetime(merged.index, utc=True)
+    merged.index.name = 'point_time'
+    return merged
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Rewrite a backfill CSV without its chunk-boundary duplicates; chunks are its sorted runs
+    # (run with `python -m utils.chunk_merge <csv> <output csv>`)
+    df = pd.read_csv(sys.argv[1], index_col='point_time')
+    df.index = pd.to_datetime(df.index, utc=True)
+    times = to_epoch_ns(df.index)
+    bounds = np.r_[0, np.flatnonzero(times[1:] < times[:-1]) + 1, len(df)]
+
+    start = time.perf_counter()
+    merged = merge_chunks([df.iloc[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])])
+    print(f"Merged {len(bounds) - 1} chunks: {len(df)} -> {len(merged)} rows in {time.perf_counter() - start:.3f}s")
+    merged.to_csv(sys.argv[2])
@@ -1,35 +1,25 @@
-from typing import Union
+from typing import Optional, Union
 from datetime import datetime
 import pandas as pd
 import plotly.express as px
 from watttime import WattTimeHistorical
 
+from .intensity_cache import CarbonIntensityCache
+from .watttime_session import default_session
 
-def fetch_carbon_intensity(
+
+def _fetch_from_api(
+    wt_historical: WattTimeHistorical,
     start_time: Union[str, datetime],
     end_time: Union[str, datetime],
     region: str,
 ) -> pd.DataFrame:
     """
-    Fetches carbon intensity data (co2_moer) for a specific region between start and end times.
-    
-    Args:
-        start_time (Union[str, datetime]): The start time of the period to fetch data for
-        end_time (Union[str, datetime]): The end time of the period to fetch data for
-        region (str): The power region to fetch data for (e.g., 'CAISO_NORTH')
+    Downloads co2_moer data for a region from the WattTime API, indexed by point_time.
     
-    Returns:
-        pd.DataFrame: A pandas DataFrame containing carbon intensity data with columns:
-            - point_time: The timestamp of the data point
-            - value: The carbon intensity value (gCO2/kWh)
-            - version: The version of the data
-    
-    Raises:
-        ValueError: If the region is not valid or if no data is found for the specified time period
+    Unlike fetch_carbon_intensity this returns an empty DataFrame when the API has no data
+    for the period, so gap fetches for the cache can record empty ranges as covered.
     """
-    # Initialize the WattTime Historical client
-    wt_historical = WattTimeHistorical()
-    
     try:
         # Fetch the carbon intensity data for the specified region and time period
         df = wt_historical.get_historical_pandas(
@@ -39,18 +29,16 @@ def fetch_carbon_intensity(
             signal_type="co2_moer"
         )
         
-        # Check if we got any data
+        # Nothing to index if the API returned no data
         if df.empty:
-            raise ValueError(f"No carbon intensity data found for region {region} between {start_time} and {end_time}")
+            return pd.DataFrame(columns=['value'], index=pd.DatetimeIndex([], tz="UTC", name='point_time'))
         
         # Ensure the dataframe has the expected columns
         if 'point_time' not in df.columns or 'value' not in df.columns:
             raise ValueError("Unexpected data format from WattTime API")
         
         # Index the dataframe by point_time
-        df = df.set_index('point_time')
-        
-        return df
+        return df.set_index('point_time')
     
     except Exception as e:
         # Handle specific API errors
@@ -61,6 +49,54 @@ def fetch_carbon_intensity(
         else:
             # Re-raise the original exception
             raise
+
+
+def fetch_carbon_intensity(
+    start_time: Union[str, datetime],
+    end_time: Union[str, datetime],
+    region: str,
+    cache: Optional[CarbonIntensityCache] = None,
+    client: Optional[WattTimeHistorical] = None,
+) -> pd.DataFrame:
+    """
+    Fetches carbon intensity data (co2_moer) for a specific region between start and end times.
+    
+    Args:
+        start_time (Union[str, datetime]): The start time of the period to fetch data for
+        end_time (Union[str, datetime]): The end time of the period to fetch data for
+        region (str): The power region to fetch data for (e.g., 'CAISO_NORTH')
+        cache (Optional[CarbonIntensityCache]): On-disk cache to read from. Only the sub-ranges
+            not cached yet are requested from the API and spliced into the cache, so repeated
+            calls over the same period do no network work
+        client (Optional[WattTimeHistorical]): WattTime client to reuse across calls. Anything with a
+            compatible get_historical_pandas method works, e.g. a WattTimeSession or a local stub.
+            Defaults to the shared pooled WattTimeSession, so repeated calls reuse one login and
+            its open connections
+    
+    Returns:
+        pd.DataFrame: A pandas DataFrame containing carbon intensity data with columns:
+            - point_time: The timestamp of the data point
+            - value: The carbon intensity value (gCO2/kWh)
+            - version: The version of the data
+    
+    Raises:
+        ValueError: If the region is not valid or if no data is found for the specified time period
+    """
+    if cache is None:
+        df = _fetch_from_api(client or default_session(), start_time, end_time, region)
+    else:
+        wt_historical = client
+        for gap_start, gap_end in cache.missing_intervals(region, start_time, end_time):
+            # Only log in to WattTime when something actually has to be downloaded
+            wt_historical = wt_historical or default_session()
+            cache.store(region, _fetch_from_api(wt_historical, gap_start, gap_end, region), gap_start, gap_end)
+        df = cache.get(region, start_time, end_time)
+    
+    # Check if we got any data
+    if df.empty:
+        raise ValueError(f"No carbon intensity data found for region {region} between {start_time} and {end_time}")
+    
+    return df
         
 
 def graph_carbon_intensity(df: pd.DataFrame) -> None:
@@ -69,9 +105,13 @@ def graph_carbon_intensity(df: pd.DataFrame) -> None:
 
 if __name__ == "__main__":
     # Fetch historical data for the last year (April 23, 2024 to April 22, 2025)
-    # We need to fetch month by month since the API can only handle one month at a time
-    from datetime import datetime
-    import pandas as pd
+    # The API can only handle one month at a time, so the backfill fetches the months concurrently,
+    # rate limited and retried, and appends each one to the CSV as it arrives
+    # (run with `python -m utils.historical_data`)
+    import sys
+    from .backfill import BackfillError
+    from .backfill_writer import backfill_to_store, iter_store_ranges, write_store_archive
+    from .series_archive import archive_path_for
     
     # Set the region
     region = "CAISO_NORTH"
@@ -82,62 +122,29 @@ if __name__ == "__main__":
     # Set start date to one year ago (April 23, 2024)
     start_date = datetime(2024, 4, 23)
     
-    # Initialize an empty list to store all monthly dataframes
-    all_data = []
-    
-    # Current date for iteration
-    current_start = start_date
-    
     print(f"Fetching carbon intensity data for {region} from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}...")
+    output_file = f"carbon_intensity_{region}_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.csv"
+    try:
+        summary = backfill_to_store(start_date, end_date, region, output_file)
+    except BackfillError as e:
+        sys.exit(f"{e}\n{output_file} is incomplete")
+    if not summary["rows"]:
+        print("No data was fetched successfully.")
+        sys.exit(1)
     
-    # Loop through each month
-    while current_start < end_date:
-        # Calculate the end of the current month period (or end_date if it's the last period)
-        # Add one month to current_start
-        if current_start.month == 12:
-            next_month = datetime(current_start.year + 1, 1, current_start.day)
-        else:
-            next_month = datetime(current_start.year, current_start.month + 1, current_start.day)
-        
-        # If next_month is beyond our end_date, use end_date instead
-        current_end = min(next_month, end_date)
-        
-        print(f"Fetching data from {current_start.strftime('%Y-%m-%d')} to {current_end.strftime('%Y-%m-%d')}...")
-        
-        try:
-            # Format dates for the API
-            start_str = current_start.strftime("%Y-%m-%dT00:00:00Z")
-            end_str = current_end.strftime("%Y-%m-%dT23:59:59Z")
-            
-            # Fetch data for the current month
-            monthly_df = fetch_carbon_intensity(
-                start_time=start_str,
-                end_time=end_str,
-                region=region
-            )
-            
-            # Add to our list of dataframes
-            all_data.append(monthly_df)
-            print(f"Successfully fetched data for period ending {current_end.strftime('%Y-%m-%d')}")
-            
-        except Exception as e:
-            print(f"Error fetching data for period {current_start.strftime('%Y-%m-%d')} to {current_end.strftime('%Y-%m-%d')}: {str(e)}")
-        
-        # Move to the next month
-        current_start = next_month
+    print(f"Data saved to {output_file}")
+    ranges = summary["ranges"]
+    print(f"Combined data contains {summary['rows']} records from {ranges[0][0]} to {ranges[-1][1]}")
     
-    # Combine all monthly data into a single dataframe
-    if all_data:
-        combined_df = pd.concat(all_data)
-        print(f"Combined data contains {len(combined_df)} records from {combined_df.index.min()} to {combined_df.index.max()}")
-        
-        # Save the combined data
-        output_file = f"carbon_intensity_{region}_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.csv"
-        combined_df.to_csv(output_file)
-        print(f"Data saved to {output_file}")
-        
-        # Generate a graph of the data
-        print("Generating graph...")
-        graph_carbon_intensity(combined_df)
-    else:
-        print("No data was fetched successfully.")
+    # Save a columnar archive next to it for fast loading by the analysis code, streamed from
+    # the CSV one written range at a time
+    archive_file = archive_path_for(output_file)
+    write_store_archive(output_file, archive_file, region)
+    print(f"Archive saved to {archive_file}")
+    
+    # Generate a graph of hourly means, read one range at a time
+    print("Generating graph...")
+    # an hour split across two ranges is combined from the sums and counts of both
+    hourly = pd.concat(df["value"].resample("1h").agg(["sum", "count"]) for df in iter_store_ranges(output_file))
+    hourly = hourly.groupby(level="point_time").sum()
+    graph_carbon_intensity((hourly["sum"] / hourly["count"]).to_frame("value"))
@@ -0,0 +1,183 @@
+"""Region-keyed on-disk cache for carbon intensity data"""
+
+
+import json
+import os
+from typing import Union
+from datetime import datetime
+import pandas as pd
+
+from .chunk_merge import merge_chunks
+from .series_archive import read_intensity_archive, write_intensity_archive
+
+
+# Requested intervals closer than this are treated as contiguous (the monthly backfill asks
+# for ...T23:59:59Z followed by ...T00:00:00Z, which leaves a one second hole with no data)
+MERGE_TOLERANCE = pd.Timedelta(seconds=1)
+
+
+def _to_utc(timestamp: Union[str, datetime, pd.Timestamp]) -> pd.Timestamp:
+    return pd.to_datetime(timestamp, utc=True)
+
+
+def merge_intervals(intervals: list[tuple[pd.Timestamp, pd.Timestamp]]) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    Merge overlapping or touching intervals.
+
+    Args:
+        intervals (list[tuple[pd.Timestamp, pd.Timestamp]]): Closed [start, end] intervals in any order
+
+    Returns:
+        list[tuple[pd.Timestamp, pd.Timestamp]]: The disjoint intervals, sorted by start
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + MERGE_TOLERANCE:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class CarbonIntensityCache:
+    """
+    On-disk cache of carbon intensity series, one columnar archive per region.
+
+    Next to each region's series the cache records which time intervals have already been
+    requested from the API, so callers can fetch only the missing sub-ranges and splice them in.
+    """
+
+    def __init__(self, cache_dir: str, signal_type: str = "co2_moer"):
+        """
+        Args:
+            cache_dir (str): Directory holding the cached series (created if missing)
+            signal_type (str): The WattTime signal type stored in this cache
+        """
+        self.cache_dir = cache_dir
+        self.signal_type = signal_type
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _series_path(self, region: str) -> str:
+        return os.path.join(self.cache_dir, f"{self.signal_type}_{region}.npz")
+
+    def _intervals_path(self, region: str) -> str:
+        return os.path.join(self.cache_dir, f"{self.signal_type}_{region}.intervals.json")
+
+    def covered_intervals(self, region: str) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Get the time intervals already stored for a region.
+
+        Args:
+            region (str): The power region (e.g., 'CAISO_NORTH')
+
+        Returns:
+            list[tuple[pd.Timestamp, pd.Timestamp]]: Disjoint closed intervals, sorted by start
+        """
+        path = self._intervals_path(region)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [(_to_utc(start), _to_utc(end)) for start, end in json.load(f)]
+
+    def missing_intervals(
+        self,
+        region: str,
+        start_time: Union[str, datetime],
+        end_time: Union[str, datetime],
+    ) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Compute the sub-ranges of [start_time, end_time] that are not cached yet.
+
+        Args:
+            region (str): The power region (e.g., 'CAISO_NORTH')
+            start_time (Union[str, datetime]): The start of the requested period
+            end_time (Union[str, datetime]): The end of the requested period
+
+        Returns:
+            list[tuple[pd.Timestamp, pd.Timestamp]]: The uncovered closed intervals, sorted by start
+        """
+        start, end = _to_utc(start_time), _to_utc(end_time)
+        covered = self.covered_intervals(region)
+        if start == end:
+            # a single point in time is either inside a covered interval or missing
+            inside = any(covered_start <= start <= covered_end for covered_start, covered_end in covered)
+            return [] if inside else [(start, end)]
+        missing = []
+        cursor = start
+        for covered_start, covered_end in covered:
+            if covered_end < cursor:
+                continue
+            if covered_start > end:
+                break
+            if covered_start - cursor > MERGE_TOLERANCE:
+                missing.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+        if cursor < end and (end - cursor > MERGE_TOLERANCE or cursor == start):
+            missing.append((cursor, end))
+        return missing
+
+    def load(self, region: str) -> pd.DataFrame:
+        """
+        Load the full cached series for a region.
+
+        Args:
+            region (str): The power region (e.g., 'CAISO_NORTH')
+
+        Returns:
+            pd.DataFrame: The cached data indexed by point_time (empty if nothing is cached)
+        """
+        path = self._series_path(region)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=['value'], index=pd.DatetimeIndex([], tz="UTC", name='point_time'))
+        return read_intensity_archive(path)
+
+    def store(
+        self,
+        region: str,
+        df: pd.DataFrame,
+        start_time: Union[str, datetime],
+        end_time: Union[str, datetime],
+    ) -> None:
+        """
+        Splice freshly fetched data into the cached series and mark its interval as covered.
+
+        Args:
+            region (str): The power region (e.g., 'CAISO_NORTH')
+            df (pd.DataFrame): The fetched data indexed by point_time (may be empty)
+            start_time (Union[str, datetime]): The start of the period that was requested
+            end_time (Union[str, datetime]): The end of the period that was requested
+        """
+        if not df.empty:
+            df = df.copy()
+            df.index = pd.to_datetime(df.index, utc=True)
+            df.index.name = 'point_time'
+            if not df.index.is_monotonic_increasing:
+                df = df.sort_index()
+            # The cached series is sorted, so the two merge without a sort; on the same version
+            # freshly fetched points win over cached ones
+            combined = merge_chunks([self.load(region), df])
+            write_intensity_archive(self._series_path(region), combined, region, self.signal_type)
+
+        intervals = merge_intervals(self.covered_intervals(region) + [(_to_utc(start_time), _to_utc(end_time))])
+        with open(self._intervals_path(region), "w") as f:
+            json.dump([(start.isoformat(), end.isoformat()) for start, end in intervals], f, indent=2)
+
+    def get(
+        self,
+        region: str,
+        start_time: Union[str, datetime],
+        end_time: Union[str, datetime],
+    ) -> pd.DataFrame:
+        """
+        Read the cached data for a region between start and end times.
+
+        Args:
+            region (str): The power region (e.g., 'CAISO_NORTH')
+            start_time (Union[str, datetime]): The start of the period
+            end_time (Union[str, datetime]): The end of the period
+
+        Returns:
+            pd.DataFrame: The cached data within [start_time, end_time], indexed by point_time
+        """
+        df = self.load(region)
+        return df.loc[_to_utc(start_time):_to_utc(end_time)]
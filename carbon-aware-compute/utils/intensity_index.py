@@ -0,0 +1,343 @@
+"""Prefix-sum index for fast window queries over a carbon intensity series"""
+
+
+from typing import Optional, Union
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+
+def to_epoch_ns(times) -> Union[int, np.ndarray]:
+    """
+    Convert a timestamp (or an array of timestamps) to UTC epoch nanoseconds.
+
+    Naive timestamps are treated as UTC, timezone-aware timestamps are converted to UTC. Integers
+    (scalars or arrays) are taken to be epoch nanoseconds already.
+
+    Args:
+        times: A datetime, string, pd.Timestamp, integer or an array-like of them
+
+    Returns:
+        Union[int, np.ndarray]: The epoch nanoseconds as an int (scalar input) or an int64 array
+    """
+    if isinstance(times, (int, np.integer)):
+        return int(times)
+    if isinstance(times, (str, datetime, pd.Timestamp, np.datetime64)):
+        return int(pd.to_datetime(times, utc=True).value)
+    return pd.DatetimeIndex(pd.to_datetime(times, utc=True)).as_unit("ns").asi8
+
+
+def to_duration_ns(durations) -> Union[int, np.ndarray]:
+    """
+    Convert a duration (or an array of durations) to nanoseconds.
+
+    Args:
+        durations: A timedelta, string, pd.Timedelta, integer nanoseconds or an array-like of them
+
+    Returns:
+        Union[int, np.ndarray]: The nanoseconds as an int (scalar input) or an int64 array
+    """
+    if isinstance(durations, (int, np.integer)):
+        return int(durations)
+    if isinstance(durations, (str, timedelta, pd.Timedelta, np.timedelta64)):
+        return int(pd.Timedelta(durations).value)
+    return pd.TimedeltaIndex(pd.to_timedelta(durations)).as_unit("ns").asi8
+
+
+class CarbonIntensityIndex:
+    """
+    Cumulative-sum index over a carbon intensity series on a regular time grid.
+
+    The points are placed on the slot grid origin + k * step, where origin is the first point
+    time and step the cadence of the series; slots without a point are missing (NaN). The index
+    keeps the slot times as int64 epoch nanoseconds together with running sums of the values and
+    of the number of valid (non-NaN) values. The mean over any time window is then answered with
+    two binary searches and two subtractions, and the slots a job covers follow arithmetically
+    from its start and duration, without scanning or copying the underlying data.
+    """
+
+    def __init__(self, times: np.ndarray, values: np.ndarray, step: Optional[int] = None):
+        """
+        Args:
+            times (np.ndarray): Point times as int64 epoch nanoseconds, sorted ascending
+            values (np.ndarray): Carbon intensity values (gCO2/kWh), NaN for missing points
+            step (Optional[int]): The cadence of the series in nanoseconds (defaults to the median
+                spacing of the point times)
+        """
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if times.shape != values.shape or times.ndim != 1:
+            raise ValueError("times and values must be one-dimensional arrays of the same length")
+        if times.size and np.any(np.diff(times) < 0):
+            raise ValueError("times must be sorted in ascending order")
+
+        if step is None:
+            # Sampling cadence of the series (5 minutes for WattTime MOER data)
+            spacing = np.diff(times)
+            spacing = spacing[spacing > 0]
+            step = int(np.median(spacing)) if spacing.size else 0
+        if step < 0:
+            raise ValueError("step must not be negative")
+        self.step = int(step)
+        self.origin = int(times[0]) if times.size else 0
+
+        if self.step and times.size:
+            # a point belongs to the slot containing it, the last point of a slot wins
+            positions = (times - self.origin) // self.step
+            last = np.append(positions[1:] != positions[:-1], True)
+            grid = np.full(int(positions[-1]) + 1, np.nan)
+            grid[positions[last]] = values[last]
+            times = self.origin + np.arange(grid.size, dtype=np.int64) * self.step
+            values = grid
+        elif times.size:
+            times, values = times[-1:], values[-1:]
+
+        valid = ~np.isnan(values)
+        self.times = times
+        self.values = values
+        # Prefix arrays have a leading zero so that window [i, j) sums to prefix[j] - prefix[i]
+        self.value_cumsum = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+        self.count_cumsum = np.concatenate(([0], np.cumsum(valid, dtype=np.int64)))
+
+    @classmethod
+    def from_dataframe(cls, carbon_intensity_dataset: pd.DataFrame) -> "CarbonIntensityIndex":
+        """
+        Build an index from a carbon intensity DataFrame.
+
+        Args:
+            carbon_intensity_dataset (pd.DataFrame): DataFrame with a 'value' column and either a
+                'point_time' column or a datetime index (as returned by fetch_carbon_intensity)
+
+        Returns:
+            CarbonIntensityIndex: The index over the dataset, sorted by point time, with each
+                duplicated point time kept once (the last row) and missing slots as NaN
+        """
+        if 'point_time' in carbon_intensity_dataset.columns:
+            point_times = carbon_intensity_dataset['point_time']
+        else:
+            point_times = carbon_intensity_dataset.index
+        times = to_epoch_ns(point_times)
+        values = carbon_intensity_dataset['value'].to_numpy(dtype=np.float64)
+
+        order = np.argsort(times, kind="stable")
+        return cls(times[order], values[order])
+
+    def __len__(self) -> int:
+        return self.times.size
+
+    def window_bounds(self, start_time, end_time, inclusive_end: bool = True) -> tuple[int, int]:
+        """
+        Find the positions [lo, hi) of the points inside a time window.
+
+        Args:
+            start_time: The start of the window (inclusive)
+            end_time: The end of the window
+            inclusive_end (bool): Whether points exactly at end_time are part of the window
+
+        Returns:
+            tuple[int, int]: The half-open position range of the points in the window
+        """
+        lo = int(np.searchsorted(self.times, to_epoch_ns(start_time), side="left"))
+        hi = int(np.searchsorted(self.times, to_epoch_ns(end_time), side="right" if inclusive_end else "left"))
+        return lo, max(lo, hi)
+
+    def window_mean(self, start_time, end_time, inclusive_end: bool = True) -> float:
+        """
+        Compute the mean carbon intensity over a time window in O(log n).
+
+        Args:
+            start_time: The start of the window (inclusive)
+            end_time: The end of the window
+            inclusive_end (bool): Whether points exactly at end_time are part of the window
+
+        Returns:
+            float: The mean carbon intensity (gCO2/kWh) over the window
+
+        Raises:
+            ValueError: If no data points are found within the specified time window
+        """
+        lo, hi = self.window_bounds(start_time, end_time, inclusive_end)
+        count = self.count_cumsum[hi] - self.count_cumsum[lo]
+        if count == 0:
+            raise ValueError("No data points found within the specified time window")
+        return float((self.value_cumsum[hi] - self.value_cumsum[lo]) / count)
+
+    def start_window_means(self, start_time, flex_window, duration) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the mean carbon intensity of a job for every aligned start slot in a flex window.
+
+        Candidate starts are start_time itself followed by every slot time after it, up to
+        start_time + flex_window. A job starting at slot time t covers the slots in [t, t + duration);
+        the first candidate is measured like job_window_means, so it never starts before start_time.
+        The cost is linear in the number of candidate slots, independent of the series length.
+
+        Args:
+            start_time: The earliest start time of the job
+            flex_window: How far (timedelta) the start may be shifted past start_time
+            duration: The duration (timedelta) of the job
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The candidate start times (int64 epoch nanoseconds) and the
+                mean carbon intensity of each, NaN where the window is not fully covered by data
+        """
+        duration_ns = to_duration_ns(duration)
+        if duration_ns <= 0:
+            raise ValueError("duration must be positive")
+        start_ns = to_epoch_ns(start_time)
+        lo, hi = self.candidate_range(start_time, flex_window)
+        starts = np.concatenate(([start_ns], self.times[lo:hi]))
+        means = np.concatenate((self.job_window_means(start_ns, duration_ns), self.slot_means(duration_ns, lo, hi)))
+        return starts, means
+
+    def candidate_range(self, start_time, flex_window) -> tuple[int, int]:
+        """
+        Find the positions [lo, hi) of the slots a job may be shifted to.
+
+        These are the slots starting after start_time and at or before start_time + flex_window,
+        clipped to the series. The job's own start is the first candidate on top of them (see
+        start_window_means).
+
+        Args:
+            start_time: The earliest start time of the job
+            flex_window: How far (timedelta) the start may be shifted past start_time
+
+        Returns:
+            tuple[int, int]: The half-open position range of the candidate start slots
+        """
+        start_ns = to_epoch_ns(start_time)
+        flex_ns = to_duration_ns(flex_window)
+        if flex_ns < 0:
+            raise ValueError("flex_window must not be negative")
+        if not self.step:
+            return 0, 0
+
+        lo = min(max((start_ns - self.origin) // self.step + 1, 0), len(self))
+        hi = min(max((start_ns + flex_ns - self.origin) // self.step + 1, lo), len(self))
+        return int(lo), int(hi)
+
+    def slot_means(self, duration, lo: int = 0, hi: Optional[int] = None) -> np.ndarray:
+        """
+        Compute the rolling mean of a job of the given duration starting at each slot in [lo, hi).
+
+        A job starting at slot time t covers the slots in [t, t + duration). The cost is linear
+        in the number of slots evaluated.
+
+        Args:
+            duration: The duration (timedelta) of the job
+            lo (int): The first start slot
+            hi (Optional[int]): One past the last start slot (defaults to the end of the series)
+
+        Returns:
+            np.ndarray: The mean carbon intensity of each start slot, NaN where the window is not
+                fully covered by data
+        """
+        duration_ns = to_duration_ns(duration)
+        if duration_ns <= 0:
+            raise ValueError("duration must be positive")
+        hi = len(self) if hi is None else hi
+        if hi <= lo:
+            return np.empty(0)
+        if not self.step:
+            return np.full(hi - lo, np.nan)
+
+        positions = np.arange(lo, hi)
+        return self._slot_window_means(positions, positions - (-duration_ns // self.step))
+
+    def _slot_window_means(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """Mean of the slots [lo, hi), NaN unless every one of them is in the series and valid."""
+        complete = (lo >= 0) & (hi <= len(self))
+        lo, hi = np.clip(lo, 0, len(self)), np.clip(hi, 0, len(self))
+        counts = self.count_cumsum[hi] - self.count_cumsum[lo]
+        sums = self.value_cumsum[hi] - self.value_cumsum[lo]
+        complete &= (counts == hi - lo) & (counts > 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(complete, sums / counts, np.nan)
+
+    def job_window_means(self, start_times, durations) -> np.ndarray:
+        """
+        Compute the mean carbon intensity of jobs at their actual start times and durations.
+
+        A job starting at s covers the slot containing s and every slot starting before
+        s + duration, so a job shorter than a slot still gets the value of the slot it ran in.
+        For a start on a slot boundary this is the window [s, s + duration) of slot_means, and
+        it is how the schedulers measure the naive (zero-flex) case.
+
+        Args:
+            start_times: Array-like of job start times
+            durations: Array-like of job durations (timedeltas), or a single duration for all jobs
+
+        Returns:
+            np.ndarray: The mean carbon intensity (gCO2/kWh) of each job, NaN where the job is
+                not fully covered by data (including jobs starting before the series)
+        """
+        start_ns = np.atleast_1d(to_epoch_ns(start_times))
+        duration_ns = np.broadcast_to(to_duration_ns(durations), start_ns.shape)
+        if np.any(duration_ns <= 0):
+            raise ValueError("durations must be positive")
+        if not self.step:
+            return np.full(start_ns.size, np.nan)
+        lo = (start_ns - self.origin) // self.step
+        hi = -(-(start_ns + duration_ns - self.origin) // self.step)
+        return self._slot_window_means(lo, hi)
+
+    def window_means(self, start_times, end_times, inclusive_end: bool = True) -> np.ndarray:
+        """
+        Compute the mean carbon intensity for many time windows in one vectorized pass.
+
+        Args:
+            start_times: Array-like of window starts (inclusive)
+            end_times: Array-like of window ends, same length as start_times
+            inclusive_end (bool): Whether points exactly at the window end are part of the window
+
+        Returns:
+            np.ndarray: The mean carbon intensity (gCO2/kWh) of each window, NaN where a window
+                contains no data points
+        """
+        lo = np.searchsorted(self.times, to_epoch_ns(start_times), side="left")
+        hi = np.searchsorted(self.times, to_epoch_ns(end_times), side="right" if inclusive_end else "left")
+        hi = np.maximum(lo, hi)
+
+        counts = self.count_cumsum[hi] - self.count_cumsum[lo]
+        sums = self.value_cumsum[hi] - self.value_cumsum[lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / counts, np.nan)
+
+    def candidate_matrix(self, start_times, durations, flex_window) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the candidate start slots and window means of many jobs in one vectorized pass.
+
+        Row j holds the candidates of job j, as in start_window_means. Rows are padded to the
+        widest flex window: padded cells have a start of -1 and a mean of NaN.
+
+        Args:
+            start_times: Array-like of the earliest start time of each job
+            durations: Array-like of job durations (timedeltas), or a single duration for all jobs
+            flex_window: How far (timedelta) each start may be shifted
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The (jobs x candidates) start times as int64 epoch
+                nanoseconds and the mean carbon intensity of each candidate
+        """
+        start_ns = np.atleast_1d(to_epoch_ns(start_times))
+        flex_ns = to_duration_ns(flex_window)
+        duration_ns = np.broadcast_to(to_duration_ns(durations), start_ns.shape)
+        if np.any(duration_ns <= 0):
+            raise ValueError("durations must be positive")
+        if flex_ns < 0:
+            raise ValueError("flex_window must not be negative")
+
+        # the job's own start first, then the slots after it, as in start_window_means
+        naive = self.job_window_means(start_ns, duration_ns)
+        if not self.step:
+            return start_ns[:, None].copy(), naive[:, None]
+        lo = np.clip((start_ns - self.origin) // self.step + 1, 0, len(self))
+        hi = np.clip((start_ns + flex_ns - self.origin) // self.step + 1, lo, len(self))
+        width = int((hi - lo).max(initial=0))
+
+        positions = lo[:, None] + np.arange(width)
+        in_window = positions < hi[:, None]
+        positions = np.where(in_window, positions, lo[:, None])
+        slots = -(-duration_ns // self.step)
+        means = np.where(in_window, self._slot_window_means(positions, positions + slots[:, None]), np.nan)
+        starts = np.where(in_window, self.origin + positions * self.step, -1)
+        return np.column_stack((start_ns, starts)), np.column_stack((naive, means))
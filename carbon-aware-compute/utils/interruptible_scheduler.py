@@ -0,0 +1,300 @@
+"""Scheduling of interruptible jobs that can checkpoint and resume across slots"""
+
+
+from datetime import datetime, timedelta
+from typing import Optional, Union
+import numpy as np
+import pandas as pd
+
+from .intensity_index import CarbonIntensityIndex, to_duration_ns, to_epoch_ns
+from .series_store import FixedStrideSeries
+
+
+# Rows searched together by the min_chunk dynamic program (its tables grow with rows x slots x k)
+_CHUNKED_BLOCK_ROWS = 64
+
+
+def _slot_counts(durations_ns, step: int) -> np.ndarray:
+    """Number of whole slots needed to run each duration."""
+    return np.maximum(-(-np.asarray(durations_ns) // step), 1)
+
+
+def _runs_satisfied(chosen: np.ndarray, chunk: int) -> np.ndarray:
+    """
+    Check that every run of consecutive positions is at least `chunk` long.
+
+    Args:
+        chosen (np.ndarray): (rows x k) positions, sorted along each row
+        chunk (int): The minimum run length
+
+    Returns:
+        np.ndarray: One bool per row
+    """
+    k = chosen.shape[1]
+    if chunk <= 1:
+        return np.ones(chosen.shape[0], dtype=bool)
+    if chunk > k:
+        return np.zeros(chosen.shape[0], dtype=bool)
+    run_starts = np.ones(chosen.shape, dtype=bool)
+    run_starts[:, 1:] = np.diff(chosen, axis=1) != 1
+    # a run starting at s is long enough iff the position chunk - 1 picks later is chunk - 1 slots later
+    long_enough = np.zeros(chosen.shape, dtype=bool)
+    long_enough[:, :k - chunk + 1] = chosen[:, chunk - 1:] - chosen[:, :k - chunk + 1] == chunk - 1
+    return ~np.any(run_starts & ~long_enough, axis=1)
+
+
+def _cheapest_chunked_slots(values: np.ndarray, k: int, chunk: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pick the k cheapest positions of every row such that every run of consecutive positions is at least chunk long.
+
+    Dynamic program over (positions seen, positions picked), in O(len(values) * k) and vectorized
+    over rows. `unused[i, :, j]` is the best cost over the first i positions with j picked and
+    position i - 1 not picked, `used[i, :, j]` the same with position i - 1 closing a run that is
+    already long enough.
+
+    Args:
+        values (np.ndarray): The (rows x positions) costs, +inf where a position cannot be picked
+        k (int): The number of positions to pick
+        chunk (int): The minimum run length
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The (rows x k) sorted picked positions and whether each row
+            has a feasible pick (the positions of infeasible rows are meaningless)
+    """
+    rows, n = values.shape
+    finite = np.isfinite(values)
+    value_cumsum = np.zeros((rows, n + 1))
+    value_cumsum[:, 1:] = np.cumsum(np.where(finite, values, 0.0), axis=1)
+    blocked_cumsum = np.zeros((rows, n + 1), dtype=np.int64)
+    blocked_cumsum[:, 1:] = np.cumsum(~finite, axis=1)
+
+    unused = np.full((n + 1, rows, k + 1), np.inf)
+    used = np.full((n + 1, rows, k + 1), np.inf)
+    unused_from_used = np.zeros((n + 1, rows, k + 1), dtype=bool)
+    used_new_run = np.zeros((n + 1, rows, k + 1), dtype=bool)
+    unused[0, :, 0] = 0.0
+
+    extend = np.full((rows, k + 1), np.inf)
+    new_run = np.full((rows, k + 1), np.inf)
+    for i in range(1, n + 1):
+        unused_from_used[i] = used[i - 1] < unused[i - 1]
+        np.minimum(unused[i - 1], used[i - 1], out=unused[i])
+
+        extend[:, 1:] = used[i - 1, :, :-1] + values[:, i - 1:i]
+        if i >= chunk:
+            run_cost = np.where(
+                blocked_cumsum[:, i] == blocked_cumsum[:, i - chunk],
+                value_cumsum[:, i] - value_cumsum[:, i - chunk],
+                np.inf,
+            )
+            new_run[:, chunk:] = unused[i - chunk, :, :-chunk] + run_cost[:, None]
+        used_new_run[i] = new_run < extend
+        np.minimum(extend, new_run, out=used[i])
+
+    feasible = np.isfinite(np.minimum(unused[n, :, k], used[n, :, k]))
+
+    # walk the choices back from the last position, all rows at once
+    row_ids = np.arange(rows)
+    picked = np.zeros((rows, k), dtype=np.int64)
+    i = np.full(rows, n)
+    j = np.where(feasible, k, 0)
+    in_run = feasible & (used[n, :, k] < unused[n, :, k])
+    while np.any(j > 0):
+        active = j > 0
+        skip = active & ~in_run
+        starts_run = active & in_run & used_new_run[i, row_ids, j]
+        extends = active & in_run & ~starts_run
+
+        in_run = np.where(skip, unused_from_used[i, row_ids, j], in_run)
+        picked[extends, j[extends] - 1] = i[extends] - 1
+        for offset in range(chunk):
+            picked[starts_run, j[starts_run] - chunk + offset] = i[starts_run] - chunk + offset
+        in_run &= ~starts_run
+        i = i - skip - extends - chunk * starts_run
+        j = j - extends - chunk * starts_run
+    return picked, feasible
+
+
+def _cheapest_slots(values: np.ndarray, k: int, chunk: int) -> Optional[np.ndarray]:
+    """Pick the k cheapest positions (sorted), falling back to the chunked search if runs are too short."""
+    if np.count_nonzero(np.isfinite(values)) < k:
+        return None
+    chosen = np.sort(np.argpartition(values, k - 1)[:k])
+    if _runs_satisfied(chosen[None, :], chunk)[0]:
+        return chosen
+    picked, feasible = _cheapest_chunked_slots(values[None, :], k, chunk)
+    return picked[0] if feasible[0] else None
+
+
+def schedule_interruptible_job(
+    start_time: datetime,
+    duration: timedelta,
+    flex_window: timedelta,
+    carbon_intensity_dataset: Union[pd.DataFrame, CarbonIntensityIndex, FixedStrideSeries],
+    min_chunk: Optional[timedelta] = None,
+) -> dict[str, tuple[pd.DatetimeIndex, float]]:
+    """Finds the lowest carbon intensity slots for a job that can be split across slots.
+
+    The job may run in any whole slots between the first slot at or after start_time and the latest
+    finish of the non-interruptible job started there (that slot + flex_window + duration), as long
+    as the slots add up to its duration. The cheapest slots are selected with np.argpartition in
+    linear time. With min_chunk, every contiguous run of slots must be at least that long (shorter
+    checkpoint intervals are not worth resuming for); if the cheapest slots violate it, an exact
+    search over the candidate slots is run instead. The naive case is the job run uninterrupted
+    from start_time, measured as in CarbonIntensityIndex.job_window_means.
+
+    Args:
+        start_time (datetime): The start time of the job
+        duration (timedelta): The duration of the job (rounded up to whole slots)
+        flex_window (timedelta): The flex window for the job
+        carbon_intensity_dataset (Union[pd.DataFrame, CarbonIntensityIndex, FixedStrideSeries]): DataFrame
+            containing carbon intensity data, or a prebuilt index or store, see schedule_job
+        min_chunk (Optional[timedelta]): The minimum length of every contiguous run of slots
+            (rounded up to whole slots, capped at the job duration)
+
+    Returns:
+        dict[str, tuple[pd.DatetimeIndex, float]]: The selected slot start times and their mean carbon
+            intensity (gCO2/kWh) for the following cases:
+            - Optimal case (the cheapest slots)
+            - Naive case (the slots the job covers running uninterrupted from start_time, NaN
+              unless every one of them has data)
+
+    Raises:
+        ValueError: If the flex window does not hold enough slots with data
+    """
+    if isinstance(carbon_intensity_dataset, FixedStrideSeries):
+        carbon_intensity_dataset = carbon_intensity_dataset.index_between(
+            pd.Timestamp(start_time) - pd.Timedelta(carbon_intensity_dataset.step),
+            pd.Timestamp(start_time) + flex_window + duration,
+        )
+    elif not isinstance(carbon_intensity_dataset, CarbonIntensityIndex):
+        carbon_intensity_dataset = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
+    index = carbon_intensity_dataset
+
+    k = int(_slot_counts(to_duration_ns(duration), index.step))
+    chunk = min(int(_slot_counts(to_duration_ns(min_chunk), index.step)), k) if min_chunk is not None else 1
+    start_ns, duration_ns = to_epoch_ns(start_time), to_duration_ns(duration)
+    # whole slots only, so the first one is the first slot at or after start_time
+    lo = int(np.searchsorted(index.times, start_ns, side="left"))
+    first_ns = index.times[lo] if lo < len(index) else start_ns
+    hi = int(np.searchsorted(index.times, first_ns + to_duration_ns(flex_window) + duration_ns, side="left"))
+
+    values = index.values[lo:hi]
+    chosen = _cheapest_slots(np.where(np.isnan(values), np.inf, values), k, chunk) if hi > lo else None
+    if chosen is None:
+        raise ValueError("Not enough carbon intensity data found within the flex window")
+
+    # the naive run covers the slot containing start_time up to the slot holding its end
+    optimal = lo + chosen
+    naive_first = (start_ns - index.origin) // index.step
+    naive_last = -(-(start_ns + duration_ns - index.origin) // index.step)
+    naive = np.arange(max(naive_first, 0), min(naive_last, len(index)))
+    naive_mean = float(index.job_window_means(start_ns, duration_ns)[0])
+    return {
+        "optimal": (pd.to_datetime(index.times[optimal], utc=True), float(index.values[optimal].mean())),
+        "naive": (pd.to_datetime(index.times[naive], utc=True), naive_mean),
+    }
+
+
+def schedule_interruptible_jobs(
+    start_times,
+    durations,
+    flex_window: timedelta,
+    carbon_intensity_dataset: Union[pd.DataFrame, CarbonIntensityIndex],
+    min_chunk: Optional[timedelta] = None,
+) -> pd.DataFrame:
+    """Schedules many interruptible jobs at once, the vectorized counterpart of schedule_interruptible_job.
+
+    The candidate slots of all jobs form one (jobs x slots) matrix. Jobs needing the same number of
+    slots share one np.argpartition call over their rows, and only the jobs whose cheapest slots
+    break the min_chunk constraint go through the exact search, in blocks of rows.
+
+    Args:
+        start_times: Array-like of job start times
+        durations: Array-like of job durations (timedeltas), or a single duration for all jobs
+        flex_window (timedelta): The flex window for every job
+        carbon_intensity_dataset (Union[pd.DataFrame, CarbonIntensityIndex]): DataFrame containing carbon
+            intensity data, or a prebuilt CarbonIntensityIndex
+        min_chunk (Optional[timedelta]): The minimum length of every contiguous run of slots
+
+    Returns:
+        pd.DataFrame: One row per job with the columns:
+            - slots: The selected slot start times (a DatetimeIndex, empty if infeasible)
+            - optimal: The mean carbon intensity of the selected slots
+            - naive: The carbon intensity w/ no flex window, as in schedule_interruptible_job
+            Intensities are NaN for jobs without enough data in their flex window
+    """
+    if not isinstance(carbon_intensity_dataset, CarbonIntensityIndex):
+        carbon_intensity_dataset = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
+    index = carbon_intensity_dataset
+
+    start_ns = np.atleast_1d(to_epoch_ns(start_times))
+    duration_ns = np.broadcast_to(to_duration_ns(durations), start_ns.shape)
+    flex_ns = to_duration_ns(flex_window)
+    if flex_ns < 0:
+        raise ValueError("flex_window must not be negative")
+    ks = _slot_counts(duration_ns, index.step)
+    chunk_slots = int(_slot_counts(to_duration_ns(min_chunk), index.step)) if min_chunk is not None else 1
+
+    lo = np.searchsorted(index.times, start_ns, side="left")
+    if len(index):
+        first_ns = np.where(lo < len(index), index.times[np.minimum(lo, len(index) - 1)], start_ns)
+    else:
+        first_ns = start_ns
+    hi = np.maximum(np.searchsorted(index.times, first_ns + flex_ns + duration_ns, side="left"), lo)
+    width = int((hi - lo).max(initial=0))
+    positions = lo[:, None] + np.arange(width)
+    in_window = positions < hi[:, None]
+    values = index.values[np.where(in_window, positions, 0)] if len(index) else np.empty(positions.shape)
+    values = np.where(in_window & ~np.isnan(values), values, np.inf)
+
+    chosen_slots = np.empty(start_ns.size, dtype=object)
+    optimal = np.full(start_ns.size, np.nan)
+    for k in np.unique(ks):
+        rows = np.flatnonzero((ks == k) & (np.count_nonzero(np.isfinite(values), axis=1) >= k))
+        if not rows.size:
+            continue
+        chosen = np.sort(np.argpartition(values[rows], k - 1, axis=1)[:, :k], axis=1)
+        chunk = min(chunk_slots, int(k))
+        satisfied = _runs_satisfied(chosen, chunk)
+        for row, picked in zip(rows[satisfied], chosen[satisfied]):
+            chosen_slots[row] = lo[row] + picked
+        unsatisfied = rows[~satisfied]
+        for block in range(0, unsatisfied.size, _CHUNKED_BLOCK_ROWS):
+            block_rows = unsatisfied[block:block + _CHUNKED_BLOCK_ROWS]
+            picked, feasible = _cheapest_chunked_slots(values[block_rows], int(k), chunk)
+            for row, row_picked in zip(block_rows[feasible], picked[feasible]):
+                chosen_slots[row] = lo[row] + row_picked
+
+    empty = pd.DatetimeIndex([], tz="UTC")
+    slots = []
+    for row, picked in enumerate(chosen_slots):
+        if picked is None:
+            slots.append(empty)
+            continue
+        slots.append(pd.to_datetime(index.times[picked], utc=True))
+        optimal[row] = index.values[picked].mean()
+
+    return pd.DataFrame({
+        "slots": slots,
+        "optimal": optimal,
+        "naive": index.job_window_means(start_ns, duration_ns),
+    })
+
+
+if __name__ == "__main__":
+    from .historical_data import fetch_carbon_intensity
+
+    # Example usage (run with `python -m utils.interruptible_scheduler`)
+    df = fetch_carbon_intensity(
+        start_time="2025-04-15T00:00:00Z",
+        end_time="2025-04-21T00:00:00Z",
+        region="CAISO_NORTH"
+    )
+    print(schedule_interruptible_job(
+        start_time=pd.Timestamp("2025-04-15T00:00:00Z"),
+        duration=timedelta(hours=2),
+        flex_window=timedelta(hours=12),
+        carbon_intensity_dataset=CarbonIntensityIndex.from_dataframe(df),
+        min_chunk=timedelta(minutes=30),
+    ))
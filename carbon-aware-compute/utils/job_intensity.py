@@ -1,14 +1,19 @@
 """Module to find carbon intensity for a particular job"""
 
 
+from typing import Union
+import numpy as np
 import pandas as pd
 from datetime import datetime, timezone
 
+from .intensity_index import CarbonIntensityIndex
+from .series_store import FixedStrideSeries
+
 
 def compute_job_carbon_intensity(
     start_time: datetime,
     end_time: datetime,
-    carbon_intensity_dataset: pd.DataFrame
+    carbon_intensity_dataset: Union[pd.DataFrame, CarbonIntensityIndex, FixedStrideSeries]
 ) -> float:
     """
     Compute the mean carbon intensity for a job within a specified time window.
@@ -17,9 +22,12 @@ def compute_job_carbon_intensity(
         start_time (datetime): The start time of the job
         end_time (datetime): The end time of the job
         region (str): The power region where the job is running
-        carbon_intensity_dataset (pd.DataFrame): DataFrame containing carbon intensity data
+        carbon_intensity_dataset (Union[pd.DataFrame, CarbonIntensityIndex, FixedStrideSeries]): DataFrame containing carbon intensity data
             This DataFrame should have a datetime index or a timestamp column
-            and contain carbon intensity values for different regions
+            and contain carbon intensity values for different regions.
+            A DataFrame is indexed on every call (O(n log n)); for repeated queries build a
+            CarbonIntensityIndex once and pass it instead, or pass a memory-mapped
+            FixedStrideSeries to read only the job window from disk
     
     Returns:
         float: The mean carbon intensity (gCO2/kWh) for the job during the specified time window
@@ -28,30 +36,78 @@ def compute_job_carbon_intensity(
         ValueError: If no data points are found within the specified time window
         KeyError: If the power_region is not found in the dataset
     """
-    # Filter the region data for the specified time window
-    filtered_data = carbon_intensity_dataset[(carbon_intensity_dataset['point_time'] >= start_time) & (carbon_intensity_dataset['point_time'] <= end_time)]
-    
-    # Check if we have any data points
-    if filtered_data.empty:
-        raise ValueError("No data points found within the specified time window")
+    # A fixed-stride store computes the window position directly and only reads that slice
+    if isinstance(carbon_intensity_dataset, FixedStrideSeries):
+        return carbon_intensity_dataset.window_mean(start_time, end_time)
+
+    # Build the prefix-sum index over a raw DataFrame
+    if not isinstance(carbon_intensity_dataset, CarbonIntensityIndex):
+        carbon_intensity_dataset = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
 
-    # Compute the mean carbon intensity
-    mean_carbon_intensity = filtered_data['value'].mean()
+    # Compute the mean carbon intensity over [start_time, end_time]
+    mean_carbon_intensity = carbon_intensity_dataset.window_mean(start_time, end_time)
     return mean_carbon_intensity
 
 
+def compute_job_carbon_intensities(
+    start_times,
+    end_times,
+    carbon_intensity_dataset: Union[pd.DataFrame, CarbonIntensityIndex],
+) -> np.ndarray:
+    """
+    Compute the mean carbon intensity for many jobs at once.
+
+    This is the vectorized counterpart of compute_job_carbon_intensity: every window is resolved
+    with a single searchsorted over the sorted point times, so a whole job log costs one NumPy pass.
+
+    Args:
+        start_times: Array-like of job start times (datetimes, strings or datetime64)
+        end_times: Array-like of job end times, same length as start_times
+        carbon_intensity_dataset (Union[pd.DataFrame, CarbonIntensityIndex]): DataFrame containing carbon
+            intensity data, or a prebuilt CarbonIntensityIndex
+
+    Returns:
+        np.ndarray: The mean carbon intensity (gCO2/kWh) of each job, NaN for jobs whose window
+            contains no data points
+    """
+    if not isinstance(carbon_intensity_dataset, CarbonIntensityIndex):
+        carbon_intensity_dataset = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
+    return carbon_intensity_dataset.window_means(start_times, end_times)
+
+
+def job_log_windows(job_log: pd.DataFrame) -> tuple[pd.DatetimeIndex, pd.DatetimeIndex]:
+    """
+    Build the (start, end) windows of every job in a Snowflake usage log.
+
+    Args:
+        job_log (pd.DataFrame): Job log with StartTime and ExecutionTimeSeconds columns
+            (e.g. data/SnowflakeUsageDataset.csv)
+
+    Returns:
+        tuple[pd.DatetimeIndex, pd.DatetimeIndex]: The UTC start and end times of every job
+    """
+    start_times = pd.DatetimeIndex(pd.to_datetime(job_log['StartTime'], utc=True, format="ISO8601"))
+    end_times = start_times + pd.to_timedelta(job_log['ExecutionTimeSeconds'].to_numpy(), unit="s")
+    return start_times, end_times
+
+
 if __name__ == "__main__":
-    from historical_data import fetch_carbon_intensity
+    from .historical_data import fetch_carbon_intensity
 
-    # Example usage
+    # Example usage (run with `python -m utils.job_intensity`)
     df = fetch_carbon_intensity(
         start_time="2025-04-15T00:00:00Z",
         end_time="2025-04-21T00:00:00Z",
         region="CAISO_NORTH"
     )
+    index = CarbonIntensityIndex.from_dataframe(df)
     print(compute_job_carbon_intensity(
         start_time=datetime(2025, 4, 15, 0, 0, 0, tzinfo=timezone.utc),
         end_time=datetime(2025, 4, 15, 0, 30, 0, tzinfo=timezone.utc),
-        carbon_intensity_dataset=df
+        carbon_intensity_dataset=index
     ))
 
+    # Batch usage over a whole job log
+    jobs = pd.read_csv("data/SnowflakeUsageDataset.csv")
+    print(compute_job_carbon_intensities(*job_log_windows(jobs), carbon_intensity_dataset=index))
+
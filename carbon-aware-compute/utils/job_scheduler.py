@@ -1,16 +1,33 @@
+from collections import OrderedDict, namedtuple
+from typing import Sequence, Union
 from datetime import datetime, timezone
 from datetime import timedelta
+import numpy as np
 import pandas as pd
 
+from .intensity_index import CarbonIntensityIndex, to_duration_ns, to_epoch_ns
+from .region_matrix import RegionIntensityMatrix
+from .series_store import FixedStrideSeries
+
+
+# Same fields as functools.lru_cache's cache_info()
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
 
 def schedule_job(
     start_time: datetime,
     duration: timedelta,
     flex_window: timedelta,
-    carbon_intensity_dataset: pd.DataFrame
-) -> float:
+    carbon_intensity_dataset: Union[pd.DataFrame, CarbonIntensityIndex, FixedStrideSeries, RegionIntensityMatrix]
+) -> Union[dict[str, tuple[pd.Timestamp, float]], dict[str, tuple[str, pd.Timestamp, float]]]:
     """Finds the optimal time to schedule a job based on carbon intensity.
     
+    start_time itself and every 5-minute-aligned start after it up to start_time + flex_window
+    are evaluated (no candidate starts before start_time) with a rolling mean built on the
+    cumulative sums of the carbon intensity index. With a prebuilt CarbonIntensityIndex the cost
+    per job is linear in the flex window rather than in the size of the dataset; a DataFrame is
+    indexed on every call, which costs O(n log n) in the size of the dataset.
+    
     Returns the carbon intensity (gCO2/kWh) and scheduled start time for the following cases:
     - Optimal case (the start time w/ the minimum carbon intensity
     - Median case (the start time w/ the median carbon intensity)
@@ -21,52 +38,289 @@ def schedule_job(
         start_time (datetime): The start time of the job
         duration (timedelta): The duration of the job
         flex_window (timedelta): The flex window for the job
-        carbon_intensity_dataset (pd.DataFrame): DataFrame containing carbon intensity data
+        carbon_intensity_dataset (Union[pd.DataFrame, CarbonIntensityIndex, FixedStrideSeries, RegionIntensityMatrix]): DataFrame containing carbon intensity data
             This DataFrame should have a datetime index or a timestamp column
-            and contain carbon intensity values for different regions
+            and contain carbon intensity values for different regions.
+            Pass a prebuilt CarbonIntensityIndex to avoid re-indexing the dataset on every call,
+            or a memory-mapped FixedStrideSeries to read only the flex window from disk.
+            Pass a RegionIntensityMatrix to also pick the region: every (region, start) pair is
+            evaluated at once, and the naive case runs in the matrix's first (home) region
     
     Returns:
-        float: The carbon intensity (gCO2/kWh) and scheduled start time for the following cases:
+        dict[str, tuple[pd.Timestamp, float]]: The scheduled start time and carbon intensity (gCO2/kWh) for the following cases:
             - Optimal case (the start time w/ the minimum carbon intensity
             - Median case (the start time w/ the median carbon intensity)
             - Naive case (the start time w/ no flex window)
             - Worst case (the start time w/ the maximum carbon intensity)
+            For a RegionIntensityMatrix, each case is a (region, start time, carbon intensity) tuple
+    
+    Raises:
+        ValueError: If no candidate start within the flex window is fully covered by data
     """
-    # rollup the carbon intensity dataset by the duration of the job
-    # this will give us a list of carbon intensity values for each time window
-    carbon_intensity_dataset = carbon_intensity_dataset.resample(duration).mean()
+    if isinstance(carbon_intensity_dataset, RegionIntensityMatrix):
+        candidate_starts, candidate_means = carbon_intensity_dataset.start_window_means(start_time, flex_window, duration)
+        return _schedule_region_cases(carbon_intensity_dataset.regions, candidate_starts, candidate_means)
+    if isinstance(carbon_intensity_dataset, FixedStrideSeries):
+        # only index the slots a candidate window can touch
+        start_ns = to_epoch_ns(start_time)
+        carbon_intensity_dataset = carbon_intensity_dataset.index_between(
+            start_ns - carbon_intensity_dataset.step,
+            start_ns + to_duration_ns(flex_window) + to_duration_ns(duration),
+        )
+    elif not isinstance(carbon_intensity_dataset, CarbonIntensityIndex):
+        carbon_intensity_dataset = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
+
+    # mean carbon intensity for every candidate start in [start_time, start_time + flex_window]
+    candidate_starts, candidate_means = carbon_intensity_dataset.start_window_means(start_time, flex_window, duration)
+    return _schedule_cases(candidate_starts, candidate_means)
 
-    # find the optimal, median, naive, and  worst carbon intensity
-    optimal_case_idx = carbon_intensity_dataset.idxmin()
-    naive_case_idx = carbon_intensity_dataset.index[0]
-    worst_case_idx = carbon_intensity_dataset.idxmax()
 
-    # get value at optimal_case_idx
-    breakpoint()
-    optimal_carbon_intensity = list(carbon_intensity_dataset.loc[optimal_case_idx].to_dict()['value'].items())[0]
-    naive_carbon_intensity = list(carbon_intensity_dataset.loc[naive_case_idx].to_dict()['value'].items())[0]
-    worst_carbon_intensity = list(carbon_intensity_dataset.loc[worst_case_idx].to_dict()['value'].items())[0]
+def _case_indices(candidate_means: np.ndarray) -> dict[str, int]:
+    """Picks the positions of the optimal, median, naive and worst candidate window means."""
+    if candidate_means.size == 0 or np.all(np.isnan(candidate_means)):
+        raise ValueError("No complete carbon intensity data found within the flex window")
+
+    # the (lower) median is found with a linear-time selection instead of a full sort
+    valid_idx = np.flatnonzero(~np.isnan(candidate_means))
+    median_rank = (valid_idx.size - 1) // 2
+
+    return {
+        "optimal": int(np.nanargmin(candidate_means)),
+        "median": int(valid_idx[np.argpartition(candidate_means[valid_idx], median_rank)[median_rank]]),
+        "naive": 0,
+        "worst": int(np.nanargmax(candidate_means)),
+    }
+
 
+def _schedule_cases(candidate_starts: np.ndarray, candidate_means: np.ndarray) -> dict[str, tuple[pd.Timestamp, float]]:
+    """Picks the optimal, median, naive and worst start out of the candidate window means."""
     return {
-        "optimal": (optimal_carbon_intensity),
-        "naive": (naive_carbon_intensity),
-        "worst": (worst_carbon_intensity),
+        case: (pd.Timestamp(candidate_starts[idx], tz="UTC"), float(candidate_means[idx]))
+        for case, idx in _case_indices(candidate_means).items()
     }
 
 
+def _schedule_region_cases(
+    regions: list[str],
+    candidate_starts: np.ndarray,
+    candidate_means: np.ndarray,
+) -> dict[str, tuple[str, pd.Timestamp, float]]:
+    """Picks the optimal, median, naive and worst (region, start) pair out of (regions x candidates) window means."""
+    flat_means = candidate_means.ravel()
+    cases = {}
+    for case, idx in _case_indices(flat_means).items():
+        region, start = divmod(idx, candidate_means.shape[1])
+        cases[case] = (regions[region], pd.Timestamp(candidate_starts[start], tz="UTC"), float(flat_means[idx]))
+    return cases
+
+
+def candidate_percentiles(
+    candidate_means: np.ndarray,
+    percentiles: Sequence[float],
+    method: str = "linear",
+) -> np.ndarray:
+    """Computes percentiles of the candidate window means of many jobs in linear time.
+    
+    Percentiles are interpolated linearly between the closest ranks, or taken at the lower rank,
+    like np.percentile, but the ranks are found with np.partition (introselect) instead of a full
+    sort. NaN candidates are ignored.
+    
+    Args:
+        candidate_means (np.ndarray): The (jobs x candidates) window means, NaN for missing candidates
+        percentiles (Sequence[float]): The percentiles to compute, between 0 and 100
+        method (str): "linear" to interpolate between the closest ranks, "lower" for the candidate
+            at the lower rank (the lower median for the 50th percentile, as schedule_job picks)
+    
+    Returns:
+        np.ndarray: The (jobs x percentiles) values, NaN for jobs without any candidate
+    """
+    candidate_means = np.atleast_2d(candidate_means)
+    quantiles = np.asarray(percentiles, dtype=np.float64) / 100
+    if np.any((quantiles < 0) | (quantiles > 1)):
+        raise ValueError("percentiles must be between 0 and 100")
+    if method not in ("linear", "lower"):
+        raise ValueError(f"Unknown percentile method: {method}")
+
+    valid_counts = np.count_nonzero(~np.isnan(candidate_means), axis=1)
+    filled = np.where(np.isnan(candidate_means), np.inf, candidate_means)
+    result = np.full((candidate_means.shape[0], quantiles.size), np.nan)
+
+    # rows with the same number of valid candidates share the ranks to select
+    for count in np.unique(valid_counts[valid_counts > 0]):
+        rows = valid_counts == count
+        ranks = quantiles * (count - 1)
+        below = np.floor(ranks).astype(np.int64)
+        above = np.ceil(ranks).astype(np.int64) if method == "linear" else below
+        selected = np.partition(filled[rows], np.unique(np.concatenate([below, above])), axis=1)
+        weight = ranks - below
+        result[rows] = selected[:, below] * (1 - weight) + selected[:, above] * weight
+    return result
+
+
+def schedule_jobs(
+    start_times,
+    durations,
+    flex_window: timedelta,
+    carbon_intensity_dataset: Union[pd.DataFrame, CarbonIntensityIndex],
+    percentiles: Sequence[float] = (),
+) -> pd.DataFrame:
+    """Schedules many jobs at once, the vectorized counterpart of schedule_job.
+    
+    The candidate window means of all jobs are computed as one (jobs x candidates) matrix, and the
+    median and any extra percentiles are selected in linear time, so savings-distribution reports
+    over whole job logs stay cheap.
+    
+    Args:
+        start_times: Array-like of job start times
+        durations: Array-like of job durations (timedeltas), or a single duration for all jobs
+        flex_window (timedelta): The flex window for every job
+        carbon_intensity_dataset (Union[pd.DataFrame, CarbonIntensityIndex]): DataFrame containing carbon
+            intensity data, or a prebuilt CarbonIntensityIndex
+        percentiles (Sequence[float]): Extra percentiles (0-100) of the candidate intensities to report
+    
+    Returns:
+        pd.DataFrame: One row per job with the columns:
+            - optimal_start, optimal: The start time and carbon intensity w/ the minimum carbon intensity
+            - median: The (lower) median carbon intensity over the candidate starts, as in schedule_job
+            - naive: The carbon intensity w/ no flex window
+            - worst: The maximum carbon intensity over the candidate starts
+            - p<q>: The requested extra percentiles
+            Intensities are NaN for jobs without complete data in their flex window
+    """
+    if not isinstance(carbon_intensity_dataset, CarbonIntensityIndex):
+        carbon_intensity_dataset = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
+    candidate_starts, candidate_means = carbon_intensity_dataset.candidate_matrix(start_times, durations, flex_window)
+    has_candidate = ~np.all(np.isnan(candidate_means), axis=1)
+
+    optimal_idx = np.argmin(np.where(np.isnan(candidate_means), np.inf, candidate_means), axis=1)
+    optimal_start = np.take_along_axis(candidate_starts, optimal_idx[:, None], axis=1)[:, 0]
+    optimal = np.take_along_axis(candidate_means, optimal_idx[:, None], axis=1)[:, 0]
+    worst = np.max(np.where(np.isnan(candidate_means), -np.inf, candidate_means), axis=1)
+    # the lower median is an actual candidate, the one schedule_job reports
+    median = candidate_percentiles(candidate_means, [50], method="lower")[:, 0]
+    selected = candidate_percentiles(candidate_means, percentiles)
+
+    result = pd.DataFrame({
+        "optimal_start": pd.to_datetime(np.where(has_candidate, optimal_start, np.iinfo(np.int64).min), utc=True),
+        "optimal": np.where(has_candidate, optimal, np.nan),
+        "median": median,
+        "naive": candidate_means[:, 0] if candidate_means.shape[1] else np.full(len(candidate_means), np.nan),
+        "worst": np.where(has_candidate, worst, np.nan),
+    })
+    for i, percentile in enumerate(percentiles):
+        result[f"p{percentile:g}"] = selected[:, i]
+    return result
+
+
+class CarbonAwareScheduler:
+    """Schedules many jobs against one carbon intensity dataset.
+    
+    The dataset is indexed once. For every job length seen, in whole slots, the rolling mean
+    carbon intensity of a job starting at each slot of the whole series is computed once and kept
+    in a bounded LRU cache, so scheduling a job only slices the cached aggregate over its flex
+    window. Durations rounding up to the same number of slots cover the same points from a slot
+    start, so they share one aggregate.
+    """
+
+    def __init__(
+        self,
+        carbon_intensity_dataset: Union[pd.DataFrame, CarbonIntensityIndex],
+        max_cached_durations: int = 32,
+    ):
+        """
+        Args:
+            carbon_intensity_dataset (Union[pd.DataFrame, CarbonIntensityIndex]): DataFrame containing carbon
+                intensity data, or a prebuilt CarbonIntensityIndex
+            max_cached_durations (int): The number of per-slot-count aggregates kept in the LRU cache
+        """
+        if not isinstance(carbon_intensity_dataset, CarbonIntensityIndex):
+            carbon_intensity_dataset = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
+        self.index = carbon_intensity_dataset
+        self.max_cached_durations = max_cached_durations
+        self._rolling_means: OrderedDict[int, np.ndarray] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def rolling_means(self, duration: timedelta) -> np.ndarray:
+        """
+        Get the mean carbon intensity of a job of the given duration starting at each slot.
+        
+        Args:
+            duration (timedelta): The duration of the job
+        
+        Returns:
+            np.ndarray: The mean carbon intensity (gCO2/kWh) per start slot, NaN where the job
+                window is not fully covered by data
+        """
+        # a job starting at a slot covers the points before start + duration, the same points
+        # as a job lasting its duration rounded up to whole slots
+        step = max(self.index.step, 1)
+        key = max(-(-to_duration_ns(duration) // step), 1)
+        if key in self._rolling_means:
+            self.hits += 1
+            self._rolling_means.move_to_end(key)
+            return self._rolling_means[key]
+
+        self.misses += 1
+        means = self.index.slot_means(pd.Timedelta(key * step, unit="ns"))
+        self._rolling_means[key] = means
+        if len(self._rolling_means) > self.max_cached_durations:
+            self._rolling_means.popitem(last=False)
+        return means
+
+    def schedule(
+        self,
+        start_time: datetime,
+        duration: timedelta,
+        flex_window: timedelta,
+    ) -> dict[str, tuple[pd.Timestamp, float]]:
+        """Finds the optimal time to schedule a job, see schedule_job.
+        
+        Args:
+            start_time (datetime): The start time of the job
+            duration (timedelta): The duration of the job
+            flex_window (timedelta): The flex window for the job
+        
+        Returns:
+            dict[str, tuple[pd.Timestamp, float]]: The scheduled start time and carbon intensity (gCO2/kWh)
+                for the optimal, median, naive and worst cases
+        """
+        lo, hi = self.index.candidate_range(start_time, flex_window)
+        start_ns = to_epoch_ns(start_time)
+        # start_time itself is evaluated from start_time, the later slots come from the cache
+        starts = np.concatenate(([start_ns], self.index.times[lo:hi]))
+        means = np.concatenate((self.index.job_window_means(start_ns, duration), self.rolling_means(duration)[lo:hi]))
+        return _schedule_cases(starts, means)
+
+    def cache_info(self) -> CacheInfo:
+        """Reports the hits, misses and size of the per-slot-count cache."""
+        return CacheInfo(self.hits, self.misses, self.max_cached_durations, len(self._rolling_means))
+
+
 if __name__ == "__main__":
-    from historical_data import fetch_carbon_intensity
+    from .historical_data import fetch_carbon_intensity
 
-    # Example usage
+    # Example usage (run with `python -m utils.job_scheduler`)
     df = fetch_carbon_intensity(
         start_time="2025-04-15T00:00:00Z",
         end_time="2025-04-21T00:00:00Z",
         region="CAISO_NORTH"
     )
+    # Index the dataset once and reuse it for every query
+    index = CarbonIntensityIndex.from_dataframe(df)
     print(schedule_job(
         start_time=datetime(2025, 4, 15, 0, 0, 0, tzinfo=timezone.utc),
         duration=timedelta(hours=1),
         flex_window=timedelta(hours=1),
-        carbon_intensity_dataset=df
+        carbon_intensity_dataset=index
     ))
-    
\ No newline at end of file
+
+    # Scheduling many jobs against the same dataset
+    scheduler = CarbonAwareScheduler(index)
+    for hour in range(24):
+        scheduler.schedule(
+            start_time=datetime(2025, 4, 15, hour, 0, 0, tzinfo=timezone.utc),
+            duration=timedelta(hours=1),
+            flex_window=timedelta(hours=4),
+        )
+    print(scheduler.cache_info())
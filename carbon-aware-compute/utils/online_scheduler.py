@@ -0,0 +1,250 @@
+"""Streaming scheduler answering one job arrival at a time"""
+
+
+from datetime import datetime, timedelta
+from typing import Optional, Union
+import numpy as np
+import pandas as pd
+
+from .intensity_index import CarbonIntensityIndex, to_duration_ns, to_epoch_ns
+
+
+# Bulk appends of more points than this rebuild the trees instead of updating leaf by leaf
+_REBUILD_THRESHOLD = 64
+
+
+class _MinSegmentTree:
+    """Segment tree answering range argmin queries in O(log n), ties resolved to the lowest position."""
+
+    def __init__(self, values: np.ndarray):
+        self.size = 1
+        while self.size < max(values.size, 1):
+            self.size *= 2
+        self.mins = np.full(2 * self.size, np.inf)
+        self.args = np.full(2 * self.size, -1, dtype=np.int64)
+        self.mins[self.size:self.size + values.size] = values
+        self.args[self.size:self.size + values.size] = np.arange(values.size)
+
+        # build one level at a time, bottom-up
+        level = self.size // 2
+        while level:
+            left, right = slice(2 * level, 4 * level, 2), slice(2 * level + 1, 4 * level, 2)
+            take_right = self.mins[right] < self.mins[left]
+            self.mins[level:2 * level] = np.where(take_right, self.mins[right], self.mins[left])
+            self.args[level:2 * level] = np.where(take_right, self.args[right], self.args[left])
+            level //= 2
+
+    def update(self, position: int, value: float) -> None:
+        node = position + self.size
+        self.mins[node] = value
+        self.args[node] = position
+        node //= 2
+        while node:
+            left, right = 2 * node, 2 * node + 1
+            child = right if self.mins[right] < self.mins[left] else left
+            self.mins[node] = self.mins[child]
+            self.args[node] = self.args[child]
+            node //= 2
+
+    def argmin(self, lo: int, hi: int) -> tuple[int, float]:
+        """Returns the position and value of the minimum over [lo, hi), (-1, inf) if empty."""
+        best_value, best = np.inf, np.iinfo(np.int64).max
+        lo, hi = lo + self.size, hi + self.size
+        while lo < hi:
+            if lo & 1:
+                best_value, best = min((best_value, best), (self.mins[lo], self.args[lo]))
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best_value, best = min((best_value, best), (self.mins[hi], self.args[hi]))
+            lo //= 2
+            hi //= 2
+        return (int(best), float(best_value)) if np.isfinite(best_value) else (-1, np.inf)
+
+
+class OnlineScheduler:
+    """Schedules jobs as they arrive against a carbon intensity series that keeps growing.
+
+    Points are kept on a fixed time grid with running prefix sums. For every job duration seen
+    (rounded up to whole slots) a segment tree holds the rolling mean of a job starting at each
+    slot. A scheduling query is a range argmin over the flex window in O(log n). Appending a point
+    completes exactly one new window per duration, which is one O(log n) tree update, so nothing
+    is recomputed over the whole horizon.
+    """
+
+    def __init__(self, step: timedelta = timedelta(minutes=5)):
+        """
+        Args:
+            step (timedelta): The cadence of the series
+        """
+        self.step = to_duration_ns(step)
+        self.origin = None
+        self.length = 0
+        self._values = np.empty(1024)
+        self._value_cumsum = np.zeros(1025)
+        self._count_cumsum = np.zeros(1025, dtype=np.int64)
+        self._trees: dict[int, _MinSegmentTree] = {}
+
+    @classmethod
+    def from_dataframe(cls, carbon_intensity_dataset: pd.DataFrame, step: timedelta = timedelta(minutes=5)) -> "OnlineScheduler":
+        """
+        Build a scheduler seeded with a carbon intensity DataFrame.
+
+        Args:
+            carbon_intensity_dataset (pd.DataFrame): DataFrame with a 'value' column and either a
+                'point_time' column or a datetime index
+            step (timedelta): The cadence of the series
+
+        Returns:
+            OnlineScheduler: The scheduler, seeded with the dataset sorted by point time and each
+                duplicated point time kept once (the last row), like CarbonIntensityIndex.from_dataframe
+        """
+        index = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
+        scheduler = cls(step)
+        scheduler.extend(index.times, index.values)
+        return scheduler
+
+    def _reserve(self, length: int) -> None:
+        """Grows the buffers geometrically so appends are amortized O(1)."""
+        if length <= self._values.size:
+            return
+        capacity = max(length, 2 * self._values.size)
+        self._values = np.concatenate([self._values, np.empty(capacity - self._values.size)])
+        self._value_cumsum = np.concatenate([self._value_cumsum, np.zeros(capacity + 1 - self._value_cumsum.size)])
+        self._count_cumsum = np.concatenate([self._count_cumsum, np.zeros(capacity + 1 - self._count_cumsum.size, dtype=np.int64)])
+
+    def _rolling_means(self, slots: int, lo: int = 0, hi: int = None) -> np.ndarray:
+        """Mean of the windows of `slots` slots starting in [lo, hi), +inf where a slot of a window has no data."""
+        hi = self.length - slots + 1 if hi is None else hi
+        if hi <= lo:
+            return np.empty(0)
+        starts = np.arange(lo, hi)
+        counts = self._count_cumsum[starts + slots] - self._count_cumsum[starts]
+        sums = self._value_cumsum[starts + slots] - self._value_cumsum[starts]
+        return np.where(counts == slots, sums / slots, np.inf)
+
+    def extend(self, point_times, values) -> None:
+        """
+        Append new points to the series.
+
+        Args:
+            point_times: Array-like of point times, ascending and after the last appended point
+            values: Array-like of carbon intensity values (gCO2/kWh), NaN for missing points
+
+        Raises:
+            ValueError: If a point is not after the last appended point
+        """
+        times = np.atleast_1d(to_epoch_ns(point_times))
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        if not times.size:
+            return
+        if self.origin is None:
+            self.origin = int(times[0] - times[0] % self.step)
+
+        positions = (times - self.origin) // self.step
+        if np.any(np.diff(positions) <= 0) or positions[0] < self.length:
+            raise ValueError("Appended points must be in ascending order and after the last appended point")
+
+        old_length, new_length = self.length, int(positions[-1]) + 1
+        self._reserve(new_length)
+        # slots skipped by the new points are missing data
+        self._values[old_length:new_length] = np.nan
+        self._values[positions] = values
+        appended = self._values[old_length:new_length]
+        valid = ~np.isnan(appended)
+        self._value_cumsum[old_length + 1:new_length + 1] = self._value_cumsum[old_length] + np.cumsum(np.where(valid, appended, 0.0))
+        self._count_cumsum[old_length + 1:new_length + 1] = self._count_cumsum[old_length] + np.cumsum(valid)
+        self.length = new_length
+
+        for slots, tree in list(self._trees.items()):
+            first_new, last_new = max(old_length - slots + 1, 0), new_length - slots + 1
+            if last_new - first_new > _REBUILD_THRESHOLD or new_length > tree.size:
+                self._trees[slots] = _MinSegmentTree(self._rolling_means(slots))
+                continue
+            for position, mean in zip(range(first_new, last_new), self._rolling_means(slots, first_new, last_new)):
+                tree.update(position, mean)
+
+    def append(self, point_time: Union[str, datetime], value: float) -> None:
+        """Append one new point to the series, see extend."""
+        self.extend([to_epoch_ns(point_time)], [value])
+
+    def _tree(self, slots: int) -> _MinSegmentTree:
+        if slots not in self._trees:
+            self._trees[slots] = _MinSegmentTree(self._rolling_means(slots))
+        return self._trees[slots]
+
+    def schedule(
+        self,
+        start_time: datetime,
+        duration: timedelta,
+        flex_window: timedelta,
+    ) -> dict[str, tuple[pd.Timestamp, float]]:
+        """Finds the optimal time to start an arriving job, see schedule_job.
+
+        Args:
+            start_time (datetime): The start time of the job
+            duration (timedelta): The duration of the job (rounded up to whole slots for the
+                starts after start_time)
+            flex_window (timedelta): The flex window for the job
+
+        Returns:
+            dict[str, tuple[pd.Timestamp, float]]: The scheduled start time and carbon intensity (gCO2/kWh)
+                for the optimal and naive cases
+
+        Raises:
+            ValueError: If no candidate start within the flex window is fully covered by data
+        """
+        if self.origin is None:
+            raise ValueError("No complete carbon intensity data found within the flex window")
+        start_ns, duration_ns = to_epoch_ns(start_time), to_duration_ns(duration)
+        slots = max(-(-duration_ns // self.step), 1)
+        first = (start_ns - self.origin) // self.step
+        lo = max(first + 1, 0)
+        hi = min((start_ns + to_duration_ns(flex_window) - self.origin) // self.step + 1, self.length - slots + 1)
+
+        # the naive job starts at start_time inside slot `first` and runs through the slots before
+        # its end, like CarbonIntensityIndex.job_window_means; later candidates are whole slot
+        # windows. Every slot a window touches must have data
+        naive_end = -(-(start_ns + duration_ns - self.origin) // self.step)
+        naive_value = np.inf
+        if 0 <= first and naive_end <= self.length:
+            count = self._count_cumsum[naive_end] - self._count_cumsum[first]
+            if count == naive_end - first:
+                naive_value = (self._value_cumsum[naive_end] - self._value_cumsum[first]) / count
+
+        best, best_value = self._tree(slots).argmin(lo, hi) if hi > lo else (-1, np.inf)
+        if naive_value <= best_value:
+            best, best_value = None, naive_value
+        if not np.isfinite(best_value):
+            raise ValueError("No complete carbon intensity data found within the flex window")
+
+        def case(position: Optional[int], value: float) -> tuple[pd.Timestamp, float]:
+            start = start_ns if position is None else self.origin + position * self.step
+            return pd.Timestamp(start, tz="UTC"), float(value) if np.isfinite(value) else np.nan
+
+        return {
+            "optimal": case(best, best_value),
+            "naive": case(None, naive_value),
+        }
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from .series_archive import load_carbon_intensity
+
+    # Replay a data file point by point, scheduling a 1h job with 8h of flex after every arrival
+    # (run with `python -m utils.online_scheduler <data file>`)
+    df = load_carbon_intensity(sys.argv[1])
+    split_time = df.index.sort_values()[len(df) // 2]
+    scheduler = OnlineScheduler.from_dataframe(df[df.index < split_time])
+    # the arrivals in order, one per point time
+    arrivals = CarbonIntensityIndex.from_dataframe(df[df.index >= split_time])
+
+    start = time.perf_counter()
+    for point_time, value in zip(arrivals.times, arrivals.values):
+        scheduler.append(point_time, value)
+        result = scheduler.schedule(pd.Timestamp(point_time, tz="UTC") - timedelta(hours=8), timedelta(hours=1), timedelta(hours=8))
+    elapsed = time.perf_counter() - start
+    print(f"Processed {len(arrivals)} arrivals in {elapsed:.2f}s ({elapsed / len(arrivals) * 1e6:.0f} us per arrival)")
+    print(f"Last decision: {result}")
@@ -0,0 +1,95 @@
+"""Thread-parallel execution of per-job batch kernels (experimental)
+
+Batch kernels such as CarbonIntensityIndex.window_means and schedule_jobs are independent per
+job, so a job array can be split into contiguous chunks that run on a thread pool and are
+concatenated back in order. On the free-threaded build (python3.13t) the chunks can run truly in
+parallel; on the standard build they only overlap where NumPy releases the GIL.
+
+Nothing in the package uses this yet: the public kernels stay single-threaded until the
+benchmark below (`python -m utils.parallel`) shows a gain on both builds.
+"""
+
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Sequence, TypeVar
+import numpy as np
+
+
+T = TypeVar("T")
+
+# Below this many jobs per chunk the thread overhead outweighs the work
+MIN_CHUNK_JOBS = 4096
+
+
+def gil_enabled() -> bool:
+    """Returns whether the interpreter runs with the GIL (always True before Python 3.13)."""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled() if is_gil_enabled is not None else True
+
+
+def map_job_chunks(
+    kernel: Callable[..., T],
+    job_arrays: Sequence[np.ndarray],
+    max_workers: Optional[int] = None,
+) -> list[T]:
+    """
+    Run a kernel over contiguous chunks of job arrays on a thread pool (see the module docstring).
+
+    Args:
+        kernel (Callable[..., T]): Called with one chunk of every job array, in the same order
+        job_arrays (Sequence[np.ndarray]): Per-job arrays of the same length
+        max_workers (Optional[int]): The number of threads (defaults to the CPU count); 1 runs the
+            kernel once on the whole arrays in the calling thread
+
+    Returns:
+        list[T]: The kernel results, in job order
+    """
+    jobs = len(job_arrays[0])
+    workers = max_workers or os.cpu_count() or 1
+    chunks = max(min(workers, jobs // MIN_CHUNK_JOBS), 1)
+    if chunks == 1:
+        return [kernel(*job_arrays)]
+
+    bounds = np.linspace(0, jobs, chunks + 1).astype(np.int64)
+    with ThreadPoolExecutor(max_workers=chunks) as executor:
+        return list(executor.map(
+            lambda lo, hi: kernel(*(array[lo:hi] for array in job_arrays)),
+            bounds[:-1],
+            bounds[1:],
+        ))
+
+
+if __name__ == "__main__":
+    import time
+    from datetime import timedelta
+    from .intensity_index import CarbonIntensityIndex
+    from .job_scheduler import schedule_jobs
+    from .series_archive import load_carbon_intensity
+
+    # Scaling curve of the batch kernels run through map_job_chunks; run it on both builds to compare
+    # (`python -m utils.parallel <data file>` and `python3.13t -m utils.parallel <data file>`)
+    index = CarbonIntensityIndex.from_dataframe(load_carbon_intensity(sys.argv[1]))
+    rng = np.random.default_rng(0)
+    jobs = 1_000_000
+    start_ns = rng.integers(index.times[0], index.times[-1] - 86_400_000_000_000, jobs)
+    duration_ns = rng.integers(60, 4 * 3600, jobs) * 1_000_000_000
+
+    def schedule_chunk(starts: np.ndarray, durations: np.ndarray):
+        return schedule_jobs(starts, durations, timedelta(hours=4), index)
+
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil_enabled() else 'disabled'}, {os.cpu_count()} CPUs")
+    print(f"{'threads':>8} {'intensities (s)':>16} {'speedup':>8} {'schedule (s)':>13} {'speedup':>8}")
+    baseline = None
+    for workers in (1, 2, 4, 8, 16):
+        if workers > 2 * (os.cpu_count() or 1):
+            break
+        start = time.perf_counter()
+        map_job_chunks(index.window_means, [start_ns, start_ns + duration_ns], workers)
+        intensities = time.perf_counter() - start
+        start = time.perf_counter()
+        map_job_chunks(schedule_chunk, [start_ns[:200_000], duration_ns[:200_000]], workers)
+        schedule = time.perf_counter() - start
+        baseline = baseline or (intensities, schedule)
+        print(f"{workers:>8} {intensities:>16.3f} {baseline[0] / intensities:>8.2f} {schedule:>13.3f} {baseline[1] / schedule:>8.2f}")
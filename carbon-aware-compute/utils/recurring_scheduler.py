@@ -0,0 +1,187 @@
+"""Phase optimizer for recurring jobs (e.g. FactSubscription every 10 minutes)"""
+
+
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+import numpy as np
+import pandas as pd
+
+from .intensity_index import CarbonIntensityIndex, to_duration_ns, to_epoch_ns
+from .series_store import FixedStrideSeries
+
+
+def _grid_window_means(
+    carbon_intensity_dataset: Union[pd.DataFrame, CarbonIntensityIndex, FixedStrideSeries],
+    start_time: Union[str, datetime],
+    end_time: Union[str, datetime],
+    duration: timedelta,
+) -> tuple[np.ndarray, int, int]:
+    """
+    Compute the mean carbon intensity of a job starting at each slot of a fixed time grid.
+
+    Returns:
+        tuple[np.ndarray, int, int]: The window mean per slot (NaN where the window has no data),
+            the epoch nanosecond time of the first slot and the step in nanoseconds
+    """
+    if isinstance(carbon_intensity_dataset, FixedStrideSeries):
+        lo, hi = carbon_intensity_dataset.slot_range(start_time, end_time)
+        step = carbon_intensity_dataset.step
+        origin = carbon_intensity_dataset.origin + lo * step
+        grid = np.asarray(carbon_intensity_dataset.values[lo:hi], dtype=np.float64)
+    else:
+        if not isinstance(carbon_intensity_dataset, CarbonIntensityIndex):
+            carbon_intensity_dataset = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
+        index = carbon_intensity_dataset
+        lo, hi = index.window_bounds(start_time, end_time)
+        if hi <= lo:
+            raise ValueError("No data points found within the specified time window")
+        step = index.step
+        origin = int(index.times[lo] - index.times[lo] % step)
+        positions = (index.times[lo:hi] - origin) // step
+        grid = np.full(int(positions[-1]) + 1, np.nan)
+        grid[positions] = index.values[lo:hi]
+
+    slots = max(-(-to_duration_ns(duration) // step), 1)
+    if grid.size < slots:
+        raise ValueError("The historical period is shorter than the job duration")
+    valid = ~np.isnan(grid)
+    value_cumsum = np.concatenate([[0.0], np.cumsum(np.where(valid, grid, 0.0))])
+    count_cumsum = np.concatenate([[0], np.cumsum(valid)])
+    counts = count_cumsum[slots:] - count_cumsum[:-slots]
+    sums = value_cumsum[slots:] - value_cumsum[:-slots]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan), origin, step
+
+
+def score_phase_offsets(window_means: np.ndarray, first_phase: int, cadence_slots: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Score every phase offset of a recurring job in one vectorized pass.
+
+    The per-slot window means are viewed as a (periods x cadence) matrix without copying: row r
+    holds period r and column j holds the run at phase offset j, so the column means are the
+    average intensity each phase would have seen. The trailing partial period is ignored.
+
+    Args:
+        window_means (np.ndarray): The mean carbon intensity of a run starting at each slot
+        first_phase (int): The phase (in slots, modulo the cadence) of the first slot
+        cadence_slots (int): The cadence in slots
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The mean carbon intensity (gCO2/kWh) and the number of runs
+            with data of each phase offset 0..cadence_slots - 1
+    """
+    skip = -first_phase % cadence_slots
+    periods = (window_means.size - skip) // cadence_slots
+    if periods <= 0:
+        return np.full(cadence_slots, np.nan), np.zeros(cadence_slots, dtype=np.int64)
+    by_phase = window_means[skip:skip + periods * cadence_slots].reshape(periods, cadence_slots)
+
+    runs = np.count_nonzero(~np.isnan(by_phase), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(runs > 0, np.nansum(by_phase, axis=0) / runs, np.nan), runs
+
+
+def optimize_recurring_phase(
+    cadence: timedelta,
+    duration: timedelta,
+    start_time: Union[str, datetime],
+    end_time: Union[str, datetime],
+    carbon_intensity_dataset: Union[pd.DataFrame, CarbonIntensityIndex, FixedStrideSeries],
+    cadence_shifts: Sequence[timedelta] = (timedelta(0),),
+) -> pd.DataFrame:
+    """
+    Score every cron phase offset of a recurring job over a historical period.
+
+    A job with a cadence of 10 minutes and a phase offset of 5 minutes runs at :05, :15, :25, ...
+    (offsets are measured from the top of the hour, or from midnight UTC for cadences that do not
+    divide an hour). Each cadence shift adds a candidate cadence (e.g. timedelta(minutes=5) also
+    evaluates running every 15 minutes instead of every 10).
+
+    Args:
+        cadence (timedelta): The current cadence of the job (e.g. its MinuteShift)
+        duration (timedelta): The duration of one run (rounded up to whole slots)
+        start_time (Union[str, datetime]): The start of the historical period
+        end_time (Union[str, datetime]): The end of the historical period
+        carbon_intensity_dataset (Union[pd.DataFrame, CarbonIntensityIndex, FixedStrideSeries]): The
+            carbon intensity data
+        cadence_shifts (Sequence[timedelta]): Shifts applied to the cadence, non-positive cadences
+            are skipped
+
+    Returns:
+        pd.DataFrame: One row per (cadence, phase_offset) with the mean carbon intensity (gCO2/kWh)
+            a run would have seen and the number of runs with data, sorted by mean_intensity
+
+    Raises:
+        ValueError: If a cadence is not a multiple of the data step
+    """
+    window_means, origin, step = _grid_window_means(carbon_intensity_dataset, start_time, end_time, duration)
+    cadence_ns = to_duration_ns(cadence)
+    # Phases are measured from midnight UTC, which also lines up with the hour for sub-hour cadences
+    origin_in_day = origin % pd.Timedelta(days=1).value // step
+
+    rows = []
+    for shift in cadence_shifts:
+        candidate_ns = cadence_ns + to_duration_ns(shift)
+        if candidate_ns <= 0:
+            continue
+        if candidate_ns % step:
+            raise ValueError(f"Cadence {pd.Timedelta(candidate_ns)} is not a multiple of the data step {pd.Timedelta(step)}")
+        cadence_slots = candidate_ns // step
+        means, runs = score_phase_offsets(window_means, origin_in_day % cadence_slots, cadence_slots)
+        rows.append(pd.DataFrame({
+            "cadence": pd.Timedelta(candidate_ns),
+            "phase_offset": pd.to_timedelta(np.arange(cadence_slots) * step),
+            "mean_intensity": means,
+            "runs": runs,
+        }))
+    if not rows:
+        raise ValueError("No positive cadence to evaluate")
+    return pd.concat(rows, ignore_index=True).sort_values("mean_intensity", kind="stable", ignore_index=True)
+
+
+def recurring_jobs(job_log: pd.DataFrame, step: timedelta = timedelta(minutes=5)) -> pd.DataFrame:
+    """
+    Summarize the recurring jobs of a Snowflake usage log.
+
+    Args:
+        job_log (pd.DataFrame): Job log with JobName, MinuteShift, StartTime and ExecutionTimeSeconds
+            columns (e.g. data/SnowflakeDataSetISOFormat.csv)
+        step (timedelta): The grid the observed phase is rounded down to
+
+    Returns:
+        pd.DataFrame: One row per JobName with the cadence, the median run duration and the most
+            common observed phase offset
+    """
+    start_ns = to_epoch_ns(pd.to_datetime(job_log['StartTime'], utc=True, format="ISO8601"))
+    cadence_ns = to_duration_ns(pd.to_timedelta(job_log['MinuteShift'].to_numpy(), unit="m"))
+    step_ns = to_duration_ns(step)
+    phase_ns = (start_ns % cadence_ns) // step_ns * step_ns
+
+    jobs = pd.DataFrame({
+        "JobName": job_log['JobName'].to_numpy(),
+        "cadence": pd.to_timedelta(cadence_ns),
+        "duration": pd.to_timedelta(job_log['ExecutionTimeSeconds'].to_numpy(), unit="s"),
+        "phase_offset": pd.to_timedelta(phase_ns),
+    })
+    return jobs.groupby("JobName").agg(
+        cadence=("cadence", "first"),
+        duration=("duration", "median"),
+        phase_offset=("phase_offset", lambda phases: phases.mode().iloc[0]),
+    )
+
+
+if __name__ == "__main__":
+    import sys
+    from .series_archive import load_carbon_intensity
+
+    # Compare the observed phase of each recurring job with the best one over the whole data file
+    # (run with `python -m utils.recurring_scheduler <data file> data/SnowflakeDataSetISOFormat.csv`)
+    index = CarbonIntensityIndex.from_dataframe(load_carbon_intensity(sys.argv[1]))
+    start, end = pd.Timestamp(index.times[0], tz="UTC"), pd.Timestamp(index.times[-1], tz="UTC")
+    for name, job in recurring_jobs(pd.read_csv(sys.argv[2])).iterrows():
+        shifts = [timedelta(minutes=minutes) for minutes in (-5, 0, 5, 10)]
+        scores = optimize_recurring_phase(job.cadence, job.duration, start, end, index, cadence_shifts=shifts)
+        same_cadence = scores[scores.cadence == job.cadence].set_index("phase_offset")
+        best = scores.iloc[0]
+        print(f"{name}: every {job.cadence} at +{job.phase_offset} -> {same_cadence.loc[job.phase_offset, 'mean_intensity']:.2f} gCO2/kWh, "
+              f"best every {best.cadence} at +{best.phase_offset} -> {best.mean_intensity:.2f} gCO2/kWh")
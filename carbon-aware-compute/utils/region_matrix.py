@@ -0,0 +1,161 @@
+"""Region x time carbon intensity matrix for scheduling across several grid regions at once"""
+
+
+from datetime import timedelta
+from typing import Optional, Union
+import numpy as np
+import pandas as pd
+
+from .intensity_index import CarbonIntensityIndex, to_duration_ns, to_epoch_ns
+from .series_store import FixedStrideSeries
+
+
+class RegionIntensityMatrix:
+    """
+    Carbon intensity of several regions on one shared time grid.
+
+    Row r holds the series of regions[r], column i the slot starting at times[i] (NaN where a
+    region has no data). Running sums of the values and valid counts are kept along the time
+    axis, so the mean of any window is two subtractions per region, and one vectorized pass
+    evaluates every (region, start) pair of a flex window.
+    """
+
+    def __init__(self, regions: list[str], origin: int, step: int, values: np.ndarray):
+        """
+        Args:
+            regions (list[str]): The power regions, one per row (the first one is the home region)
+            origin (int): The start of the first slot as epoch nanoseconds
+            step (int): The slot length in nanoseconds
+            values (np.ndarray): The (regions x slots) carbon intensity values (gCO2/kWh), NaN for missing slots
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim != 2 or values.shape[0] != len(regions):
+            raise ValueError("values must be a (regions x slots) matrix")
+        if step <= 0:
+            raise ValueError("step must be positive")
+
+        valid = ~np.isnan(values)
+        self.regions = list(regions)
+        self.origin = int(origin)
+        self.step = int(step)
+        self.values = values
+        self.times = self.origin + np.arange(values.shape[1], dtype=np.int64) * self.step
+        self.value_cumsum = np.zeros((values.shape[0], values.shape[1] + 1))
+        self.value_cumsum[:, 1:] = np.cumsum(np.where(valid, values, 0.0), axis=1)
+        self.count_cumsum = np.zeros((values.shape[0], values.shape[1] + 1), dtype=np.int64)
+        self.count_cumsum[:, 1:] = np.cumsum(valid, axis=1)
+
+    @classmethod
+    def from_datasets(
+        cls,
+        carbon_intensity_datasets: dict[str, Union[pd.DataFrame, CarbonIntensityIndex, FixedStrideSeries]],
+        step: Optional[timedelta] = None,
+    ) -> "RegionIntensityMatrix":
+        """
+        Align the series of several regions on one time grid.
+
+        Args:
+            carbon_intensity_datasets (dict[str, Union[pd.DataFrame, CarbonIntensityIndex, FixedStrideSeries]]):
+                The carbon intensity data of each region, keyed by region (the first one is the
+                home region used for the naive case)
+            step (Optional[timedelta]): The slot length (defaults to the cadence of the first region)
+
+        Returns:
+            RegionIntensityMatrix: The matrix covering the union of all series
+        """
+        indexes = {}
+        for region, dataset in carbon_intensity_datasets.items():
+            if isinstance(dataset, FixedStrideSeries):
+                dataset = CarbonIntensityIndex(dataset.origin + np.arange(len(dataset), dtype=np.int64) * dataset.step, dataset.values, dataset.step)
+            elif not isinstance(dataset, CarbonIntensityIndex):
+                dataset = CarbonIntensityIndex.from_dataframe(dataset)
+            indexes[region] = dataset
+        non_empty = [index for index in indexes.values() if len(index)]
+        if not non_empty:
+            raise ValueError("Cannot build a region matrix from empty datasets")
+
+        step_ns = to_duration_ns(step) if step is not None else next(index.step for index in non_empty if index.step)
+        first = min(int(index.times[0]) for index in non_empty)
+        origin = first - first % step_ns
+        length = max(int(index.times[-1]) for index in non_empty) // step_ns - origin // step_ns + 1
+
+        values = np.full((len(indexes), length), np.nan)
+        for row, index in enumerate(indexes.values()):
+            # later points win when several points fall in one slot
+            values[row, (index.times - origin) // step_ns] = index.values
+        return cls(list(indexes), origin, step_ns, values)
+
+    def __len__(self) -> int:
+        return self.values.shape[1]
+
+    def start_window_means(self, start_time, flex_window, duration) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the mean carbon intensity of a job for every (region, start slot) pair of a flex window.
+
+        Candidate starts are start_time and the slots after it up to start_time + flex_window, as
+        in CarbonIntensityIndex.start_window_means, evaluated for all regions in one pass over the
+        running sums.
+
+        Args:
+            start_time: The earliest start time of the job
+            flex_window: How far (timedelta) the start may be shifted past start_time
+            duration: The duration (timedelta) of the job
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The candidate start times (int64 epoch nanoseconds) and the
+                (regions x candidates) mean carbon intensity, NaN where a window is not fully covered by data
+        """
+        start_ns = to_epoch_ns(start_time)
+        flex_ns = to_duration_ns(flex_window)
+        duration_ns = to_duration_ns(duration)
+        if flex_ns < 0:
+            raise ValueError("flex_window must not be negative")
+        if duration_ns <= 0:
+            raise ValueError("duration must be positive")
+
+        # start_time itself first (in the slot containing it), then the slots after it; a window
+        # counts only if every slot it touches is in the grid and has data, as for a single region
+        first = (start_ns - self.origin) // self.step
+        lo = min(max(first + 1, 0), len(self))
+        hi = min(max((start_ns + flex_ns - self.origin) // self.step + 1, lo), len(self))
+        starts = np.concatenate(([start_ns], self.times[lo:hi]))
+        firsts = np.concatenate(([first], np.arange(lo, hi)))
+        ends = np.concatenate((
+            [-(-(start_ns + duration_ns - self.origin) // self.step)],
+            np.arange(lo, hi) - (-duration_ns // self.step),
+        ))
+
+        inside = (firsts >= 0) & (ends <= len(self))
+        firsts, ends = np.clip(firsts, 0, len(self)), np.clip(ends, 0, len(self))
+        counts = self.count_cumsum[:, ends] - self.count_cumsum[:, firsts]
+        sums = self.value_cumsum[:, ends] - self.value_cumsum[:, firsts]
+        complete = inside & (counts == ends - firsts) & (counts > 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return starts, np.where(complete, sums / counts, np.nan)
+
+if __name__ == "__main__":
+    import time
+    from datetime import datetime, timezone
+    from .historical_data import fetch_carbon_intensity
+    from .job_scheduler import schedule_job
+
+    # Example usage (run with `python -m utils.region_matrix`)
+    regions = ["CAISO_NORTH", "SPP_TX", "ERCOT_EASTTX"]
+    matrix = RegionIntensityMatrix.from_datasets({
+        region: fetch_carbon_intensity(
+            start_time="2025-04-15T00:00:00Z",
+            end_time="2025-04-21T00:00:00Z",
+            region=region,
+        )
+        for region in regions
+    })
+
+    start = time.perf_counter()
+    result = schedule_job(
+        start_time=datetime(2025, 4, 15, 0, 0, 0, tzinfo=timezone.utc),
+        duration=timedelta(hours=1),
+        flex_window=timedelta(hours=12),
+        carbon_intensity_dataset=matrix,
+    )
+    print(f"Scheduled across {len(regions)} regions in {(time.perf_counter() - start) * 1000:.2f} ms")
+    print(result)
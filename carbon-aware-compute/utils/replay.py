@@ -0,0 +1,241 @@
+"""Counterfactual replay of a Snowflake job log against a carbon intensity series
+
+The log is read in chunks and every chunk is processed as columnar arrays: the intensity each
+job actually ran at, the intensity a scheduling policy would have achieved and the savings. Per
+job results are appended to one raw binary file per column (with a JSON header, like
+FixedStrideSeries), so a million-job log never materializes a Python object per row.
+"""
+
+
+import json
+import os
+from datetime import timedelta
+from typing import Callable, Union
+import numpy as np
+import pandas as pd
+
+from .best_start_table import BestStartTable
+from .intensity_index import CarbonIntensityIndex, to_epoch_ns
+
+
+# A policy maps (index, start ns, duration ns) arrays to the chosen start ns (-1 if none) and its intensity
+Policy = Callable[[CarbonIntensityIndex, np.ndarray, np.ndarray], tuple[np.ndarray, np.ndarray]]
+
+REPLAY_COLUMNS = {
+    "start_time": np.int64,
+    "duration": np.int64,
+    "actual": np.float64,
+    "policy_start": np.int64,
+    "policy": np.float64,
+    "savings": np.float64,
+}
+
+DEFAULT_CHUNK_SIZE = 65_536
+
+
+def flex_window_policy(flex_window: timedelta) -> Policy:
+    """
+    Policy starting every job at its lowest-intensity slot within a flex window, as schedule_jobs does.
+
+    Candidates are measured like the actual run (see actual_intensities), so a zero flex window
+    picks the job's own start and saves nothing.
+
+    Args:
+        flex_window (timedelta): How far each job may be delayed
+
+    Returns:
+        Policy: The policy
+    """
+    def policy(index: CarbonIntensityIndex, start_ns: np.ndarray, duration_ns: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        candidate_starts, candidate_means = index.candidate_matrix(start_ns, duration_ns, flex_window)
+        if not candidate_means.shape[1]:
+            return np.full(start_ns.size, -1, dtype=np.int64), np.full(start_ns.size, np.nan)
+        filled = np.where(np.isnan(candidate_means), np.inf, candidate_means)
+        best = np.argmin(filled, axis=1)[:, None]
+        best_means = np.take_along_axis(candidate_means, best, axis=1)[:, 0]
+        best_starts = np.take_along_axis(candidate_starts, best, axis=1)[:, 0]
+        return np.where(np.isnan(best_means), -1, best_starts), best_means
+
+    return policy
+
+
+def best_start_table_policy(table: BestStartTable) -> Policy:
+    """
+    Policy answering every job with a lookup in a precomputed BestStartTable (O(1) per job).
+
+    Jobs outside the table or longer than its largest duration bucket get no policy start. The
+    table ranks starts by the mean of the job's duration bucket; the chosen start is then measured
+    with the job's true duration, like the actual run.
+
+    Args:
+        table (BestStartTable): The table, built for the flex window to replay
+
+    Returns:
+        Policy: The policy
+    """
+    def policy(index: CarbonIntensityIndex, start_ns: np.ndarray, duration_ns: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        best_starts = np.full(start_ns.size, -1, dtype=np.int64)
+        best_means = np.full(start_ns.size, np.nan)
+        covered = (
+            (start_ns >= table.times[0])
+            & (duration_ns <= table.duration_buckets[-1])
+        ) if table.times.size else np.zeros(start_ns.size, dtype=bool)
+        if covered.any():
+            best_starts[covered], _ = table.lookup_many(start_ns[covered], duration_ns[covered])
+        found = best_starts >= 0
+        if found.any():
+            best_means[found] = index.job_window_means(best_starts[found], duration_ns[found])
+        return best_starts, best_means
+
+    return policy
+
+
+def actual_intensities(index: CarbonIntensityIndex, start_ns: np.ndarray, end_ns: np.ndarray) -> np.ndarray:
+    """
+    Compute the mean intensity of the slots each job actually overlapped.
+
+    Unlike window_means, the slot containing the start is included, so jobs shorter than one slot
+    still get the intensity they ran at. This is CarbonIntensityIndex.job_window_means, the window
+    the policies measure their candidates with too.
+
+    Returns:
+        np.ndarray: The mean carbon intensity (gCO2/kWh) per job, NaN where the job is not fully
+            covered by the series
+    """
+    return index.job_window_means(start_ns, end_ns - start_ns)
+
+
+def replay_chunk(
+    job_log: pd.DataFrame,
+    index: CarbonIntensityIndex,
+    policy: Policy,
+) -> dict[str, np.ndarray]:
+    """
+    Replay one chunk of a job log.
+
+    Args:
+        job_log (pd.DataFrame): Job log rows with StartTime and ExecutionTimeSeconds columns
+        index (CarbonIntensityIndex): The carbon intensity index
+        policy (Policy): The scheduling policy to compare against
+
+    Returns:
+        dict[str, np.ndarray]: One array per REPLAY_COLUMNS entry
+    """
+    start_ns = to_epoch_ns(pd.to_datetime(job_log['StartTime'], utc=True, format="ISO8601"))
+    # never ask the policy for zero-length windows
+    duration_ns = np.maximum(np.rint(job_log['ExecutionTimeSeconds'].to_numpy(dtype=np.float64) * 1e9).astype(np.int64), 1)
+
+    actual = actual_intensities(index, start_ns, start_ns + duration_ns)
+    policy_start, policy_means = policy(index, start_ns, duration_ns)
+    return {
+        "start_time": start_ns,
+        "duration": duration_ns,
+        "actual": actual,
+        "policy_start": policy_start,
+        "policy": policy_means,
+        "savings": actual - policy_means,
+    }
+
+
+def replay_job_log(
+    job_log_path: str,
+    carbon_intensity_dataset: Union[pd.DataFrame, CarbonIntensityIndex],
+    policy: Policy,
+    output_path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict:
+    """
+    Replay a Snowflake job log against a carbon intensity series and stream per-job results to disk.
+
+    Args:
+        job_log_path (str): Path to a job log CSV (e.g. data/SnowflakeUsageDataset.csv or
+            data/SnowflakeDataSetISOFormat.csv)
+        carbon_intensity_dataset (Union[pd.DataFrame, CarbonIntensityIndex]): DataFrame containing carbon
+            intensity data, or a prebuilt CarbonIntensityIndex
+        policy (Policy): The scheduling policy (e.g. flex_window_policy(timedelta(hours=4)))
+        output_path (str): The output directory (one <column>.bin file per column and a replay.json header)
+        chunk_size (int): The number of log rows processed at a time (the flex window policy holds a
+            chunk_size x flex-window-slots matrix in memory)
+
+    Returns:
+        dict: The number of jobs, the number of jobs with both intensities, and the mean actual,
+            policy and savings intensity (gCO2/kWh) over those jobs
+    """
+    if not isinstance(carbon_intensity_dataset, CarbonIntensityIndex):
+        carbon_intensity_dataset = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
+    os.makedirs(output_path, exist_ok=True)
+
+    jobs, compared = 0, 0
+    totals = {"actual": 0.0, "policy": 0.0, "savings": 0.0}
+    files = {column: open(os.path.join(output_path, f"{column}.bin"), "wb") for column in REPLAY_COLUMNS}
+    try:
+        chunks = pd.read_csv(job_log_path, usecols=['StartTime', 'ExecutionTimeSeconds'], chunksize=chunk_size)
+        for job_log in chunks:
+            result = replay_chunk(job_log, carbon_intensity_dataset, policy)
+            for column, dtype in REPLAY_COLUMNS.items():
+                np.asarray(result[column], dtype=dtype).tofile(files[column])
+
+            both = ~np.isnan(result["savings"])
+            jobs += len(job_log)
+            compared += int(both.sum())
+            for column in totals:
+                totals[column] += float(result[column][both].sum())
+    finally:
+        for f in files.values():
+            f.close()
+
+    with open(os.path.join(output_path, "replay.json"), "w") as f:
+        json.dump({
+            "length": jobs,
+            "columns": {column: np.dtype(dtype).str for column, dtype in REPLAY_COLUMNS.items()},
+        }, f, indent=2)
+
+    summary = {"jobs": jobs, "compared": compared}
+    summary.update({f"mean_{column}": total / compared if compared else np.nan for column, total in totals.items()})
+    return summary
+
+
+def read_replay(output_path: str) -> pd.DataFrame:
+    """
+    Open the per-job results of a replay.
+
+    The columns are memory-mapped, so only the rows that are used are read from disk.
+
+    Args:
+        output_path (str): The output directory passed to replay_job_log
+
+    Returns:
+        pd.DataFrame: One row per job with the REPLAY_COLUMNS (times as UTC datetimes, durations as timedeltas)
+    """
+    with open(os.path.join(output_path, "replay.json")) as f:
+        header = json.load(f)
+    length = header["length"]
+    columns = {
+        column: np.memmap(os.path.join(output_path, f"{column}.bin"), dtype=np.dtype(dtype), mode="r", shape=(length,))
+        if length else np.empty(0, dtype=np.dtype(dtype))
+        for column, dtype in header["columns"].items()
+    }
+    df = pd.DataFrame(columns, copy=False)
+    df["start_time"] = pd.to_datetime(df["start_time"], utc=True)
+    df["duration"] = pd.to_timedelta(df["duration"])
+    policy_start = df["policy_start"].to_numpy()
+    df["policy_start"] = pd.to_datetime(np.where(policy_start >= 0, policy_start, np.iinfo(np.int64).min), utc=True)
+    return df
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from .series_archive import load_carbon_intensity
+
+    # Replay a job log with 4 hours of flex
+    # (run with `python -m utils.replay <data file> data/SnowflakeUsageDataset.csv <output dir>`)
+    index = CarbonIntensityIndex.from_dataframe(load_carbon_intensity(sys.argv[1]))
+    start = time.perf_counter()
+    summary = replay_job_log(sys.argv[2], index, flex_window_policy(timedelta(hours=4)), sys.argv[3])
+    print(f"Replayed {summary['jobs']} jobs in {time.perf_counter() - start:.2f}s: {summary}")
+    print(read_replay(sys.argv[3]).head())
+
+    # Without flex the policy runs every job as it ran, so it must not save anything
+    zero_flex = replay_job_log(sys.argv[2], index, flex_window_policy(timedelta(0)), os.path.join(sys.argv[3], "zero_flex"))
+    print(f"Zero-flex savings: {zero_flex['mean_savings']}")
@@ -0,0 +1,174 @@
+"""Rate-limited, retrying and resumable multi-region backfill of historical carbon intensity data
+
+Chunks are fetched with the rate-limited, retrying fetch shared by every backfill (see backfill).
+Each completed chunk is written to a checkpoint directory before it is recorded in the manifest,
+so a crashed or partially failed backfill resumes with the missing chunks only.
+"""
+
+
+import json
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, Sequence
+import pandas as pd
+from watttime import WattTimeHistorical
+
+from .backfill import (
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_RATE,
+    BackfillError,
+    TokenBucket,
+    _chunk_bounds,
+    _fetch_with_retries,
+    plan_backfill_chunks,
+)
+from .chunk_merge import merge_chunks
+from .series_archive import read_intensity_archive, write_intensity_archive
+from .watttime_session import default_session
+
+
+class BackfillCheckpoint:
+    """
+    Directory recording the completed chunks of a backfill and their data.
+
+    Each chunk's data is written to its own archive before the chunk is added to manifest.json
+    (both through an atomic rename), so a crash never leaves a chunk marked done without its data.
+    """
+
+    def __init__(self, checkpoint_dir: str):
+        """
+        Args:
+            checkpoint_dir (str): Directory holding the manifest and chunk archives (created if missing)
+        """
+        self.checkpoint_dir = checkpoint_dir
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self._manifest_path = os.path.join(checkpoint_dir, "manifest.json")
+        self._lock = threading.Lock()
+        self._completed: dict[str, list[str]] = {}
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path) as f:
+                self._completed = json.load(f)
+
+    @staticmethod
+    def chunk_key(chunk_start: datetime, chunk_end: datetime) -> str:
+        return f"{chunk_start:%Y%m%d}_{chunk_end:%Y%m%d}"
+
+    def _chunk_path(self, region: str, key: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{region}_{key}.npz")
+
+    def is_completed(self, region: str, chunk_start: datetime, chunk_end: datetime) -> bool:
+        with self._lock:
+            return self.chunk_key(chunk_start, chunk_end) in self._completed.get(region, [])
+
+    def mark_completed(self, region: str, chunk_start: datetime, chunk_end: datetime, df: pd.DataFrame) -> None:
+        """
+        Persist a chunk's data, then record the chunk as completed.
+
+        Args:
+            region (str): The power region of the chunk
+            chunk_start (datetime): The first day of the chunk
+            chunk_end (datetime): The last day of the chunk
+            df (pd.DataFrame): The chunk data indexed by point_time (may be empty)
+        """
+        key = self.chunk_key(chunk_start, chunk_end)
+        path = self._chunk_path(region, key)
+        write_intensity_archive(path + ".tmp", df, region)
+        os.replace(path + ".tmp", path)
+        with self._lock:
+            self._completed.setdefault(region, []).append(key)
+            with open(self._manifest_path + ".tmp", "w") as f:
+                json.dump(self._completed, f, indent=2)
+            os.replace(self._manifest_path + ".tmp", self._manifest_path)
+
+    def load_chunk(self, region: str, chunk_start: datetime, chunk_end: datetime) -> pd.DataFrame:
+        """Reads the data of a completed chunk, indexed by point_time."""
+        return read_intensity_archive(self._chunk_path(region, self.chunk_key(chunk_start, chunk_end)))
+
+
+def resumable_backfill(
+    regions: Sequence[str],
+    start_date: datetime,
+    end_date: datetime,
+    checkpoint_dir: str,
+    max_workers: int = 4,
+    rate: float = DEFAULT_RATE,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    seed: Optional[int] = None,
+    client: Optional[WattTimeHistorical] = None,
+) -> dict[str, pd.DataFrame]:
+    """
+    Backfill several regions in month-long chunks, rate limited, retried and checkpointed.
+
+    Chunks already recorded in the checkpoint are read back instead of downloaded, so calling
+    this again after a crash or a failure only fetches what is missing.
+
+    Args:
+        regions (Sequence[str]): The power regions to backfill (e.g., ['CAISO_NORTH'])
+        start_date (datetime): The first day of the backfill
+        end_date (datetime): The last day of the backfill
+        checkpoint_dir (str): Directory holding the checkpoint (created if missing)
+        max_workers (int): The maximum number of chunks fetched at the same time
+        rate (float): The maximum number of requests per second, across all workers
+        max_attempts (int): The number of attempts per request before giving up on its chunk
+        base_delay (float): The backoff ceiling of the first retry, in seconds (doubled on every retry)
+        max_delay (float): The largest backoff, in seconds
+        seed (Optional[int]): Seed of the backoff jitter
+        client (Optional[WattTimeHistorical]): WattTime client (or compatible stub) shared by all
+            chunk fetches. Defaults to the shared pooled WattTimeSession
+
+    Returns:
+        dict[str, pd.DataFrame]: The data of each region indexed by point_time, in chronological
+            order with one row per point_time
+
+    Raises:
+        BackfillError: If some chunks still failed after all attempts; the completed ones stay checkpointed
+    """
+    client = client or default_session()
+    checkpoint = BackfillCheckpoint(checkpoint_dir)
+    bucket = TokenBucket(rate)
+    rng = random.Random(seed)
+    chunks = plan_backfill_chunks(start_date, end_date)
+    todo = [
+        (region, chunk_start, chunk_end)
+        for region in regions
+        for chunk_start, chunk_end in chunks
+        if not checkpoint.is_completed(region, chunk_start, chunk_end)
+    ]
+    print(f"{len(regions) * len(chunks) - len(todo)} chunks already checkpointed, fetching {len(todo)}")
+
+    def run(task: tuple[str, datetime, datetime]) -> Optional[tuple[datetime, datetime, str]]:
+        region, chunk_start, chunk_end = task
+        try:
+            chunk_bounds = _chunk_bounds(chunk_start, chunk_end)
+            df = _fetch_with_retries(*chunk_bounds, region, client, bucket, max_attempts, base_delay, max_delay, rng)
+        except Exception as e:
+            return chunk_start, chunk_end, f"{region}: {str(e)}"
+        checkpoint.mark_completed(region, chunk_start, chunk_end, df)
+        return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        failed = [failure for failure in executor.map(run, todo) if failure is not None]
+    if failed:
+        # the completed chunks are checkpointed, rerunning fetches the failed ones only
+        raise BackfillError(failed)
+
+    return {
+        region: merge_chunks([checkpoint.load_chunk(region, *chunk) for chunk in chunks])
+        for region in regions
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Backfill a year of several regions, resuming from the checkpoint if it exists
+    # (run with `python -m utils.resumable_backfill CAISO_NORTH PJM_DC`)
+    regions = sys.argv[1:] or ["CAISO_NORTH"]
+    data = resumable_backfill(regions, datetime(2024, 4, 23), datetime(2025, 4, 22), "backfill_checkpoint")
+    for region, df in data.items():
+        print(f"{region}: {len(df)} records from {df.index.min()} to {df.index.max()}")
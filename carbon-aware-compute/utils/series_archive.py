@@ -0,0 +1,143 @@
+"""Columnar archive format for carbon intensity series
+
+An archive is an uncompressed NumPy .npz file holding one array per column:
+    - point_time: int64 UTC epoch nanoseconds, sorted ascending
+    - value: float32 carbon intensity values
+    - version: (optional) the WattTime data version of each point
+    - meta: a JSON document with the region and signal type
+Loading an archive is a couple of memcpy's, with no text or datetime parsing.
+"""
+
+
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from .intensity_index import CarbonIntensityIndex, to_epoch_ns
+
+
+ARCHIVE_SUFFIX = ".npz"
+
+
+def write_intensity_archive(
+    path: str,
+    carbon_intensity_dataset: pd.DataFrame,
+    region: str,
+    signal_type: str = "co2_moer",
+) -> None:
+    """
+    Write a carbon intensity series to a columnar archive.
+
+    Args:
+        path (str): The archive path (should end in .npz)
+        carbon_intensity_dataset (pd.DataFrame): DataFrame with a 'value' column and either a
+            'point_time' column or a datetime index (as returned by fetch_carbon_intensity)
+        region (str): The power region of the series (e.g., 'CAISO_NORTH')
+        signal_type (str): The WattTime signal type of the series
+    """
+    if 'point_time' in carbon_intensity_dataset.columns:
+        point_times = carbon_intensity_dataset['point_time']
+    else:
+        point_times = carbon_intensity_dataset.index
+    times = to_epoch_ns(point_times)
+    order = np.argsort(times, kind="stable")
+
+    columns = {
+        "point_time": times[order],
+        "value": carbon_intensity_dataset['value'].to_numpy(dtype=np.float32)[order],
+        "meta": np.array(json.dumps({"region": region, "signal_type": signal_type})),
+    }
+    if 'version' in carbon_intensity_dataset.columns:
+        columns["version"] = carbon_intensity_dataset['version'].astype(str).to_numpy(dtype=str)[order]
+
+    # Write through a file handle so numpy does not append a second .npz suffix
+    with open(path, "wb") as f:
+        np.savez(f, **columns)
+
+
+def read_intensity_arrays(path: str) -> tuple[np.ndarray, np.ndarray, dict]:
+    """
+    Read the raw columns of a carbon intensity archive.
+
+    Args:
+        path (str): The archive path
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, dict]: The int64 epoch nanosecond point times, the float32
+            values and the metadata (region, signal_type)
+    """
+    with np.load(path, allow_pickle=False) as archive:
+        return archive["point_time"], archive["value"], json.loads(str(archive["meta"]))
+
+
+def read_intensity_archive(path: str) -> pd.DataFrame:
+    """
+    Read a carbon intensity archive into a DataFrame.
+
+    Args:
+        path (str): The archive path
+
+    Returns:
+        pd.DataFrame: The series indexed by a UTC point_time index, with a 'value' column (and
+            'version' if it was archived). The region and signal type are in df.attrs
+    """
+    with np.load(path, allow_pickle=False) as archive:
+        columns = {"value": archive["value"]}
+        if "version" in archive.files:
+            columns["version"] = archive["version"]
+        index = pd.DatetimeIndex(archive["point_time"].view("datetime64[ns]"), name='point_time').tz_localize("UTC")
+        df = pd.DataFrame(columns, index=index)
+        df.attrs.update(json.loads(str(archive["meta"])))
+    return df
+
+
+def load_carbon_intensity(path: str) -> pd.DataFrame:
+    """
+    Load a carbon intensity series from either a columnar archive or a legacy backfill CSV.
+
+    Args:
+        path (str): Path to a .npz archive or a carbon_intensity_*.csv file
+
+    Returns:
+        pd.DataFrame: The series indexed by point_time
+    """
+    if path.endswith(ARCHIVE_SUFFIX):
+        return read_intensity_archive(path)
+    # versions such as 3.10 must not be parsed as numbers
+    df = pd.read_csv(path, index_col='point_time', dtype={'version': str})
+    df.index = pd.to_datetime(df.index, utc=True)
+    return df
+
+
+def load_intensity_index(path: str) -> CarbonIntensityIndex:
+    """
+    Build a CarbonIntensityIndex straight from a columnar archive, without going through pandas.
+
+    Args:
+        path (str): The archive path
+
+    Returns:
+        CarbonIntensityIndex: The index over the archived series
+    """
+    times, values, _ = read_intensity_arrays(path)
+    return CarbonIntensityIndex(times, values)
+
+
+def archive_path_for(csv_path: str) -> str:
+    """Returns the archive path that sits next to a backfill CSV (same name, .npz suffix)."""
+    return os.path.splitext(csv_path)[0] + ARCHIVE_SUFFIX
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Convert a backfill CSV to an archive (run with `python -m utils.series_archive <csv> <region>`)
+    csv_path, region = sys.argv[1], sys.argv[2]
+    archive_path = archive_path_for(csv_path)
+    write_intensity_archive(archive_path, load_carbon_intensity(csv_path), region)
+
+    start = time.perf_counter()
+    df = read_intensity_archive(archive_path)
+    print(f"Wrote {archive_path}: {len(df)} records, loaded in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,174 @@
+"""Memory-mapped fixed-stride store for carbon intensity series
+
+MOER data arrives at a fixed 5-minute cadence, so a series is stored as a flat float32 file with
+one slot per step (NaN for missing slots) and a small JSON header holding the origin time, the
+step and the region. The position of a timestamp is computed arithmetically, and slices by time
+are views into the memory map, so multi-year, multi-region data never has to be loaded into RAM.
+"""
+
+
+import json
+import os
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+
+from .intensity_index import CarbonIntensityIndex, to_epoch_ns
+
+
+DEFAULT_STEP = timedelta(minutes=5)
+
+
+class FixedStrideSeries:
+    """A carbon intensity series stored as a memory-mapped float32 array on a fixed time grid."""
+
+    def __init__(self, path: str, mode: str = "r"):
+        """
+        Open an existing store.
+
+        Args:
+            path (str): The store path without suffix (the data lives in <path>.f32, the header in <path>.json)
+            mode (str): The memory map mode, 'r' for read-only or 'r+' to update values in place
+        """
+        with open(path + ".json") as f:
+            header = json.load(f)
+        self.path = path
+        self.origin = int(header["origin"])
+        self.step = int(header["step"])
+        self.region = header["region"]
+        self.signal_type = header["signal_type"]
+        length = int(header["length"])
+        self.values = np.memmap(path + ".f32", dtype=np.float32, mode=mode, shape=(length,)) if length else np.empty(0, dtype=np.float32)
+
+    @classmethod
+    def create(
+        cls,
+        path: str,
+        carbon_intensity_dataset: pd.DataFrame,
+        region: str,
+        step: timedelta = DEFAULT_STEP,
+        signal_type: str = "co2_moer",
+    ) -> "FixedStrideSeries":
+        """
+        Write a carbon intensity series to a new store and open it.
+
+        Args:
+            path (str): The store path without suffix
+            carbon_intensity_dataset (pd.DataFrame): DataFrame with a 'value' column and either a
+                'point_time' column or a datetime index
+            region (str): The power region of the series (e.g., 'CAISO_NORTH')
+            step (timedelta): The cadence of the series
+            signal_type (str): The WattTime signal type of the series
+
+        Returns:
+            FixedStrideSeries: The opened (read-only) store
+        """
+        index = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
+        if not len(index):
+            raise ValueError("Cannot create a series store from an empty dataset")
+        step_ns = pd.Timedelta(step).value
+        origin = int(index.times[0] - index.times[0] % step_ns)
+        positions = (index.times - origin) // step_ns
+
+        values = np.memmap(path + ".f32", dtype=np.float32, mode="w+", shape=(int(positions[-1]) + 1,))
+        values[:] = np.nan
+        values[positions] = index.values
+        values.flush()
+        del values
+
+        with open(path + ".json", "w") as f:
+            json.dump({
+                "origin": origin,
+                "step": step_ns,
+                "region": region,
+                "signal_type": signal_type,
+                "length": int(positions[-1]) + 1,
+            }, f, indent=2)
+        return cls(path)
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def position(self, timestamp) -> int:
+        """Returns the slot position that contains a timestamp (may be outside the stored range)."""
+        return (to_epoch_ns(timestamp) - self.origin) // self.step
+
+    def time_at(self, position: int) -> pd.Timestamp:
+        """Returns the start time of a slot."""
+        return pd.Timestamp(self.origin + position * self.step, tz="UTC")
+
+    def slot_range(self, start_time, end_time, inclusive_end: bool = True) -> tuple[int, int]:
+        """
+        Compute the positions [lo, hi) of the slots whose time falls inside a window.
+
+        Args:
+            start_time: The start of the window (inclusive)
+            end_time: The end of the window
+            inclusive_end (bool): Whether a slot starting exactly at end_time is part of the window
+
+        Returns:
+            tuple[int, int]: The half-open slot range, clipped to the stored range
+        """
+        lo = -((self.origin - to_epoch_ns(start_time)) // self.step)
+        end_offset = to_epoch_ns(end_time) - self.origin
+        hi = end_offset // self.step + 1 if inclusive_end else -(-end_offset // self.step)
+        lo, hi = min(max(lo, 0), len(self)), min(max(hi, 0), len(self))
+        return lo, max(lo, hi)
+
+    def slice(self, start_time, end_time, inclusive_end: bool = True) -> np.ndarray:
+        """
+        Get the values of a time window as a view into the memory map (no copy).
+
+        Args:
+            start_time: The start of the window (inclusive)
+            end_time: The end of the window
+            inclusive_end (bool): Whether a slot starting exactly at end_time is part of the window
+
+        Returns:
+            np.ndarray: The float32 values of the window, NaN for missing slots
+        """
+        lo, hi = self.slot_range(start_time, end_time, inclusive_end)
+        return self.values[lo:hi]
+
+    def window_mean(self, start_time, end_time, inclusive_end: bool = True) -> float:
+        """
+        Compute the mean carbon intensity over a time window, ignoring missing slots.
+
+        Raises:
+            ValueError: If no data points are found within the specified time window
+        """
+        window = self.slice(start_time, end_time, inclusive_end)
+        valid = ~np.isnan(window)
+        if not valid.any():
+            raise ValueError("No data points found within the specified time window")
+        return float(window[valid].mean(dtype=np.float64))
+
+    def index_between(self, start_time, end_time) -> CarbonIntensityIndex:
+        """
+        Build a CarbonIntensityIndex over a time window of the store.
+
+        Only the window is read from disk, so this is cheap for the short windows used in scheduling.
+        """
+        lo, hi = self.slot_range(start_time, end_time)
+        times = self.origin + np.arange(lo, hi, dtype=np.int64) * self.step
+        return CarbonIntensityIndex(times, self.values[lo:hi], self.step)
+
+
+def region_series_path(directory: str, region: str, signal_type: str = "co2_moer") -> str:
+    """Returns the store path of one region in a directory holding one store per region."""
+    return os.path.join(directory, f"{signal_type}_{region}")
+
+
+def open_region_series(directory: str, region: str, signal_type: str = "co2_moer") -> FixedStrideSeries:
+    """
+    Open the store of one region in a directory holding one store per region.
+
+    Args:
+        directory (str): The directory holding the stores
+        region (str): The power region (e.g., 'CAISO_NORTH')
+        signal_type (str): The WattTime signal type
+
+    Returns:
+        FixedStrideSeries: The opened (read-only) store
+    """
+    return FixedStrideSeries(region_series_path(directory, region, signal_type))
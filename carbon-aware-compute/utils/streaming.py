@@ -0,0 +1,220 @@
+"""Async streaming fetch of carbon intensity data, chunk by chunk as it arrives
+
+stream_carbon_intensity splits a period into chunks, downloads a bounded number of them
+concurrently (each blocking WattTime call runs in a worker thread) and yields every chunk as soon
+as it is available. Requests go through the rate-limited, retrying fetch shared by every backfill.
+Consumers process one chunk at a time, so peak memory is bounded by the chunk size times the
+concurrency rather than by the length of the period.
+"""
+
+
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import AsyncIterable, AsyncIterator, Optional, Union
+import numpy as np
+import pandas as pd
+from watttime import WattTimeHistorical
+
+from .backfill import DEFAULT_MAX_ATTEMPTS, DEFAULT_RATE, TokenBucket, _fetch_with_retries
+from .backfill_writer import BackfillWriter
+from .intensity_index import CarbonIntensityIndex, to_epoch_ns
+from .online_scheduler import OnlineScheduler
+from .watttime_session import default_session
+
+
+# The WattTime historical endpoint serves at most a month per request
+DEFAULT_CHUNK_SIZE = timedelta(days=30)
+
+
+def plan_stream_chunks(
+    start_time: Union[str, datetime],
+    end_time: Union[str, datetime],
+    chunk_size: timedelta = DEFAULT_CHUNK_SIZE,
+) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    Split a period into consecutive chunks.
+
+    Args:
+        start_time (Union[str, datetime]): The start of the period
+        end_time (Union[str, datetime]): The end of the period
+        chunk_size (timedelta): The length of every chunk but the last
+
+    Returns:
+        list[tuple[pd.Timestamp, pd.Timestamp]]: The (chunk start, chunk end) times in chronological
+            order; a chunk holds the points in [start, end), the last one also the point at end_time
+    """
+    start, end = pd.to_datetime(start_time, utc=True), pd.to_datetime(end_time, utc=True)
+    if chunk_size <= timedelta(0):
+        raise ValueError("chunk_size must be positive")
+    chunks = []
+    while start < end:
+        chunks.append((start, min(start + chunk_size, end)))
+        start = chunks[-1][1]
+    return chunks
+
+
+def _fetch_stream_chunk(
+    client: WattTimeHistorical,
+    chunk_start: pd.Timestamp,
+    chunk_end: pd.Timestamp,
+    region: str,
+    last: bool,
+    bucket: TokenBucket,
+    max_attempts: int,
+) -> pd.DataFrame:
+    """Fetches one chunk, sorted by point_time with each point kept once and clipped to the chunk."""
+    df = _fetch_with_retries(chunk_start, chunk_end, region, client, bucket, max_attempts)
+    # neighbouring chunks share their boundary point, it belongs to the later chunk
+    return df.loc[chunk_start:chunk_end] if last else df[(df.index >= chunk_start) & (df.index < chunk_end)]
+
+
+async def stream_carbon_intensity(
+    start_time: Union[str, datetime],
+    end_time: Union[str, datetime],
+    region: str,
+    chunk_size: timedelta = DEFAULT_CHUNK_SIZE,
+    max_concurrency: int = 4,
+    ordered: bool = True,
+    client: Optional[WattTimeHistorical] = None,
+    rate: float = DEFAULT_RATE,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> AsyncIterator[pd.DataFrame]:
+    """
+    Fetch carbon intensity data (co2_moer) for a region, yielding each chunk as soon as it arrives.
+
+    At most max_concurrency chunks are in flight or waiting to be consumed at any time. Chunks
+    without data are skipped.
+
+    Args:
+        start_time (Union[str, datetime]): The start time of the period to fetch data for
+        end_time (Union[str, datetime]): The end time of the period to fetch data for
+        region (str): The power region to fetch data for (e.g., 'CAISO_NORTH')
+        chunk_size (timedelta): The period covered by one request
+        max_concurrency (int): The maximum number of chunks fetched at the same time
+        ordered (bool): Yield chunks in chronological order (required by the index and scheduler
+            consumers). If False, chunks are yielded in completion order
+        client (Optional[WattTimeHistorical]): WattTime client (or compatible stub) shared by all
+            chunk fetches. Defaults to the shared pooled WattTimeSession
+        rate (float): The maximum number of requests per second, across all chunks in flight
+        max_attempts (int): The number of attempts per request before the stream fails with its error
+
+    Yields:
+        pd.DataFrame: The data of one chunk indexed by point_time, sorted, without duplicated points
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    client = client or default_session()
+    bucket = TokenBucket(rate)
+    chunks = plan_stream_chunks(start_time, end_time, chunk_size)
+    pending = deque()
+    next_chunk = 0
+
+    def submit() -> None:
+        nonlocal next_chunk
+        chunk_start, chunk_end = chunks[next_chunk]
+        last = next_chunk == len(chunks) - 1
+        pending.append(asyncio.create_task(asyncio.to_thread(_fetch_stream_chunk, client, chunk_start, chunk_end, region, last, bucket, max_attempts)))
+        next_chunk += 1
+
+    try:
+        while next_chunk < len(chunks) or pending:
+            while next_chunk < len(chunks) and len(pending) < max_concurrency:
+                submit()
+            if ordered:
+                done = pending.popleft()
+            else:
+                finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                done = finished.pop()
+                pending.remove(done)
+            df = await done
+            if not df.empty:
+                yield df
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def write_stream_to_csv(chunks: AsyncIterable[pd.DataFrame], path: str) -> int:
+    """
+    Write streamed chunks to a backfill CSV store with a BackfillWriter, one chunk at a time.
+
+    The store is truncated before the first chunk arrives, so a stream without data leaves an
+    empty store rather than an earlier file.
+
+    Args:
+        chunks (AsyncIterable[pd.DataFrame]): Chunks in chronological order, as yielded by
+            stream_carbon_intensity with ordered=True
+        path (str): The CSV path (overwritten, with its written-ranges sidecar)
+
+    Returns:
+        int: The number of rows written
+    """
+    rows = 0
+    with BackfillWriter(path) as writer:
+        async for df in chunks:
+            # stream chunks never overlap, so every row is final as soon as it arrives
+            rows += await asyncio.to_thread(writer.append, df)
+    return rows
+
+
+async def build_index_from_stream(chunks: AsyncIterable[pd.DataFrame]) -> CarbonIntensityIndex:
+    """
+    Build a CarbonIntensityIndex from streamed chunks.
+
+    Only the point times and values of each chunk are kept (16 bytes per point), the chunk
+    DataFrames are released as soon as they are consumed.
+
+    Args:
+        chunks (AsyncIterable[pd.DataFrame]): Chunks in chronological order, as yielded by
+            stream_carbon_intensity with ordered=True
+
+    Returns:
+        CarbonIntensityIndex: The index over all chunks
+    """
+    times, values = [], []
+    async for df in chunks:
+        times.append(to_epoch_ns(df.index))
+        values.append(df['value'].to_numpy(dtype=np.float64))
+    if not times:
+        return CarbonIntensityIndex(np.empty(0, dtype=np.int64), np.empty(0))
+    return CarbonIntensityIndex(np.concatenate(times), np.concatenate(values))
+
+
+async def feed_scheduler_from_stream(
+    chunks: AsyncIterable[pd.DataFrame],
+    scheduler: Optional[OnlineScheduler] = None,
+) -> OnlineScheduler:
+    """
+    Append streamed chunks to an OnlineScheduler as they arrive.
+
+    Jobs can be scheduled against the points received so far between chunks.
+
+    Args:
+        chunks (AsyncIterable[pd.DataFrame]): Chunks in chronological order, as yielded by
+            stream_carbon_intensity with ordered=True
+        scheduler (Optional[OnlineScheduler]): The scheduler to extend. Defaults to a new one
+
+    Returns:
+        OnlineScheduler: The extended scheduler
+    """
+    scheduler = scheduler or OnlineScheduler()
+    async for df in chunks:
+        scheduler.extend(df.index, df['value'].to_numpy(dtype=np.float64))
+    return scheduler
+
+
+if __name__ == "__main__":
+    # Stream a month of data into a CSV and, from a second stream, into a scheduler
+    # (run with `python -m utils.streaming`)
+    async def main() -> None:
+        client = default_session()
+        stream = stream_carbon_intensity("2025-03-22T00:00:00Z", "2025-04-22T00:00:00Z", "CAISO_NORTH", chunk_size=timedelta(days=7), client=client)
+        rows = await write_stream_to_csv(stream, "carbon_intensity_CAISO_NORTH_stream.csv")
+        print(f"Wrote {rows} rows to carbon_intensity_CAISO_NORTH_stream.csv")
+
+        stream = stream_carbon_intensity("2025-03-22T00:00:00Z", "2025-04-22T00:00:00Z", "CAISO_NORTH", chunk_size=timedelta(days=7), client=client)
+        scheduler = await feed_scheduler_from_stream(stream)
+        print(scheduler.schedule(datetime(2025, 4, 20), timedelta(hours=1), timedelta(hours=12)))
+
+    asyncio.run(main())
@@ -0,0 +1,178 @@
+"""Parameter sweep over flex windows, scheduling policies and job classes on a process pool
+
+The carbon intensity series is placed in shared memory once; every worker process attaches to
+it and builds its index a single time, so tasks only carry the jobs they evaluate.
+"""
+
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+
+from .intensity_index import CarbonIntensityIndex, to_duration_ns, to_epoch_ns
+from .job_intensity import job_log_windows
+from .job_scheduler import schedule_jobs
+
+
+DEFAULT_FLEX_WINDOWS = tuple(timedelta(hours=hours) for hours in range(25))
+
+# The schedule_jobs cases a policy can pick; savings are measured against the naive case
+POLICIES = ("optimal", "median", "worst")
+
+DEFAULT_TASK_SIZE = 4096
+
+# Per-process state set up by _attach_series
+_worker_index: Optional[CarbonIntensityIndex] = None
+_worker_blocks: list[SharedMemory] = []
+
+
+def _share_array(array: np.ndarray) -> tuple[SharedMemory, tuple[str, tuple[int, ...], str]]:
+    """Copies an array into a new shared memory block, returning the block and how to attach to it."""
+    block = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _attach_series(times_spec: tuple, values_spec: tuple) -> None:
+    """Pool initializer: attaches to the shared series and builds this worker's index."""
+    global _worker_index
+    arrays = []
+    for name, shape, dtype in (times_spec, values_spec):
+        # the parent owns the blocks, workers must not unlink them on exit
+        block = SharedMemory(name=name, track=False)
+        _worker_blocks.append(block)
+        arrays.append(np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf))
+    _worker_index = CarbonIntensityIndex(*arrays)
+
+
+def _run_task(flex_ns: int, job_class: str, start_ns: np.ndarray, duration_ns: np.ndarray) -> dict:
+    """Schedules one batch of jobs and returns the per-case sums over jobs with complete data."""
+    scheduled = schedule_jobs(start_ns, duration_ns, pd.Timedelta(flex_ns), _worker_index)
+    cases = scheduled[["naive", *POLICIES]].to_numpy()
+    complete = ~np.isnan(cases).any(axis=1)
+    return {
+        "job_class": job_class,
+        "flex_ns": flex_ns,
+        "jobs": int(complete.sum()),
+        **{case: float(cases[complete, i].sum()) for i, case in enumerate(["naive", *POLICIES])},
+    }
+
+
+def job_classes(job_log: pd.DataFrame, by: str = 'WarehouseSize') -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """
+    Split a Snowflake usage log into job classes.
+
+    Args:
+        job_log (pd.DataFrame): Job log with StartTime and ExecutionTimeSeconds columns
+        by (str): The column defining the classes (e.g. 'WarehouseSize' or 'JobName')
+
+    Returns:
+        dict[str, tuple[np.ndarray, np.ndarray]]: The start times (int64 epoch nanoseconds) and
+            durations (int64 nanoseconds) of the jobs of each class
+    """
+    start_times, end_times = job_log_windows(job_log)
+    start_ns, end_ns = to_epoch_ns(start_times), to_epoch_ns(end_times)
+    duration_ns = np.maximum(end_ns - start_ns, 1)
+    labels = job_log[by].astype(str).to_numpy()
+    return {label: (start_ns[labels == label], duration_ns[labels == label]) for label in np.unique(labels)}
+
+
+def sweep_flex_windows(
+    jobs_by_class: dict[str, tuple[np.ndarray, np.ndarray]],
+    carbon_intensity_dataset: Union[pd.DataFrame, CarbonIntensityIndex],
+    flex_windows: Sequence[timedelta] = DEFAULT_FLEX_WINDOWS,
+    max_workers: Optional[int] = None,
+    task_size: int = DEFAULT_TASK_SIZE,
+) -> pd.DataFrame:
+    """
+    Schedule every job class under every flex window and policy on a process pool.
+
+    The grid is fanned out as (flex window, job class, batch of task_size jobs) tasks, each running
+    schedule_jobs (the vectorized schedule_job) in a worker against the shared series.
+
+    Args:
+        jobs_by_class (dict[str, tuple[np.ndarray, np.ndarray]]): The start times and durations of
+            each job class, as returned by job_classes
+        carbon_intensity_dataset (Union[pd.DataFrame, CarbonIntensityIndex]): DataFrame containing carbon
+            intensity data, or a prebuilt CarbonIntensityIndex
+        flex_windows (Sequence[timedelta]): The flex windows to evaluate (0-24 hours by default)
+        max_workers (Optional[int]): The number of worker processes (defaults to the CPU count)
+        task_size (int): The number of jobs scheduled per task
+
+    Returns:
+        pd.DataFrame: One row per (job_class, flex_window, policy) with the number of jobs with
+            complete data, the mean naive and policy carbon intensity (gCO2/kWh), and the savings
+            in gCO2/kWh and in percent of the naive intensity
+    """
+    if not isinstance(carbon_intensity_dataset, CarbonIntensityIndex):
+        carbon_intensity_dataset = CarbonIntensityIndex.from_dataframe(carbon_intensity_dataset)
+
+    times_block, times_spec = _share_array(carbon_intensity_dataset.times)
+    values_block, values_spec = _share_array(carbon_intensity_dataset.values)
+    try:
+        # forking a process that runs threads (e.g. a pooled WattTime session) can deadlock the workers
+        context = multiprocessing.get_context("forkserver")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_attach_series, initargs=(times_spec, values_spec)) as executor:
+            futures = [
+                executor.submit(_run_task, to_duration_ns(flex_window), job_class, start_ns[lo:lo + task_size], duration_ns[lo:lo + task_size])
+                for flex_window in flex_windows
+                for job_class, (start_ns, duration_ns) in jobs_by_class.items()
+                for lo in range(0, len(start_ns), task_size)
+            ]
+            totals = pd.DataFrame([future.result() for future in futures])
+    finally:
+        for block in (times_block, values_block):
+            block.close()
+            block.unlink()
+
+    totals = totals.groupby(["job_class", "flex_ns"], sort=True).sum().reset_index()
+    rows = []
+    for policy in POLICIES:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            naive = totals["naive"] / totals["jobs"]
+            chosen = totals[policy] / totals["jobs"]
+        rows.append(pd.DataFrame({
+            "job_class": totals["job_class"],
+            "flex_window": pd.to_timedelta(totals["flex_ns"]),
+            "policy": policy,
+            "jobs": totals["jobs"],
+            "naive": naive,
+            "intensity": chosen,
+            "savings": naive - chosen,
+            "savings_pct": (naive - chosen) / naive * 100,
+        }))
+    return pd.concat(rows, ignore_index=True).sort_values(["job_class", "policy", "flex_window"], ignore_index=True)
+
+
+def savings_curve(sweep: pd.DataFrame, metric: str = "savings_pct") -> pd.DataFrame:
+    """
+    Pivot a sweep into one savings-vs-flex curve table.
+
+    Args:
+        sweep (pd.DataFrame): The result of sweep_flex_windows
+        metric (str): The column to tabulate ('savings', 'savings_pct' or 'intensity')
+
+    Returns:
+        pd.DataFrame: One row per flex window, one column per (policy, job_class)
+    """
+    return sweep.pivot_table(index="flex_window", columns=["policy", "job_class"], values=metric)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from .series_archive import load_carbon_intensity
+
+    # Sweep 0-24 hours of flex over the warehouse sizes of a job log
+    # (run with `python -m utils.sweep <data file> data/SnowflakeUsageDataset.csv`)
+    index = CarbonIntensityIndex.from_dataframe(load_carbon_intensity(sys.argv[1]))
+    classes = job_classes(pd.read_csv(sys.argv[2]))
+
+    start = time.perf_counter()
+    sweep = sweep_flex_windows(classes, index)
+    print(f"Swept {len(DEFAULT_FLEX_WINDOWS)} flex windows x {len(classes)} job classes in {time.perf_counter() - start:.2f}s")
+    print(savings_curve(sweep).round(1).to_string())
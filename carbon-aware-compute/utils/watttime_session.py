@@ -0,0 +1,188 @@
+"""Long-lived, connection-pooled WattTime API client shared across calls and threads"""
+
+
+import os
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Optional, Union
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from watttime import WattTimeHistorical
+
+
+DEFAULT_BASE_URL = "https://api.watttime.org"
+
+# The SDK treats tokens as valid for 30 minutes, refresh a little early so in-flight requests never expire
+TOKEN_REFRESH_MARGIN = timedelta(minutes=1)
+
+# The historical endpoint serves at most a month per request
+HISTORICAL_CHUNK = timedelta(days=30)
+
+
+class WattTimeSession(WattTimeHistorical):
+    """
+    WattTimeHistorical that logs in once and reuses its connections across calls and threads.
+
+    Requests, rate limiting, API warnings and include_imputed_marker are the SDK's. The session
+    swaps the SDK's retrying adapter for a pooled keep-alive one without retries, caches the
+    auth token until shortly before it expires (one login at a time, under a lock), logs in
+    again once if the API rejects the token, and records the latency of every data request.
+    Failed requests are not retried here, the backfills retry them themselves.
+    """
+
+    def __init__(
+        self,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        base_url: Optional[str] = None,
+        pool_maxsize: int = 16,
+        rate_limit: int = 10,
+        latency_window: int = 10_000,
+    ):
+        """
+        Args:
+            username (Optional[str]): The WattTime username (defaults to the WATTTIME_USER environment variable)
+            password (Optional[str]): The WattTime password (defaults to the WATTTIME_PASSWORD environment variable)
+            base_url (Optional[str]): The API root (defaults to WATTTIME_API_URL, or the public API)
+            pool_maxsize (int): The number of keep-alive connections kept open, at least the number
+                of threads sharing the session
+            rate_limit (int): The SDK's limit of requests per second across all threads
+            latency_window (int): The number of most recent request latencies kept for latency_stats
+        """
+        super().__init__(username, password, multithreaded=True, rate_limit=rate_limit)
+        self.url_base = (base_url or os.getenv("WATTTIME_API_URL") or DEFAULT_BASE_URL).rstrip("/")
+
+        # no adapter-level retries: they would be invisible to the callers' rate limiting and
+        # to latency_stats, the backfills retry failed requests themselves
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.hooks["response"].append(self._record_latency)
+
+        self._login_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=latency_window)
+        self.requests = 0
+        self.logins = 0
+
+    def __enter__(self) -> "WattTimeSession":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the pooled connections."""
+        self.session.close()
+
+    def _record_latency(self, rsp: requests.Response, *args, **kwargs) -> None:
+        """Response hook recording the latency of every data request (logins are counted apart)."""
+        if rsp.request.path_url.startswith("/login"):
+            return
+        with self._stats_lock:
+            self._latencies.append(rsp.elapsed.total_seconds())
+            self.requests += 1
+
+    def _is_token_valid(self) -> bool:
+        return self.token_valid_until is not None and datetime.now() < self.token_valid_until - TOKEN_REFRESH_MARGIN
+
+    def _login(self) -> None:
+        """Logs in unless another thread already refreshed the token while this one waited."""
+        with self._login_lock:
+            if self._is_token_valid() and self.headers:
+                return
+            super()._login()
+            self.logins += 1
+
+    def _make_rate_limited_request(self, url: str, params: dict[str, Any]) -> dict:
+        headers = self.headers
+        try:
+            return super()._make_rate_limited_request(url, params)
+        except RuntimeError as e:
+            # the token can be revoked before it expires, log in again once
+            cause = e.__cause__
+            if not isinstance(cause, requests.HTTPError) or cause.response is None or cause.response.status_code != 401:
+                raise
+            with self._login_lock:
+                if self.headers is headers:
+                    self.token_valid_until = None
+            return super()._make_rate_limited_request(url, params)
+
+    def get_historical_pandas(
+        self,
+        start: Union[str, datetime],
+        end: Union[str, datetime],
+        region: str,
+        signal_type: str = "co2_moer",
+        model: Optional[str] = None,
+        include_meta: bool = False,
+        include_imputed_marker: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Download historical data as a DataFrame, see WattTimeHistorical.get_historical_pandas.
+
+        The multithreaded SDK collects the month-long responses as they complete, so the points
+        are sorted back into chronological order, and a period without data gives an empty frame.
+
+        Returns:
+            pd.DataFrame: The data points with a UTC point_time column, a value column and the
+                other fields of the API records
+        """
+        responses = self.get_historical_jsons(start, end, region, signal_type, model, include_imputed_marker)
+        df = pd.json_normalize(responses, record_path="data", meta=["meta"] if include_meta else [])
+        if df.empty:
+            return df
+        df["point_time"] = pd.to_datetime(df["point_time"], utc=True)
+        return df.sort_values("point_time", kind="stable", ignore_index=True)
+
+    def latency_stats(self) -> dict:
+        """
+        Summarize the latency of the recent data requests.
+
+        Returns:
+            dict: The number of requests and logins so far, and the mean, median, 95th percentile and
+                maximum latency (seconds) over the recent requests
+        """
+        with self._stats_lock:
+            latencies = np.array(self._latencies)
+            stats = {"requests": self.requests, "logins": self.logins}
+        if not latencies.size:
+            return {**stats, "mean": np.nan, "p50": np.nan, "p95": np.nan, "max": np.nan}
+        return {
+            **stats,
+            "mean": float(latencies.mean()),
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "max": float(latencies.max()),
+        }
+
+
+_default_session: Optional[WattTimeSession] = None
+_default_session_lock = threading.Lock()
+
+
+def default_session() -> WattTimeSession:
+    """Returns the process-wide shared session, created on first use (it logs in lazily)."""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = WattTimeSession()
+        return _default_session
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Fetch a few weeks of several regions over one session (run with `python -m utils.watttime_session`)
+    with WattTimeSession() as session:
+        requests_to_make = [
+            (f"2025-04-{day:02d}T00:00:00Z", f"2025-04-{day + 6:02d}T23:55:00Z", "CAISO_NORTH")
+            for day in (1, 8, 15)
+        ]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            frames = list(executor.map(lambda args: session.get_historical_pandas(*args), requests_to_make))
+        print(f"Fetched {sum(len(df) for df in frames)} points")
+        print(session.latency_stats())
@@ -0,0 +1,316 @@
+"""Local stand-in for the WattTime API, for offline and deterministic load tests
+
+The stand-in serves /login and /v3/historical over HTTP in one of three modes:
+    - archive: answers from archived series (backfill CSVs or .npz archives), one per region
+    - record: forwards every request to the real API and saves the responses to a directory
+    - replay: answers only from previously recorded responses
+Latency, a request rate limit (429 responses) and injected server errors can be configured.
+Latency jitter and injected errors are drawn from a seed, the request and its attempt number,
+so a run is reproducible however the concurrent requests interleave.
+"""
+
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlparse
+import numpy as np
+import pandas as pd
+import requests
+
+from .intensity_index import to_epoch_ns
+from .series_archive import load_carbon_intensity
+
+
+MODES = ("archive", "record", "replay")
+
+# Model version reported for archived data (the SDK reads meta.model.date)
+ARCHIVE_MODEL_DATE = "2023-03-01"
+
+
+def _archived_points(path: str) -> pd.DataFrame:
+    """Loads an archive as the API would serve it: one row per point time (the last), no missing values."""
+    df = load_carbon_intensity(path).sort_index(kind="stable")
+    df = df[~df.index.duplicated(keep="last") & df["value"].notna()]
+    df.index = df.index.as_unit("ns")
+    return df
+
+
+class WattTimeStandIn:
+    """A local HTTP server answering like the WattTime historical API."""
+
+    def __init__(
+        self,
+        archives: Optional[dict[str, str]] = None,
+        mode: str = "archive",
+        recordings_dir: Optional[str] = None,
+        upstream_url: str = "https://api.watttime.org",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limit: Optional[int] = None,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """
+        Args:
+            archives (Optional[dict[str, str]]): Archive mode: the data file of each region (e.g.
+                {'CAISO_NORTH': 'data/carbon_intensity_CAISO_NORTH_20240423_to_20250422.csv'})
+            mode (str): 'archive', 'record' or 'replay'
+            recordings_dir (Optional[str]): Record and replay modes: where responses are stored
+            upstream_url (str): Record mode: the API the requests are forwarded to
+            latency (float): Seconds added to every response
+            jitter (float): Up to this many seconds added on top of latency
+            rate_limit (Optional[int]): Requests per second served before answering 429
+            error_rate (float): Fraction of data requests answered with error_status
+            error_status (int): The HTTP status of injected errors
+            seed (int): Seed of the jitter and error draws
+            host (str): The interface to listen on
+            port (int): The port to listen on (0 picks a free one)
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        if mode in ("record", "replay") and recordings_dir is None:
+            raise ValueError(f"{mode} mode needs a recordings_dir")
+        self.mode = mode
+        self.recordings_dir = recordings_dir
+        self.upstream_url = upstream_url.rstrip("/")
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.seed = seed
+        if recordings_dir is not None:
+            os.makedirs(recordings_dir, exist_ok=True)
+
+        self.archives = {region: _archived_points(path) for region, path in (archives or {}).items()}
+        self.stats = Counter()
+        self._attempts = Counter()
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._upstream = requests.Session() if mode == "record" else None
+
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                status, body, headers = standin.handle(self.path, dict(self.headers))
+                # relayed upstream responses are passed through as raw bytes
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+                headers = {"Content-Type": "application/json", **headers}
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """The base URL to pass to WattTimeSession (or to set as WATTTIME_API_URL)."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "WattTimeStandIn":
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and release the port."""
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "WattTimeStandIn":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _draw(self, key: str, attempt: int, purpose: str) -> float:
+        """A uniform draw that only depends on the seed, the request and its attempt number."""
+        return random.Random(f"{self.seed}:{purpose}:{key}:{attempt}").random()
+
+    def _over_rate_limit(self) -> bool:
+        if self.rate_limit is None:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                return True
+            self._recent.append(now)
+            return False
+
+    def handle(self, raw_path: str, headers: dict) -> tuple[int, Union[dict, bytes], dict]:
+        """
+        Answer one request.
+
+        Args:
+            raw_path (str): The request path with its query string
+            headers (dict): The request headers
+
+        Returns:
+            tuple[int, Union[dict, bytes], dict]: The status, the JSON body (or the raw bytes of a
+                relayed response) and extra response headers
+        """
+        url = urlparse(raw_path)
+        params = dict(parse_qsl(url.query))
+        key = f"{url.path}?{urlencode(sorted(params.items()))}"
+        with self._lock:
+            self.stats["requests"] += 1
+            attempt = self._attempts[key]
+            self._attempts[key] += 1
+
+        if self._over_rate_limit():
+            with self._lock:
+                self.stats["rate_limited"] += 1
+            return 429, {"error": "Too many requests"}, {"Retry-After": "1"}
+        time.sleep(self.latency + self.jitter * self._draw(key, attempt, "jitter"))
+
+        if url.path == "/login":
+            if self.mode == "record":
+                return self._forward(url.path, params, headers, record=False)
+            return 200, {"token": "stand-in-token"}, {}
+        if not url.path.startswith("/v3/"):
+            return 404, {"error": f"Unknown endpoint {url.path}"}, {}
+        if not headers.get("Authorization", "").startswith("Bearer "):
+            return 401, {"error": "Missing token"}, {}
+        if self.error_rate and self._draw(key, attempt, "error") < self.error_rate:
+            with self._lock:
+                self.stats["injected_errors"] += 1
+            return self.error_status, {"error": "Injected error"}, {}
+
+        if self.mode == "record":
+            return self._forward(url.path, params, headers, record=True)
+        if self.mode == "replay":
+            return self._replay(key)
+        if url.path != "/v3/historical":
+            return 404, {"error": f"Endpoint {url.path} is not served from archives"}, {}
+        return self._historical(params)
+
+    def _recording_path(self, key: str) -> str:
+        return os.path.join(self.recordings_dir, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def _forward(self, path: str, params: dict, headers: dict, record: bool) -> tuple[int, bytes, dict]:
+        """Relays a request upstream as is, recording successful data responses."""
+        forwarded = {name: value for name, value in headers.items() if name.lower() == "authorization"}
+        rsp = self._upstream.get(f"{self.upstream_url}{path}", params=params, headers=forwarded, timeout=(10, 60))
+        content_type = rsp.headers.get("Content-Type", "application/octet-stream")
+        if record and rsp.ok:
+            key = f"{path}?{urlencode(sorted(params.items()))}"
+            recording = {"request": key, "status": rsp.status_code, "content_type": content_type, "content": rsp.text}
+            with open(self._recording_path(key), "w") as f:
+                json.dump(recording, f)
+        return rsp.status_code, rsp.content, {"Content-Type": content_type}
+
+    def _replay(self, key: str) -> tuple[int, Union[dict, bytes], dict]:
+        path = self._recording_path(key)
+        if not os.path.exists(path):
+            with self._lock:
+                self.stats["replay_misses"] += 1
+            return 404, {"error": f"No recording for {key}"}, {}
+        with open(path) as f:
+            recording = json.load(f)
+        return recording["status"], recording["content"].encode(), {"Content-Type": recording["content_type"]}
+
+    def _historical(self, params: dict) -> tuple[int, dict, dict]:
+        region = params.get("region")
+        if region not in self.archives:
+            return 400, {"error": f"Invalid region {region}"}, {}
+        if "start" not in params or "end" not in params:
+            return 400, {"error": "start and end are required"}, {}
+
+        # the API is inclusive on both ends
+        points = self.archives[region]
+        times = points.index.asi8
+        lo = int(np.searchsorted(times, to_epoch_ns(params["start"]), side="left"))
+        hi = int(np.searchsorted(times, to_epoch_ns(params["end"]), side="right"))
+        rows = points.iloc[lo:hi]
+        point_times = np.datetime_as_string(times[lo:hi].view("datetime64[ns]"), unit="s")
+        data = [
+            {"point_time": f"{point_time}+00:00", "value": float(value)}
+            for point_time, value in zip(point_times, rows["value"])
+        ]
+        if "version" in rows.columns:
+            for record, version in zip(data, rows["version"].astype(str)):
+                record["version"] = version
+        meta = {
+            "region": region,
+            "signal_type": params.get("signal_type", "co2_moer"),
+            "model": {"date": ARCHIVE_MODEL_DATE},
+            "warnings": [],
+        }
+        return 200, {"data": data, "meta": meta}, {}
+
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import datetime
+    from .backfill import BackfillError, backfill_carbon_intensity
+    from .watttime_session import WattTimeSession
+
+    # Load-test the concurrent backfill against the stand-in, or just serve it
+    # (run with `python -m utils.watttime_standin --archive CAISO_NORTH=data/carbon_intensity_CAISO_NORTH_20240423_to_20250422.csv`)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--archive", action="append", default=[], help="REGION=PATH, repeatable")
+    parser.add_argument("--mode", choices=MODES, default="archive")
+    parser.add_argument("--recordings", help="recordings directory for record/replay")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--serve", action="store_true", help="serve until interrupted instead of load-testing")
+    args = parser.parse_args()
+
+    standin = WattTimeStandIn(
+        archives=dict(spec.split("=", 1) for spec in args.archive),
+        mode=args.mode,
+        recordings_dir=args.recordings,
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit=args.rate_limit,
+        error_rate=args.error_rate,
+        port=args.port,
+    )
+    if args.serve:
+        print(f"Serving the WattTime stand-in at {standin.url}")
+        standin.server.serve_forever()
+    else:
+        with standin, WattTimeSession("stand-in", "stand-in", base_url=standin.url) as session:
+            for region in standin.archives or ["CAISO_NORTH"]:
+                start = time.perf_counter()
+                try:
+                    df = backfill_carbon_intensity(
+                        datetime(2024, 4, 23), datetime(2025, 4, 22), region, max_workers=args.workers, client=session
+                    )
+                except BackfillError as e:
+                    print(f"{region}: {e}")
+                    continue
+                print(f"{region}: {len(df)} points in {time.perf_counter() - start:.2f}s")
+            print(f"Client: {session.latency_stats()}")
+            print(f"Stand-in: {dict(standin.stats)}")